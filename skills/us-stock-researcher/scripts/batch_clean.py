@@ -0,0 +1,320 @@
+#!/usr/bin/env python3.11
+"""
+SEC Filing Batch Cleaner
+Cleans many full-submission.txt files in parallel using a process pool
+
+Features:
+1. Fans out clean_sec_filing over worker processes (configurable worker count)
+2. Records per-file timing, status and error in a structured summary
+3. Keeps download_sec_filings fallback: failed files map back to the raw file
+4. Serves unchanged filings from the content-addressed cleaned cache
+5. Optional table and Item section sidecar indexes next to each cleaned file, and XBRL
+   facts next to each raw file (cache hits included)
+"""
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# Import cleaner module
+try:
+    from clean_sec_filing import TABLE_FORMATS, clean_sec_filing, clean_sec_filing_stream, get_cleaner_fingerprint
+    from cleaned_cache import CleanedCache, clean_with_cache
+    from section_index import load_or_build_section_index
+    from table_index import TABLE_INDEX_FORMATS, load_or_build_table_index
+    from xbrl_facts import FACTS_FORMATS, load_or_build_facts
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from clean_sec_filing import TABLE_FORMATS, clean_sec_filing, clean_sec_filing_stream, get_cleaner_fingerprint
+    from cleaned_cache import CleanedCache, clean_with_cache
+    from section_index import load_or_build_section_index
+    from table_index import TABLE_INDEX_FORMATS, load_or_build_table_index
+    from xbrl_facts import FACTS_FORMATS, load_or_build_facts
+
+
+def get_default_workers(file_count: int) -> int:
+    """
+    Default worker count: one per CPU, never more than the number of files
+    """
+    return max(1, min(os.cpu_count() or 1, file_count))
+
+
+def clean_one_filing(
+    raw_path: str,
+    cleaned_path: str,
+    stream: bool = False,
+    cache_dir: str = None,
+    cache_max_bytes: int = None,
+    tables: str = "text",
+    table_index: str = None,
+    section_index: bool = False,
+    dedup: bool = False,
+    xbrl_facts: str = None
+) -> dict:
+    """
+    Clean single filing and time it (runs inside worker process)
+
+    Cleaner output is captured rather than printed, so parallel workers
+    don't interleave their logs.
+
+    Args:
+        raw_path: full-submission.txt path
+        cleaned_path: Output path
+        stream: Use bounded-memory streaming cleaner
+        cache_dir: Cleaned cache directory, None to disable caching
+        cache_max_bytes: Cache size limit
+        tables: Table rendering, "text", "markdown" or "tsv"
+        table_index: Table sidecar format ("json" or "parquet"), None to skip
+        section_index: Also write the Item section index
+        dedup: Replace repeated paragraphs with references (part of the cache key)
+        xbrl_facts: XBRL facts sidecar format ("json" or "parquet"), None to skip
+
+    Returns:
+        Result dict: input, output, status (ok/failed), cache (hit/miss/None), tables /
+        sections / facts (indexed table / section / XBRL fact count, None if not indexed),
+        seconds, error, sidecar_error (a failed sidecar doesn't fail the cleaned file), log
+    """
+    start = time.perf_counter()
+    log = io.StringIO()
+    result = {"input": raw_path, "output": cleaned_path, "status": "ok", "cache": None, "tables": None,
+              "sections": None, "facts": None, "error": None, "sidecar_error": None}
+    clean_fn = functools.partial(clean_sec_filing_stream if stream else clean_sec_filing, tables=tables, dedup=dedup)
+    with contextlib.redirect_stdout(log):
+        try:
+            if cache_dir is None:
+                clean_fn(raw_path, cleaned_path)
+            else:
+                cache = CleanedCache(cache_dir, cache_max_bytes)
+                fingerprint = get_cleaner_fingerprint(tables=tables, dedup=dedup)
+                hit = clean_with_cache(raw_path, cleaned_path, clean_fn, cache, fingerprint)
+                result["cache"] = "hit" if hit else "miss"
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+            result["output"] = raw_path  # Return original file on failure
+
+        # Built after the cache step, so cache hits get sidecars too
+        sidecars = []
+        if result["status"] == "ok":
+            if table_index:
+                sidecars.append(("tables", lambda: len(load_or_build_table_index(cleaned_path, table_index)["tables"])))
+            if section_index:
+                sidecars.append(("sections", lambda: len(load_or_build_section_index(cleaned_path)["sections"])))
+            if xbrl_facts:
+                sidecars.append(("facts", lambda: load_or_build_facts(raw_path, xbrl_facts)["count"]))
+        errors = []
+        for field, build in sidecars:
+            try:
+                result[field] = build()
+            except Exception as e:
+                errors.append(f"{field}: {type(e).__name__}: {e}")
+        result["sidecar_error"] = '; '.join(errors) or None
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    result["log"] = log.getvalue()
+    return result
+
+
+def clean_filings_parallel(
+    raw_files: list,
+    workers: int = None,
+    stream: bool = False,
+    output_name: str = "cleaned.txt",
+    cache: CleanedCache = None,
+    tables: str = "text",
+    table_index: str = None,
+    section_index: bool = False,
+    dedup: bool = False,
+    xbrl_facts: str = None
+) -> dict:
+    """
+    Clean filings in parallel
+
+    Args:
+        raw_files: full-submission.txt paths
+        workers: Worker process count (default: CPU count, capped at file count; 1 = no pool)
+        stream: Use bounded-memory streaming cleaner in workers
+        output_name: Cleaned filename written next to each raw file
+        cache: Cleaned cache to serve unchanged filings from (None = always clean)
+        tables: Table rendering, "text", "markdown" or "tsv"
+        table_index: Also write a table sidecar per filing ("json" or "parquet")
+        section_index: Also write an Item section index per filing
+        dedup: Replace repeated paragraphs with references
+        xbrl_facts: Also write an XBRL facts sidecar per filing ("json" or "parquet")
+
+    Returns:
+        Summary dict: workers, seconds, succeeded, failed, cache_hits, cache_misses,
+        files (per-file results in input order), outputs (cleaned path, or raw path on failure)
+    """
+    raw_files = [str(p) for p in raw_files]
+    if workers is None:
+        workers = get_default_workers(len(raw_files))
+    cache_args = (str(cache.cache_dir), cache.max_bytes) if cache else (None, None)
+    jobs = [
+        (raw, str(Path(raw).parent / output_name), stream, *cache_args, tables, table_index, section_index, dedup,
+         xbrl_facts)
+        for raw in raw_files
+    ]
+
+    start = time.perf_counter()
+    results = {}
+
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            results[job[0]] = clean_one_filing(*job)
+            _print_result(results[job[0]])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(clean_one_filing, *job): job[0] for job in jobs}
+            for future in as_completed(futures):
+                raw = futures[future]
+                try:
+                    results[raw] = future.result()
+                except Exception as e:
+                    # Worker crashed (e.g. killed by OOM), treat like a cleaning failure
+                    results[raw] = {
+                        "input": raw, "output": raw, "status": "failed", "cache": None, "tables": None,
+                        "sections": None, "facts": None, "error": f"{type(e).__name__}: {e}", "sidecar_error": None,
+                        "seconds": None, "log": "",
+                    }
+                _print_result(results[raw])
+
+    files = [results[raw] for raw in raw_files]
+    failed = [r for r in files if r["status"] != "ok"]
+    hits = [r for r in files if r["cache"] == "hit"]
+    misses = sum(1 for r in files if r["cache"] == "miss")
+    if cache is not None:
+        cache.record(
+            hits=len(hits),
+            misses=misses,
+            bytes_served=sum(Path(r["output"]).stat().st_size for r in hits)
+        )
+
+    return {
+        "workers": workers,
+        "seconds": round(time.perf_counter() - start, 3),
+        "succeeded": len(files) - len(failed),
+        "failed": len(failed),
+        "cache_hits": len(hits),
+        "cache_misses": misses,
+        "files": files,
+        "outputs": [r["output"] for r in files],
+    }
+
+
+def _print_result(result: dict):
+    if result["cache"] == "hit":
+        print(f"  Cache hit ({result['seconds']:.1f}s): {result['output']}")
+    elif result["status"] == "ok":
+        print(f"  Cleaned ({result['seconds']:.1f}s): {result['output']}")
+    else:
+        print(f"  Cleaning failed {result['input']}: {result['error']}")
+    if result["sidecar_error"]:
+        print(f"  Sidecar failed {result['input']}: {result['sidecar_error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Clean many SEC full-submission.txt files in parallel"
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="Input file paths (full-submission.txt)"
+    )
+    parser.add_argument(
+        "--dir",
+        default=None,
+        help="Clean every full-submission.txt found under this directory"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker process count (default: CPU count)"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Use bounded-memory streaming cleaner in each worker"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always re-clean, don't use the cleaned cache"
+    )
+    parser.add_argument(
+        "--tables",
+        default="text",
+        choices=TABLE_FORMATS,
+        help="Table rendering: text, markdown or tsv (default: text)"
+    )
+    parser.add_argument(
+        "--table-index",
+        default=None,
+        choices=TABLE_INDEX_FORMATS,
+        help="Also write a table sidecar index per filing (requires --tables markdown or tsv)"
+    )
+    parser.add_argument(
+        "--section-index",
+        action="store_true",
+        help="Also write an Item section index (cleaned.sections.json) per filing"
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Replace repeated and near-duplicate paragraphs with short references"
+    )
+    parser.add_argument(
+        "--xbrl-facts",
+        default=None,
+        choices=FACTS_FORMATS,
+        help="Also write an XBRL facts sidecar (full-submission.facts.json or .parquet) per filing"
+    )
+    parser.add_argument(
+        "--summary",
+        default=None,
+        help="Write JSON summary (per-file timings and failures) to this path"
+    )
+
+    args = parser.parse_args()
+
+    raw_files = list(args.inputs)
+    if args.dir:
+        raw_files += sorted(str(p) for p in Path(args.dir).glob("**/full-submission.txt"))
+    if not raw_files:
+        print("Error: No input files", file=sys.stderr)
+        sys.exit(1)
+    if args.table_index and args.tables == "text":
+        print("Error: --table-index requires --tables markdown or tsv", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Cleaning {len(raw_files)} files...")
+    cache = None if args.no_cache else CleanedCache()
+    summary = clean_filings_parallel(
+        raw_files, workers=args.workers, stream=args.stream, cache=cache, tables=args.tables,
+        table_index=args.table_index, section_index=args.section_index, dedup=args.dedup,
+        xbrl_facts=args.xbrl_facts
+    )
+
+    print(f"\nDone in {summary['seconds']:.1f}s with {summary['workers']} workers: "
+          f"{summary['succeeded']} succeeded, {summary['failed']} failed, "
+          f"{summary['cache_hits']} cache hits")
+
+    if args.summary:
+        Path(args.summary).write_text(json.dumps(summary, indent=2), encoding='utf-8')
+        print(f"Summary: {args.summary}")
+
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
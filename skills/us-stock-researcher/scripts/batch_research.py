@@ -0,0 +1,376 @@
+#!/usr/bin/env python3.11
+"""
+Batch Deep Research Runner
+Runs two-phase Gemini Deep Research for many tickers concurrently on one event loop
+
+Features:
+1. Drives every ticker's Phase 1 / Phase 2 interactions at once through the analyzer's async API,
+   so a watchlist finishes in about the time of the slowest ticker rather than the sum
+2. Configurable concurrency limit (tickers in flight at the same time)
+3. Per-ticker reports in each ticker's own tmp directory, same paths as gemini_deep_research.py
+4. Finds each ticker's latest cleaned filing of the chosen form (default 10-K) and
+   analysis framework when not given
+5. Records per-ticker status, timing and errors in a structured summary; one failure doesn't stop the rest
+6. All in-flight interactions are polled by one shared status multiplexer on an adaptive schedule
+7. Resume mode: each ticker continues from its research checkpoint, reattaching to running interactions
+"""
+import argparse
+import asyncio
+import json
+import shlex
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    from file_search_registry import FileSearchRegistry
+    from filing_diff import read_filing_dates
+    from filing_store import get_default_output_dir, get_filing_dir
+    from gemini_deep_research import GeminiDeepResearchAnalyzer
+    from section_index import DEFAULT_SECTIONS
+    from token_counter import DEFAULT_TOKENIZER, TOKENIZER_NAMES
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from file_search_registry import FileSearchRegistry
+    from filing_diff import read_filing_dates
+    from filing_store import get_default_output_dir, get_filing_dir
+    from gemini_deep_research import GeminiDeepResearchAnalyzer
+    from section_index import DEFAULT_SECTIONS
+    from token_counter import DEFAULT_TOKENIZER, TOKENIZER_NAMES
+
+DEFAULT_CONCURRENCY = 8
+
+
+def parse_research_list(path: str) -> list[dict]:
+    """
+    Parse a research list: one ticker per line, 'TICKER [INPUT] [PROMPT] ["Company Name"]'
+
+    INPUT and PROMPT may be '-' (found automatically). '#' starts a comment.
+
+    Returns:
+        List of {ticker, input, prompt, company} (None where not given)
+    """
+    jobs = []
+    for line_no, line in enumerate(Path(path).read_text(encoding='utf-8').splitlines(), 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        fields = shlex.split(line)
+        if len(fields) > 4:
+            raise ValueError(f"{path}:{line_no}: expected 'TICKER [INPUT] [PROMPT] [\"Company Name\"]', got: {line}")
+        fields += [None] * (4 - len(fields))
+        ticker, input_file, prompt, company = fields
+        jobs.append({
+            "ticker": ticker.upper(),
+            "input": None if input_file in (None, '-') else input_file,
+            "prompt": None if prompt in (None, '-') else prompt,
+            "company": company,
+        })
+    return jobs
+
+
+def find_latest_filing(ticker: str, project_root: str = None, form: str = "10-K") -> Path:
+    """
+    Latest cleaned filing of a form type downloaded for a ticker (by period of report, else filing date)
+
+    Returns:
+        cleaned.txt path, None if none has been downloaded
+    """
+    filing_dir = get_filing_dir(get_default_output_dir(ticker, project_root), ticker, form)
+    candidates = []
+    for path in filing_dir.glob("*/cleaned.txt"):
+        dates = read_filing_dates(str(path))
+        candidates.append((dates["period"] or dates["filed"] or '', path.stat().st_mtime, path))
+    return max(candidates)[2] if candidates else None
+
+
+def find_latest_framework(output_dir: Path) -> Path:
+    """
+    Latest generated analysis framework (tmp/analysis-framework-YYYY-MM-DD.md)
+
+    Returns:
+        Framework path, None if none has been generated
+    """
+    frameworks = sorted(output_dir.glob("tmp/analysis-framework-*.md"))
+    return frameworks[-1] if frameworks else None
+
+
+def resolve_job(job: dict, project_root: str = None, default_prompt: str = None, form: str = "10-K") -> dict:
+    """
+    Fill in a job's output directory, input filing (latest of form), framework and company name
+
+    Raises:
+        ValueError: If no filing or framework is found
+    """
+    root = Path(project_root) if project_root else Path.cwd()
+    output_dir = root / "investment-research" / job["ticker"]
+    input_file = job["input"] or find_latest_filing(job["ticker"], project_root, form)
+    if input_file is None or not Path(input_file).exists():
+        raise ValueError(f"No cleaned {form} found for {job['ticker']} (run download_sec_filings.py first)")
+    prompt = job["prompt"] or default_prompt or find_latest_framework(output_dir)
+    if prompt is None or not Path(prompt).exists():
+        raise ValueError(f"No analysis framework found for {job['ticker']} "
+                         f"(expected {output_dir}/tmp/analysis-framework-YYYY-MM-DD.md)")
+    return dict(
+        job,
+        input=str(input_file),
+        prompt=str(prompt),
+        company=job["company"] or job["ticker"],
+        output_dir=str(output_dir)
+    )
+
+
+async def run_research_job(
+    analyzer: GeminiDeepResearchAnalyzer,
+    job: dict,
+    semaphore: asyncio.Semaphore,
+    phase: str = "all",
+    project_root: str = None,
+    default_prompt: str = None,
+    resume: bool = False,
+    form: str = "10-K",
+    **options
+) -> dict:
+    """
+    Run one ticker's research once a concurrency slot is free
+
+    Args:
+        analyzer: Shared analyzer
+        job: Job from parse_research_list
+        semaphore: Concurrency limit shared by all jobs
+        phase: "all" (Phase 1 and 2) or "local" (Phase 1 only)
+        project_root: Project root for default paths
+        default_prompt: Framework for jobs without their own (default: latest generated one)
+        resume: Continue each ticker's checkpointed run (tmp/research-checkpoint.json)
+        form: Form type researched for tickers without an INPUT filing
+        **options: poll_interval, max_wait_time, sections, token_budget
+
+    Returns:
+        Result dict: ticker, status (ok/failed), input, phase1, phase2, final_output, seconds, error
+    """
+    result = {"ticker": job["ticker"], "status": "ok", "input": job["input"], "phase1": None, "phase2": None,
+              "final_output": None, "seconds": None, "error": None}
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            job = resolve_job(job, project_root, default_prompt, form)
+            result["input"] = job["input"]
+            analysis_prompt = Path(job["prompt"]).read_text(encoding='utf-8')
+            if phase == "all":
+                research = await analyzer.run_two_phase_research_async(
+                    input_file=job["input"],
+                    analysis_prompt=analysis_prompt,
+                    output_dir=job["output_dir"],
+                    company_ticker=job["ticker"],
+                    company_name=job["company"],
+                    resume=resume,
+                    **options
+                )
+                result.update(phase1=research["phase1"], phase2=research["phase2"],
+                              final_output=research["final_output"])
+            else:
+                checkpoint = analyzer.open_checkpoint(
+                    job["output_dir"], job["ticker"], job["input"], analysis_prompt, resume, job["ticker"],
+                    phase1_options=options
+                )
+                paths = checkpoint.state["paths"]
+                if checkpoint.state["stage"] == "phase1":
+                    await analyzer.run_phase1_local_analysis_async(
+                        input_file=job["input"],
+                        analysis_prompt=analysis_prompt,
+                        output_file=paths["phase1"],
+                        label=job["ticker"],
+                        checkpoint=checkpoint,
+                        **options
+                    )
+                result["phase1"] = paths["phase1"]
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+            print(f"[{job['ticker']}] Research failed: {result['error']}")
+        result["seconds"] = round(time.perf_counter() - start, 1)
+    return result
+
+
+async def run_research_batch(
+    jobs: list[dict],
+    analyzer: GeminiDeepResearchAnalyzer,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    phase: str = "all",
+    project_root: str = None,
+    default_prompt: str = None,
+    resume: bool = False,
+    form: str = "10-K",
+    **options
+) -> dict:
+    """
+    Run all jobs concurrently, at most concurrency tickers at a time
+
+    Blocking SDK calls (uploads, interaction create/get) run in a thread pool
+    sized to the concurrency limit; waiting between status checks runs on the
+    event loop and holds no thread.
+
+    Returns:
+        Summary dict: seconds, concurrency, succeeded, failed, jobs (per-ticker results in list order)
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency + 4))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        run_research_job(analyzer, job, semaphore, phase, project_root, default_prompt, resume, form, **options)
+        for job in jobs
+    ))
+    failed = sum(1 for r in results if r["status"] != "ok")
+    return {
+        "seconds": round(time.perf_counter() - start, 1),
+        "concurrency": concurrency,
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "jobs": list(results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run Gemini Deep Research for many tickers concurrently"
+    )
+    parser.add_argument(
+        "--list",
+        required=True,
+        help="Research list file, one line per ticker: TICKER [INPUT] [PROMPT] [\"Company Name\"]"
+    )
+    parser.add_argument(
+        "--project-root",
+        default=None,
+        help="Project root holding investment-research/<TICKER> (default: current directory)"
+    )
+    parser.add_argument(
+        "--prompt",
+        default=None,
+        help="Analysis framework for tickers without their own (default: each ticker's latest "
+             "tmp/analysis-framework-*.md)"
+    )
+    parser.add_argument(
+        "--form",
+        default="10-K",
+        help="Form type researched for tickers without an INPUT filing (default: 10-K)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Tickers researched at the same time (default: {DEFAULT_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--phase",
+        choices=["all", "local"],
+        default="all",
+        help="all=two-phase analysis, local=Phase 1 filing analysis only (default: all)"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=int,
+        default=None,
+        help="Fixed polling interval in seconds (default: adaptive; all tickers share one status checker)"
+    )
+    parser.add_argument(
+        "--max-wait",
+        type=int,
+        default=1800,
+        help="Maximum wait time per phase in seconds (default: 1800)"
+    )
+    parser.add_argument(
+        "--sections",
+        default=None,
+        help=f"Phase 1 on these Item sections only, comma-separated ('default' = {','.join(DEFAULT_SECTIONS)})"
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=None,
+        help="Token budget for --sections"
+    )
+    parser.add_argument(
+        "--tokenizer",
+        default=DEFAULT_TOKENIZER,
+        choices=TOKENIZER_NAMES,
+        help="Token counting for the inline/File Search decision (default: filing)"
+    )
+    parser.add_argument(
+        "--no-store-cache",
+        action="store_true",
+        help="Always upload and index large filings, don't reuse File Search Stores from earlier runs"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue each ticker's checkpointed run: reattach to in-flight or finished interactions, "
+             "skip saved reports"
+    )
+    parser.add_argument(
+        "--summary",
+        default=None,
+        help="Write JSON summary (per-ticker status, reports, timings) to this path"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        jobs = parse_research_list(args.list)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not jobs:
+        print("Error: No tickers in research list", file=sys.stderr)
+        sys.exit(1)
+    if args.concurrency < 1:
+        print("Error: --concurrency must be at least 1", file=sys.stderr)
+        sys.exit(1)
+    if args.prompt and not Path(args.prompt).exists():
+        print(f"Error: Analysis framework file not found {args.prompt}", file=sys.stderr)
+        sys.exit(1)
+    sections = None
+    if args.sections:
+        sections = DEFAULT_SECTIONS if args.sections == "default" else args.sections.split(',')
+
+    registry = None if args.no_store_cache else FileSearchRegistry()
+    analyzer = GeminiDeepResearchAnalyzer(tokenizer=args.tokenizer, registry=registry)
+
+    print(f"Researching {len(jobs)} tickers ({args.concurrency} at a time)...")
+    summary = asyncio.run(run_research_batch(
+        jobs,
+        analyzer,
+        concurrency=args.concurrency,
+        phase=args.phase,
+        project_root=args.project_root,
+        default_prompt=args.prompt,
+        resume=args.resume,
+        form=args.form,
+        poll_interval=args.poll_interval,
+        max_wait_time=args.max_wait,
+        sections=sections,
+        token_budget=args.token_budget
+    ))
+
+    print(f"\nDone in {summary['seconds']:.0f}s: {summary['succeeded']} succeeded, {summary['failed']} failed")
+    for result in summary["jobs"]:
+        if result["status"] == "ok":
+            print(f"  {result['ticker']}: {result['phase1']}" + (f", {result['phase2']}" if result["phase2"] else ""))
+        else:
+            print(f"  {result['ticker']}: FAILED {result['error']}")
+
+    if args.summary:
+        Path(args.summary).write_text(json.dumps(summary, indent=2), encoding='utf-8')
+        print(f"Summary: {args.summary}")
+
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
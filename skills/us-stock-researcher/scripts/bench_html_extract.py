@@ -0,0 +1,118 @@
+#!/usr/bin/env python3.11
+"""
+HTML Extraction Micro-Benchmark
+Times precompiled three-pass tag rewriting against the original per-tag passes on real filing HTML
+
+Features:
+1. Reads a full-submission.txt (all non-skipped documents) or a single .htm file
+2. Checks both implementations produce identical output
+3. Reports best-of-N time, throughput and speedup
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+# Import cleaner module
+try:
+    from clean_sec_filing import (
+        DOC_TYPE_PATTERN, extract_text_from_html, has_nested_tag_start, is_skipped_doc_type,
+        iter_submission_tokens, remove_base64_data, remove_uuencoded_data, rewrite_tags, rewrite_tags_legacy
+    )
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from clean_sec_filing import (
+        DOC_TYPE_PATTERN, extract_text_from_html, has_nested_tag_start, is_skipped_doc_type,
+        iter_submission_tokens, remove_base64_data, remove_uuencoded_data, rewrite_tags, rewrite_tags_legacy
+    )
+
+TEXT_BLOCK_PATTERN = re.compile(r'<TEXT>(.*?)</TEXT>', re.DOTALL | re.IGNORECASE)
+
+
+def load_html_samples(input_path: str) -> list[str]:
+    """
+    HTML bodies to benchmark: each kept document of a submission, or the whole file
+
+    Returns:
+        List of document texts as the cleaner sees them (binary data already removed)
+    """
+    content = Path(input_path).read_text(encoding='utf-8', errors='replace')
+    if '<DOCUMENT>' not in content:
+        return [content]
+
+    samples = []
+    for kind, doc in iter_submission_tokens(content):
+        if kind != 'document':
+            continue
+        type_match = DOC_TYPE_PATTERN.search(doc)
+        if is_skipped_doc_type(type_match.group(1).strip() if type_match else ""):
+            continue
+        doc = remove_base64_data(remove_uuencoded_data(doc))
+        text_match = TEXT_BLOCK_PATTERN.search(doc)
+        samples.append(text_match.group(1) if text_match else doc)
+    return samples
+
+
+def time_best(fn, samples: list[str], repeat: int) -> float:
+    """
+    Best wall time over repeat runs of fn on every sample
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for sample in samples:
+            fn(sample)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark three-pass vs per-tag HTML tag rewriting on a filing"
+    )
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="full-submission.txt or a single HTML document"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Runs per implementation, best time is reported (default: 5)"
+    )
+
+    args = parser.parse_args()
+
+    samples = load_html_samples(args.input)
+    size = sum(len(s) for s in samples)
+    if not size:
+        print("Error: No HTML content found", file=sys.stderr)
+        sys.exit(1)
+
+    fallback = [s for s in samples if has_nested_tag_start(s)]
+    fast_path = [s for s in samples if not has_nested_tag_start(s)]
+    identical = all(rewrite_tags(s) == rewrite_tags_legacy(s) for s in fast_path)
+    print(f"Input: {args.input} ({len(samples)} documents, {size / 1024 / 1024:.1f} M chars)")
+    print(f"Three-pass output identical: {identical} "
+          f"({len(fallback)} documents with stray '<' use the per-tag fallback)")
+
+    legacy = time_best(rewrite_tags_legacy, samples, args.repeat)
+    fast = time_best(rewrite_tags, samples, args.repeat)
+    full = time_best(extract_text_from_html, samples, args.repeat)
+
+    print(f"\n{'Stage':<34}{'Best time':>12}{'Throughput':>14}")
+    for label, seconds in [
+        ("Tag rewrite, per-tag passes", legacy),
+        ("Tag rewrite, three passes", fast),
+        ("extract_text_from_html (total)", full),
+    ]:
+        print(f"{label:<34}{seconds * 1000:>10.1f}ms{size / seconds / 1024 / 1024:>10.1f} MB/s")
+    print(f"\nSpeedup (tag rewrite): {legacy / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3.11
+"""
+XBRL Metadata Filter Benchmark
+Compares the generalized XBRL filter against the original single-CIK line heuristic on a set of filings
+
+Features:
+1. Cleans each full-submission.txt once, then runs the output stage with each filter
+2. Reports cleaned size, lines removed and output-stage time per filing and in total
+3. Shows lines the original heuristic kept but the generalized filter removed (--show)
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+# Import cleaner module
+try:
+    from clean_sec_filing import (
+        CleanedTextWriter, XbrlNoiseFilter, format_record, iter_cleaned_documents, iter_submission_tokens,
+        parse_header_ciks
+    )
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from clean_sec_filing import (
+        CleanedTextWriter, XbrlNoiseFilter, format_record, iter_cleaned_documents, iter_submission_tokens,
+        parse_header_ciks
+    )
+
+LEGACY_CIK = '0000723125'
+LEGACY_CIK_PATTERN = re.compile(r'0000723125\d{10,}')
+
+
+class LegacyXbrlFilter:
+    """
+    Original per-line heuristic, hard-coded to one filer's CIK (for comparison)
+    """
+
+    def __init__(self, ciks: list[str] = None):
+        self.lines_removed = 0
+        self.chars_removed = 0
+
+    @staticmethod
+    def is_noise(line: str) -> bool:
+        if 'http://fasb.org/us-gaap' in line and line.count('http://') > 3:
+            return True
+        if LEGACY_CIK_PATTERN.search(line) and line.count(LEGACY_CIK) > 5:
+            return True
+        return line.startswith('iso4217:') or line.startswith('xbrli:')
+
+    def filter(self, text: str) -> str:
+        kept = []
+        for line in text.split('\n'):
+            if self.is_noise(line):
+                self.lines_removed += 1
+                self.chars_removed += len(line) + 1
+            else:
+                kept.append(line)
+        return '\n'.join(kept)
+
+
+def run_output_stage(records: list[dict], xbrl_filter) -> tuple[str, float]:
+    """
+    Write cleaned records through CleanedTextWriter using xbrl_filter
+
+    Returns:
+        (cleaned text, seconds)
+    """
+    chunks = []
+    writer = CleanedTextWriter(chunks.append)
+    writer.xbrl_filter = xbrl_filter
+    start = time.perf_counter()
+    for record in records:
+        writer.write(format_record(record))
+    return ''.join(chunks), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare generalized and original XBRL metadata filters on filings"
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="full-submission.txt files (ideally from several issuers)"
+    )
+    parser.add_argument(
+        "--show",
+        type=int,
+        default=0,
+        help="Print up to N lines per filing that only the generalized filter removes (default: 0)"
+    )
+
+    args = parser.parse_args()
+
+    print(f"{'Filing':<36}{'CIK':>12}{'Original':>12}{'Generalized':>13}{'Smaller':>9}"
+          f"{'Lines':>8}{'Time':>9}")
+    totals = {"legacy": 0, "new": 0, "legacy_seconds": 0.0, "new_seconds": 0.0}
+    for input_path in args.inputs:
+        content = Path(input_path).read_text(encoding='utf-8', errors='replace')
+        records = list(iter_cleaned_documents(iter_submission_tokens(content)))
+        header = next((r["text"] for r in records if r["kind"] == "header"), "")
+        ciks = parse_header_ciks(header)
+
+        legacy_filter = LegacyXbrlFilter()
+        new_filter = XbrlNoiseFilter(ciks)
+        legacy_text, legacy_seconds = run_output_stage(records, legacy_filter)
+        new_text, new_seconds = run_output_stage(records, new_filter)
+
+        legacy_size = len(legacy_text.encode('utf-8'))
+        new_size = len(new_text.encode('utf-8'))
+        totals["legacy"] += legacy_size
+        totals["new"] += new_size
+        totals["legacy_seconds"] += legacy_seconds
+        totals["new_seconds"] += new_seconds
+        smaller = 1 - new_size / legacy_size if legacy_size else 0.0
+        name = Path(input_path).parent.name + '/' + Path(input_path).name
+        print(f"{name[-35:]:<36}{(ciks[0] if ciks else '-'):>12}{legacy_size:>12,}{new_size:>13,}"
+              f"{smaller:>8.1%}{new_filter.lines_removed - legacy_filter.lines_removed:>+8}"
+              f"{new_seconds * 1000:>7.0f}ms")
+
+        if args.show:
+            kept = set(new_text.split('\n'))
+            extra = [line for line in legacy_text.split('\n') if line and line not in kept]
+            for line in extra[:args.show]:
+                print(f"    - {line[:120]}")
+
+    if totals["legacy"]:
+        print(f"\nTotal: {totals['legacy']:,} -> {totals['new']:,} bytes "
+              f"({1 - totals['new'] / totals['legacy']:.1%} smaller), output stage "
+              f"{totals['legacy_seconds'] * 1000:.0f}ms original, {totals['new_seconds'] * 1000:.0f}ms generalized")
+
+
+if __name__ == "__main__":
+    main()
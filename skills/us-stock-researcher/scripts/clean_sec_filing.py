@@ -8,13 +8,55 @@ Features:
 2. Remove HTML/XML tags, preserve text content
 3. Preserve SEC document structure info (document type, description, etc.)
 4. Extract hidden text (e.g., white small font data in slides)
-5. Clean excess blank lines, optimize readability
+5. Clean excess blank lines, optimize readability, drop inline XBRL metadata
+   (taxonomy names, contexts and units, detected for any filer via its header CIK)
+6. Optional dedup: repeated or near-duplicate paragraphs (disclaimers, certifications,
+   signature pages) replaced by short references to their first occurrence
+7. Optional XBRL facts sidecar: the typed facts the text output drops (xbrl_facts)
 """
 import argparse
+import hashlib
+import json
+import mmap
 import re
 import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from html import unescape
 from pathlib import Path
+from typing import Optional
+
+try:
+    from filing_index import FIELD_PATTERNS, TEXT_START, load_filing_index, load_or_build_filing_index
+    from section_index import write_section_sidecar
+    from table_index import TABLE_INDEX_FORMATS, write_table_sidecar
+    from token_counter import FilingTokenizer, count_tokens
+    from xbrl_facts import FACTS_FORMATS, write_facts_sidecar
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from filing_index import FIELD_PATTERNS, TEXT_START, load_filing_index, load_or_build_filing_index
+    from section_index import write_section_sidecar
+    from table_index import TABLE_INDEX_FORMATS, write_table_sidecar
+    from token_counter import FilingTokenizer, count_tokens
+    from xbrl_facts import FACTS_FORMATS, write_facts_sidecar
+
+# Bump whenever cleaned output changes, so cached results are not reused
+CLEANER_VERSION = 4
+
+# Output-affecting options at their defaults are left out of the fingerprint,
+# so adding an option doesn't invalidate existing cache entries
+DEFAULT_CLEANER_OPTIONS = {"tables": "text", "dedup": False}
+
+
+def get_cleaner_fingerprint(**options) -> str:
+    """
+    Fingerprint of cleaner version plus output-affecting options (cache key part)
+    """
+    options = {k: v for k, v in options.items() if DEFAULT_CLEANER_OPTIONS.get(k, object()) != v}
+    config = json.dumps({"version": CLEANER_VERSION, **options}, sort_keys=True)
+    return hashlib.sha256(config.encode('utf-8')).hexdigest()[:16]
 
 
 def remove_uuencoded_data(content: str) -> str:
@@ -43,25 +85,94 @@ def remove_base64_data(content: str) -> str:
     return content
 
 
-def extract_text_from_html(html_content: str) -> str:
+# Tags whose open and close tags become newlines. Open tags match by prefix (<p also
+# matches <pre>, <li matches <link>), close tags exactly, as in the original per-tag passes.
+BLOCK_TAGS = ['div', 'p', 'br', 'tr', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr']
+_BLOCK_TAG = r'(?:div|p|br|tr|li|h[1-6]|hr)'
+
+# Tag rewriting in three passes, instead of two per block tag plus three for cells
+BLOCK_TAG_PATTERN = re.compile(rf'<(?:{_BLOCK_TAG}[^>]*|/{_BLOCK_TAG})>', re.IGNORECASE)
+# </td> ends a cell; whitespace and the next <td ...> are folded into the same tab
+CELL_END_PATTERN = re.compile(r'</t[dh]>(?:\s*<t[dh][^>]*>)?', re.IGNORECASE)
+ANY_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# A '<' opened before the previous '<' was closed by '>' (e.g. "a < b <i>c</i>")
+NESTED_TAG_START_PATTERN = re.compile(r'<[^>]*<')
+
+# Original per-tag patterns, for the fallback
+LEGACY_BLOCK_PATTERNS = [
+    (re.compile(rf'<{tag}[^>]*/?>', re.IGNORECASE), re.compile(rf'</{tag}>', re.IGNORECASE))
+    for tag in BLOCK_TAGS
+]
+LEGACY_CELL_JOIN_PATTERN = re.compile(r'</t[dh]>\s*<t[dh][^>]*>', re.IGNORECASE)
+LEGACY_CELL_OPEN_PATTERN = re.compile(r'<t[dh][^>]*>', re.IGNORECASE)
+LEGACY_CELL_CLOSE_PATTERN = re.compile(r'</t[dh]>', re.IGNORECASE)
+
+
+def has_nested_tag_start(html_content: str) -> bool:
     """
-    Extract plain text from HTML, preserve structure
+    Check for a '<' inside an unclosed '<...' that a later '>' closes
+
+    Only then can one tag pattern match across another tag, which makes the
+    result depend on the order tags are rewritten in.
+    """
+    match = NESTED_TAG_START_PATTERN.search(html_content)
+    return match is not None and html_content.find('>', match.end()) != -1
+
+
+def rewrite_tags(html_content: str) -> str:
+    """
+    Rewrite tags: block tags to newlines, table cells to tabs, all others removed
+
+    Same result as rewrite_tags_legacy as long as no tag contains a '<'
+    (see has_nested_tag_start): tags can't overlap, so pass order only
+    matters for cells, and block tags are rewritten before them.
+    """
+    text = BLOCK_TAG_PATTERN.sub('\n', html_content)
+    text = CELL_END_PATTERN.sub('\t', text)
+    return ANY_TAG_PATTERN.sub('', text)
+
+
+def rewrite_tags_legacy(html_content: str) -> str:
+    """
+    Original tag rewriting, one pass per tag type (order-dependent on nested '<')
     """
     text = html_content
 
     # Convert certain tags to newlines
-    block_tags = ['div', 'p', 'br', 'tr', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr']
-    for tag in block_tags:
-        text = re.sub(rf'<{tag}[^>]*/?>', '\n', text, flags=re.IGNORECASE)
-        text = re.sub(rf'</{tag}>', '\n', text, flags=re.IGNORECASE)
+    for open_pattern, close_pattern in LEGACY_BLOCK_PATTERNS:
+        text = open_pattern.sub('\n', text)
+        text = close_pattern.sub('\n', text)
 
     # Convert td/th to tab-separated
-    text = re.sub(r'</t[dh]>\s*<t[dh][^>]*>', '\t', text, flags=re.IGNORECASE)
-    text = re.sub(r'<t[dh][^>]*>', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'</t[dh]>', '\t', text, flags=re.IGNORECASE)
+    text = LEGACY_CELL_JOIN_PATTERN.sub('\t', text)
+    text = LEGACY_CELL_OPEN_PATTERN.sub('', text)
+    text = LEGACY_CELL_CLOSE_PATTERN.sub('\t', text)
 
     # Remove all remaining HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
+    return ANY_TAG_PATTERN.sub('', text)
+
+
+def extract_text_from_html(html_content: str, tables: str = "text") -> str:
+    """
+    Extract plain text from HTML, preserve structure
+
+    Tags are rewritten in three precompiled passes. Text where a stray '<'
+    precedes a tag goes through the original per-tag passes instead, so the
+    output is identical either way.
+
+    Args:
+        html_content: HTML (or plain text) document body
+        tables: "text" (cells tab-joined, as before), "markdown" or "tsv"
+            (each <table> rendered as a compact table block)
+    """
+    if tables != "text":
+        return extract_text_with_tables(html_content, tables)
+
+    if has_nested_tag_start(html_content):
+        text = rewrite_tags_legacy(html_content)
+    else:
+        text = rewrite_tags(html_content)
 
     # Decode HTML entities
     text = unescape(text)
@@ -73,15 +184,171 @@ def extract_text_from_html(html_content: str) -> str:
     return text
 
 
-def clean_whitespace(content: str) -> str:
+TABLE_FORMATS = ["text", "markdown", "tsv"]
+
+TABLE_BLOCK_PATTERN = re.compile(r'<table\b[^>]*>.*?</table\s*>', re.IGNORECASE | re.DOTALL)
+TABLE_ROW_PATTERN = re.compile(r'<tr\b[^>]*>(.*?)(?=<tr\b|</table|$)', re.IGNORECASE | re.DOTALL)
+TABLE_CELL_PATTERN = re.compile(r'<t[dh]\b([^>]*)>(.*?)(?=<t[dh]\b|</tr\b|$)', re.IGNORECASE | re.DOTALL)
+COLSPAN_PATTERN = re.compile(r'colspan\s*=\s*["\']?(\d+)', re.IGNORECASE)
+CELL_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Cells SEC tables split off numbers: "$" | "1,234" | ")" and "12.5" | "%"
+LEADING_FRAGMENTS = {'$', '€', '£', '¥'}
+TRAILING_FRAGMENT_PATTERN = re.compile(r'^[)%]+$')
+
+
+def parse_html_table(table_html: str) -> list[list[dict]]:
+    """
+    Parse table HTML into rows of non-empty cells
+
+    Empty spacer cells are dropped and split-off "$", ")" and "%" cells are
+    merged into their number.
+
+    Returns:
+        Rows of {text, column, end}: the grid columns [column, end) the cell covers
+    """
+    rows = []
+    for row_html in TABLE_ROW_PATTERN.findall(table_html):
+        cells = []
+        column = 0
+        for attrs, cell_html in TABLE_CELL_PATTERN.findall(row_html):
+            colspan = COLSPAN_PATTERN.search(attrs)
+            span = max(1, int(colspan.group(1))) if colspan else 1
+            text = CELL_WHITESPACE_PATTERN.sub(' ', extract_text_from_html(cell_html)).strip()
+            if text:
+                cells.append({"text": text, "column": column, "end": column + span})
+            column += span
+
+        merged = []
+        prefix = None
+        for cell in cells:
+            if cell["text"] in LEADING_FRAGMENTS:
+                prefix = prefix or cell
+                continue
+            if merged and TRAILING_FRAGMENT_PATTERN.match(cell["text"]):
+                merged[-1]["text"] += cell["text"]
+                continue
+            if prefix:
+                # Merged cells keep the number's grid columns: "$" and ")" may sit outside its header's span
+                cell = dict(cell, text=prefix["text"] + cell["text"])
+                prefix = None
+            merged.append(cell)
+        if prefix:
+            merged.append(prefix)
+        if merged:
+            rows.append(merged)
+    return rows
+
+
+def get_output_columns(rows: list[list[dict]]) -> list[tuple[int, int]]:
+    """
+    Group grid columns into output columns
+
+    Narrowest cells first: a cell overlapping one output column widens it
+    ("$" + "1,234" over two grid columns, a year header over three), a cell
+    overlapping none starts a new one, and a cell overlapping several (like
+    "Years ended December 31,") only spans them.
+
+    Returns:
+        Sorted, disjoint grid column ranges [start, end)
+    """
+    columns = []
+    cells = sorted((cell for row in rows for cell in row), key=lambda c: c["end"] - c["column"])
+    for cell in cells:
+        overlapping = [i for i, (start, end) in enumerate(columns) if start < cell["end"] and cell["column"] < end]
+        if not overlapping:
+            columns.append((cell["column"], cell["end"]))
+        elif len(overlapping) == 1:
+            start, end = columns[overlapping[0]]
+            columns[overlapping[0]] = (min(start, cell["column"]), max(end, cell["end"]))
+    return sorted(columns)
+
+
+def align_table_rows(rows: list[list[dict]]) -> list[list[str]]:
+    """
+    Place each cell in its output column, leaving empty strings in the gaps
+
+    A value missing for one period leaves that period's column empty instead
+    of shifting later values left; a spanning header lands in the first column it spans.
+    """
+    columns = get_output_columns(rows)
+    aligned = []
+    for row in rows:
+        texts = [''] * len(columns)
+        for cell in row:
+            i = next(i for i, (start, end) in enumerate(columns) if start < cell["end"] and cell["column"] < end)
+            texts[i] = f"{texts[i]} {cell['text']}" if texts[i] else cell["text"]
+        aligned.append(texts)
+    return aligned
+
+
+def format_table(rows: list[list[dict]], tables: str) -> str:
+    """
+    Render parsed table as a Markdown or TSV block
+
+    Layout tables (one row or one column) are rendered as plain lines.
+    """
+    if not rows:
+        return ''
+    if len(rows) == 1 or max(len(row) for row in rows) == 1:
+        return '\n'.join(' '.join(cell["text"] for cell in row) for row in rows)
+
+    aligned = align_table_rows(rows)
+    if tables == "tsv":
+        return '\n'.join('\t'.join(row) for row in aligned)
+
+    lines = []
+    for i, row in enumerate(aligned):
+        lines.append('| ' + ' | '.join(text.replace('|', '\\|') for text in row) + ' |')
+        if i == 0:
+            lines.append('|' + ' --- |' * len(row))
+    return '\n'.join(lines)
+
+
+SPACE_RUN_PATTERN = re.compile(r' +')
+TAB_PADDING_PATTERN = re.compile(r' ?\t ?')
+
+
+def extract_text_with_tables(html_content: str, tables: str) -> str:
+    """
+    Extract text with each <table> rendered as a Markdown or TSV block
+
+    Text outside tables is extracted as usual (tabs flattened to spaces in
+    TSV mode, so only table cells are tab-separated).
+    """
+    def extract_outside(fragment: str) -> str:
+        text = extract_text_from_html(fragment)
+        return text.replace('\t', ' ') if tables == "tsv" else text
+
+    parts = []
+    pos = 0
+    for match in TABLE_BLOCK_PATTERN.finditer(html_content):
+        parts.append(extract_outside(html_content[pos:match.start()]))
+        table = format_table(parse_html_table(match.group(0)), tables)
+        if table:
+            parts.append(f"\n\n{table}\n\n")
+        pos = match.end()
+    parts.append(extract_outside(html_content[pos:]))
+    return ''.join(parts)
+
+
+def clean_whitespace(content: str, keep_tabs: bool = False) -> str:
     """
     Clean excess whitespace characters
+
+    Args:
+        content: Text
+        keep_tabs: Keep tabs as column separators (TSV tables), only collapsing spaces
     """
-    # Merge multiple spaces/tabs into single
-    content = re.sub(r'[ \t]+', ' ', content)
+    if keep_tabs:
+        content = TAB_PADDING_PATTERN.sub('\t', SPACE_RUN_PATTERN.sub(' ', content))
+        lines = [line.strip(' ') if line.strip() else '' for line in content.split('\n')]
+    else:
+        # Merge multiple spaces/tabs into single
+        content = re.sub(r'[ \t]+', ' ', content)
 
-    # Clean leading/trailing whitespace per line
-    lines = [line.strip() for line in content.split('\n')]
+        # Clean leading/trailing whitespace per line
+        lines = [line.strip() for line in content.split('\n')]
 
     # Merge consecutive blank lines (keep max 2)
     result = []
@@ -132,56 +399,152 @@ def sanitize_utf8(content: str) -> str:
     return content
 
 
-def remove_xbrl_inline_data(content: str) -> str:
+# Inline XBRL metadata (<ix:header> hidden facts, contexts and units) comes out of
+# tag stripping as long lines of taxonomy names, taxonomy URLs, period dates and the
+# filer's CIK, e.g. "false2024FY0000320193http://fasb.org/us-gaap/2024#..."
+# Every branch starts with a literal character (':', '-' or the CIK), which lets
+# the regex engine skip ahead instead of trying each position of the text.
+# Dates only count on lines that also hold another token: a row of ISO dates
+# (a table header such as "2024-09-28  2023-09-30") is content on its own
+XBRL_TOKEN_PATTERN = (
+    r'://(?:[\w\-]+\.)*(?:fasb|xbrl)\.(?:org|sec\.gov)[\w.\-/#]*'  # Taxonomy URLs
+    r'|:[A-Z]\w+'  # QName local names: us-gaap:Revenues, aapl:IPhoneMember, iso4217:USD
+    r'|:(?:shares|pure)\b'  # xbrli units
+    r'|(?P<date>-\d\d-\d\d(?!\d))'  # Context period dates (2024-09-28)
+)
+HEADER_CIK_PATTERN = re.compile(r'CENTRAL INDEX KEY:\s*(\d{10})')
+XBRL_LINE_PREFIXES = ('iso4217:', 'xbrli:')
+# A line is XBRL metadata when tokens above cover this share of its non-space characters
+XBRL_DENSITY_THRESHOLD = 0.5
+# Shorter lines are never judged by density (a date or a CIK on its own is content)
+XBRL_MIN_LINE_CHARS = 40
+# Lines naming the filer's CIK more often than this are context lists
+XBRL_MAX_CIK_COUNT = 5
+
+
+def parse_header_ciks(header_text: str) -> list[str]:
+    """
+    CIKs of all filers named in a cleaned SEC header (CENTRAL INDEX KEY lines)
+    """
+    return list(dict.fromkeys(HEADER_CIK_PATTERN.findall(header_text)))
+
+
+class XbrlNoiseFilter:
+    """
+    Drops inline XBRL metadata lines for any filer
+
+    One regex pass over a whole part finds taxonomy URLs, QNames, units,
+    period dates and the filer's CIK (from the SEC header). Characters
+    covered per line are summed, and only lines with matches are scored:
+    a line goes when the matches cover most of it and include more than
+    dates, or when it names the CIK more than XBRL_MAX_CIK_COUNT times.
+    Prose and tables mention these tokens only sparsely, so they stay.
+    """
+
+    def __init__(self, ciks: list[str] = None):
+        self.set_ciks(ciks or [])
+        self.lines_removed = 0
+        self.chars_removed = 0
+
+    def set_ciks(self, ciks: list[str]):
+        """Use these filer CIKs (from the SEC header) as XBRL tokens"""
+        self.ciks = list(ciks)
+        alternatives = [XBRL_TOKEN_PATTERN] + [re.escape(cik) for cik in self.ciks]
+        self.pattern = re.compile('|'.join(alternatives))
+
+    def is_noise(self, line: str, covered: int, dates_only: bool = False) -> bool:
+        """
+        Score one line that contains covered characters of XBRL tokens
+
+        Args:
+            line: Line text
+            covered: Characters of the line matched as XBRL tokens
+            dates_only: Every match was a period date (never judged by density)
+        """
+        if line.startswith(XBRL_LINE_PREFIXES):
+            return True
+        if 'http://fasb.org/us-gaap' in line and line.count('http://') > 3:
+            return True
+        if any(line.count(cik) > XBRL_MAX_CIK_COUNT for cik in self.ciks):
+            return True
+        if dates_only:
+            return False
+        chars = len(line) - line.count(' ') - line.count('\t')
+        return chars >= XBRL_MIN_LINE_CHARS and covered >= chars * XBRL_DENSITY_THRESHOLD
+
+    def filter(self, text: str) -> str:
+        """
+        Remove XBRL metadata lines from text (a complete set of lines)
+        """
+        covered = {}
+        anchored = set()  # Lines with a match other than a date
+        line = position = 0
+        for match in self.pattern.finditer(text):
+            start = match.start()
+            # Matches arrive in order, count line breaks since the previous one
+            line += text.count('\n', position, start)
+            position = start
+            covered[line] = covered.get(line, 0) + match.end() - start
+            if match.lastgroup != 'date':
+                anchored.add(line)
+        if not covered:
+            return text
+
+        lines = text.split('\n')
+        noise = [i for i, count in covered.items() if self.is_noise(lines[i], count, i not in anchored)]
+        if not noise:
+            return text
+        for i in noise:
+            self.chars_removed += len(lines[i]) + 1
+            lines[i] = None
+        self.lines_removed += len(noise)
+        return '\n'.join(line for line in lines if line is not None)
+
+
+def remove_xbrl_inline_data(content: str, ciks: list[str] = None) -> str:
     """
     Remove XBRL inline metadata
 
     These are machine-readable tag data, useless for human analysis:
     - FASB URL references (http://fasb.org/us-gaap/...)
-    - XBRL context identifiers (0000723125...)
+    - XBRL context identifiers (filer CIK, period dates, dimension members)
     - ISO currency/unit codes (iso4217:USD, xbrli:shares)
+
+    Args:
+        content: Text to filter
+        ciks: Filer CIKs (see parse_header_ciks), improves context detection
     """
-    lines = content.split('\n')
-    cleaned_lines = []
+    return XbrlNoiseFilter(ciks).filter(content)
 
-    for line in lines:
-        # Skip lines with many XBRL identifiers
-        # Feature: contains multiple http://fasb.org or us-gaap: references
-        if 'http://fasb.org/us-gaap' in line and line.count('http://') > 3:
-            continue
 
-        # Skip lines with many XBRL context IDs (format like 0000723125...Member)
-        if re.search(r'0000723125\d{10,}', line) and line.count('0000723125') > 5:
-            continue
+# Completely skip these document types (meaningless for financial analysis)
+SKIP_DOC_TYPES = [
+    'GRAPHIC',      # Image files
+    'ZIP',          # Archives (usually XBRL)
+    'JSON',         # JSON metadata
+    'XBRL', 'XML', 'XSD',  # XBRL related
+]
 
-        # Skip ISO currency/unit definition lines
-        if line.startswith('iso4217:') or line.startswith('xbrli:'):
-            continue
 
-        cleaned_lines.append(line)
+def is_skipped_doc_type(doc_type: str) -> bool:
+    """
+    Check whether a document type is dropped entirely by the cleaner
+    """
+    if doc_type in SKIP_DOC_TYPES or any(x in doc_type for x in SKIP_DOC_TYPES):
+        return True
 
-    return '\n'.join(cleaned_lines)
+    # Completely skip EX-101.* types (XBRL technical files)
+    return doc_type.startswith('EX-101.')
 
 
-def process_document(doc_content: str, doc_type: str) -> str:
+def process_document(doc_content: str, doc_type: str, tables: str = "text") -> str:
     """
-    Process single document block
+    Process single document block (tables: see extract_text_from_html)
 
     Returns:
         Processed text content, returns None to completely skip document
     """
-    # Completely skip these document types (meaningless for financial analysis)
-    skip_types = [
-        'GRAPHIC',      # Image files
-        'ZIP',          # Archives (usually XBRL)
-        'JSON',         # JSON metadata
-        'XBRL', 'XML', 'XSD',  # XBRL related
-    ]
-    if doc_type in skip_types or any(x in doc_type for x in skip_types):
-        return None
-
-    # Completely skip EX-101.* types (XBRL technical files)
-    if doc_type.startswith('EX-101.'):
+    if is_skipped_doc_type(doc_type):
         return None
 
     # For other document types (HTML, text, etc.), extract content
@@ -194,20 +557,837 @@ def process_document(doc_content: str, doc_type: str) -> str:
     if text_match:
         text_content = text_match.group(1)
         # Extract text from HTML
-        text_content = extract_text_from_html(text_content)
+        text_content = extract_text_from_html(text_content, tables)
     else:
-        text_content = extract_text_from_html(doc_content)
+        text_content = extract_text_from_html(doc_content, tables)
 
     return text_content
 
 
-def clean_sec_filing(input_path: str, output_path: str = None) -> str:
+# SGML markers of an EDGAR submission, scanned in a single pass by iter_submission_tokens
+SEC_HEADER_PATTERN = re.compile(r'<SEC-HEADER>(.*?)</SEC-HEADER>', re.DOTALL)
+DOC_TYPE_PATTERN = re.compile(r'<TYPE>([^<\n]+)')
+DOC_DESCRIPTION_PATTERN = re.compile(r'<DESCRIPTION>([^<\n]+)')
+DOC_FILENAME_PATTERN = re.compile(r'<FILENAME>([^<\n]+)')
+TAG_PATTERN = re.compile(r'<[^>]+>')
+WHITESPACE_RUN_PATTERN = re.compile(r'[ \t]+')
+
+DOC_START = '<DOCUMENT>'
+DOC_END = '</DOCUMENT>'
+SEPARATOR = "=" * 60
+
+
+def iter_submission_tokens(content: str):
+    """
+    Scan submission text once, yielding SGML tokens in file order
+
+    Yields:
+        ('header', header_text) for the <SEC-HEADER> block (at most once, first)
+        ('document', doc_text) for each <DOCUMENT>...</DOCUMENT> body
+
+    Document bodies are sliced one at a time instead of being collected
+    up front with re.findall, so only the current document is copied
+    """
+    header_match = SEC_HEADER_PATTERN.search(content)
+    if header_match:
+        yield 'header', header_match.group(1)
+
+    pos = 0
+    while True:
+        start = content.find(DOC_START, pos)
+        if start < 0:
+            return
+        start += len(DOC_START)
+        end = content.find(DOC_END, start)
+        if end < 0:
+            return
+        yield 'document', content[start:end]
+        pos = end + len(DOC_END)
+
+
+def clean_header(header: str) -> str:
+    """
+    Clean SEC header block (tags removed, whitespace cleaned)
+    """
+    return clean_whitespace(TAG_PATTERN.sub('', header))
+
+
+def format_header(header_text: str) -> str:
+    """
+    Format cleaned SEC header with its banner
+    """
+    return '\n'.join([SEPARATOR, "SEC FILING HEADER", SEPARATOR, header_text])
+
+
+def clean_document(doc: str, index: int, tables: str = "text") -> Optional[dict]:
+    """
+    Clean single <DOCUMENT> body
+
+    Args:
+        doc: Document body (between <DOCUMENT> and </DOCUMENT>)
+        index: 1-based position of document in submission
+        tables: Table rendering, "text", "markdown" or "tsv"
+
+    Returns:
+        Record dict with index, type, description, filename and cleaned text,
+        None if document is skipped or has no content
+    """
+    # Extract document type
+    type_match = DOC_TYPE_PATTERN.search(doc)
+    doc_type = type_match.group(1).strip() if type_match else f'DOCUMENT_{index}'
+
+    # Process document content (returns None to skip)
+    processed = process_document(doc, doc_type, tables)
+    if processed is None:
+        return None  # Completely skip useless documents
+
+    processed = clean_whitespace(processed, keep_tabs=tables == "tsv")
+    if not processed.strip():
+        return None  # Skip empty content
+
+    desc_match = DOC_DESCRIPTION_PATTERN.search(doc)
+    filename_match = DOC_FILENAME_PATTERN.search(doc)
+
+    return {
+        "kind": "document",
+        "index": index,
+        "type": doc_type,
+        "description": desc_match.group(1).strip() if desc_match else '',
+        "filename": filename_match.group(1).strip() if filename_match else '',
+        "text": processed,
+    }
+
+
+def iter_cleaned_documents(tokens, stats: dict = None, tables: str = "text"):
+    """
+    Clean documents from a token stream, yielding each record as it completes
+
+    Args:
+        tokens: Iterable of (kind, text) from iter_submission_tokens or iter_submission_stream
+        stats: Optional dict, updated with documents/documents_kept counts
+        tables: Table rendering, "text", "markdown" or "tsv"
+
+    Yields:
+        {'kind': 'header', 'text': ...} for the SEC header,
+        then one clean_document record per kept document
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("documents", 0)
+    stats.setdefault("documents_kept", 0)
+    stats.setdefault("documents_skipped_raw", 0)
+    stats.setdefault("skipped_bytes", 0)
+
+    for kind, value in tokens:
+        if kind == 'header':
+            if value:
+                yield {"kind": "header", "text": clean_header(value)}
+            continue
+
+        stats["documents"] += 1
+        if kind == 'skipped':
+            # Classified as skipped from raw bytes, body never decoded
+            stats["documents_skipped_raw"] += 1
+            stats["skipped_bytes"] += value["end"] - value["start"]
+            continue
+        document = clean_document(value, stats["documents"], tables)
+        if document is None:
+            continue
+        stats["documents_kept"] += 1
+        yield document
+
+
+def format_record(record: dict) -> str:
+    """
+    Format header or document record for output
+    """
+    if record['kind'] == 'header':
+        return format_header(record['text'])
+    return format_document(record)
+
+
+def format_document(document: dict) -> str:
+    """
+    Format cleaned document with its DOCUMENT/DESCRIPTION/FILENAME banner
+    """
+    parts = ["", SEPARATOR, f"DOCUMENT: {document['type']}"]
+    if document['description']:
+        parts.append(f"DESCRIPTION: {document['description']}")
+    if document['filename']:
+        parts.append(f"FILENAME: {document['filename']}")
+    parts.append(SEPARATOR)
+    parts.append(document['text'])
+    return '\n'.join(parts)
+
+
+class CleanedTextWriter:
+    """
+    Incremental output stage of the cleaner
+
+    The original pipeline joined every document into one string and then ran
+    clean_whitespace, sanitize_utf8, remove_xbrl_inline_data and clean_whitespace
+    again over the whole result. All of these passes are line-local except the
+    blank-line limit, so this writer applies them to each part as it arrives and
+    carries the blank-line counters across parts. Output is identical to the
+    whole-string passes, but only one part is held in memory at a time.
+    """
+
+    def __init__(self, write, keep_tabs: bool = False):
+        """
+        Args:
+            write: Callable receiving cleaned text chunks in order
+            keep_tabs: Keep tabs (TSV tables) instead of collapsing them to spaces
+        """
+        self._write = write
+        self._keep_tabs = keep_tabs
+        self.xbrl_filter = XbrlNoiseFilter()
+        self._blank_runs = [0, 0]
+        self._started = False
+        self.chars_written = 0
+
+    def _collapse(self, text: str, stage: int) -> list[str]:
+        """clean_whitespace on one part, keeping blank-line count across parts"""
+        if self._keep_tabs:
+            text = TAB_PADDING_PATTERN.sub('\t', SPACE_RUN_PATTERN.sub(' ', text))
+        else:
+            text = WHITESPACE_RUN_PATTERN.sub(' ', text)
+        result = []
+        empty_count = self._blank_runs[stage]
+        for line in text.split('\n'):
+            line = line.strip(' ') if self._keep_tabs and line.strip() else line.strip()
+            if not line:
+                empty_count += 1
+                if empty_count <= 2:
+                    result.append('')
+            else:
+                empty_count = 0
+                result.append(line)
+        self._blank_runs[stage] = empty_count
+        return result
+
+    def write(self, part: str):
+        """Clean and emit one part (a complete set of lines)"""
+        lines = self._collapse(part, 0)
+        if not lines:
+            return
+
+        text = sanitize_utf8('\n'.join(lines))
+        text = self.xbrl_filter.filter(text)
+        lines = self._collapse(text, 1)
+        if not lines:
+            return
+
+        chunk = '\n'.join(lines)
+        if self._started:
+            chunk = '\n' + chunk
+        self._started = True
+        self.chars_written += len(chunk)
+        self._write(chunk)
+
+
+# Paragraph dedup: only paragraphs at least this long are compared
+DEDUP_MIN_CHARS = 200
+PARAGRAPH_BREAK_PATTERN = re.compile(r'(\n{2,})')
+DEDUP_WORD_PATTERN = re.compile(r'\w+')
+DIGIT_RUN_PATTERN = re.compile(r'\d+')
+SHINGLE_WORDS = 5
+# One-permutation MinHash: shingle hashes spread over bins, minimum kept per bin;
+# LSH buckets on bands of bins find near-duplicate candidates
+MINHASH_BINS = 32
+LSH_BANDS = 8
+NEAR_DUPLICATE_THRESHOLD = 0.85
+REFERENCE_PREVIEW_CHARS = 60
+
+
+def minhash_signature(words: list[str]) -> tuple:
+    """
+    One-permutation MinHash of a paragraph's word shingles (None = empty bin)
+    """
+    signature = [None] * MINHASH_BINS
+    for i in range(max(1, len(words) - SHINGLE_WORDS + 1)):
+        h = zlib.crc32(' '.join(words[i:i + SHINGLE_WORDS]).encode('utf-8'))
+        slot, value = h % MINHASH_BINS, h // MINHASH_BINS
+        if signature[slot] is None or value < signature[slot]:
+            signature[slot] = value
+    return tuple(signature)
+
+
+def estimate_similarity(a: tuple, b: tuple) -> float:
+    """
+    Jaccard similarity estimate from two signatures, over bins used by either
+    """
+    used = matches = 0
+    for x, y in zip(a, b):
+        if x is None and y is None:
+            continue
+        used += 1
+        matches += x == y
+    return matches / used if used else 0.0
+
+
+class ParagraphDeduplicator:
+    """
+    Replaces repeated paragraphs of cleaned documents with short references
+
+    Exact repeats (whitespace-insensitive) of any paragraph of DEDUP_MIN_CHARS
+    or more are replaced. Near-duplicates are found by MinHash/LSH and replaced
+    only when they contain the same numbers in the same order and are not
+    tables, so differing figures are never dropped. Only signatures and a short
+    preview per paragraph are kept, so memory stays small in stream mode.
+    """
+
+    def __init__(self, tokenizer=None):
+        """
+        Args:
+            tokenizer: Tokenizer for tokens_saved (default: filing approximation, created once)
+        """
+        self.tokenizer = tokenizer or FilingTokenizer()
+        self._exact = {}
+        self._signatures = []
+        self._buckets = {}
+        self.stats = {"paragraphs": 0, "exact": 0, "near": 0, "bytes_saved": 0, "tokens_saved": 0}
+
+    def _reference(self, first: dict, omitted: str, similarity: float = None) -> str:
+        kind = "Duplicate" if similarity is None else f"Near-duplicate ({similarity:.0%} similar)"
+        return f'[{kind} of text first seen in {first["type"]} ({len(omitted):,} chars omitted): "{first["preview"]}..."]'
+
+    def _replace(self, paragraph: str, reference: str, kind: str) -> str:
+        self.stats[kind] += 1
+        self.stats["bytes_saved"] += len(paragraph.encode('utf-8')) - len(reference.encode('utf-8'))
+        self.stats["tokens_saved"] += count_tokens(paragraph, self.tokenizer) - count_tokens(reference, self.tokenizer)
+        return reference
+
+    def dedup_paragraph(self, paragraph: str, doc_type: str) -> str:
+        """
+        Paragraph unchanged, or a reference to its first occurrence
+        """
+        if len(paragraph) < DEDUP_MIN_CHARS:
+            return paragraph
+        self.stats["paragraphs"] += 1
+        normalized = ' '.join(paragraph.split())
+        key = hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest()
+        first = self._exact.get(key)
+        if first is not None:
+            return self._replace(paragraph, self._reference(first, paragraph), "exact")
+
+        info = {"type": doc_type, "preview": normalized[:REFERENCE_PREVIEW_CHARS]}
+        self._exact[key] = info
+        if '\t' in paragraph or paragraph.startswith('|'):
+            return paragraph
+
+        words = DEDUP_WORD_PATTERN.findall(normalized.lower())
+        signature = minhash_signature(words)
+        numbers = DIGIT_RUN_PATTERN.findall(normalized)
+        rows = MINHASH_BINS // LSH_BANDS
+        bands = [(band, signature[band * rows:(band + 1) * rows]) for band in range(LSH_BANDS)]
+        bands = [b for b in bands if any(v is not None for v in b[1])]
+
+        candidates = {i for b in bands for i in self._buckets.get(b, ())}
+        for i in sorted(candidates):
+            other_signature, other_numbers, other_info = self._signatures[i]
+            if other_numbers != numbers:
+                continue
+            similarity = estimate_similarity(signature, other_signature)
+            if similarity >= NEAR_DUPLICATE_THRESHOLD:
+                return self._replace(paragraph, self._reference(other_info, paragraph, similarity), "near")
+
+        index = len(self._signatures)
+        self._signatures.append((signature, numbers, info))
+        for b in bands:
+            self._buckets.setdefault(b, []).append(index)
+        return paragraph
+
+    def dedup_record(self, record: dict) -> dict:
+        """
+        Record with repeated paragraphs of its text replaced (header records unchanged)
+        """
+        if record['kind'] != 'document':
+            return record
+        parts = PARAGRAPH_BREAK_PATTERN.split(record['text'])
+        # Even parts are paragraphs, odd parts the blank-line runs between them
+        for i in range(0, len(parts), 2):
+            parts[i] = self.dedup_paragraph(parts[i], record['type'])
+        return dict(record, text=''.join(parts))
+
+
+def clean_submission(content: str, write, tables: str = "text", dedup: bool = False) -> dict:
+    """
+    Cleaning engine: scan submission once and emit cleaned text incrementally
+
+    Args:
+        content: Decoded full-submission text
+        write: Callable receiving cleaned text chunks in order
+        tables: Table rendering, "text", "markdown" or "tsv"
+        dedup: Replace repeated paragraphs with references (ParagraphDeduplicator)
+
+    Returns:
+        Stats dict (documents seen, documents kept, characters written)
+    """
+    return write_cleaned(iter_submission_tokens(content), write, tables=tables, dedup=dedup)
+
+
+def write_cleaned(tokens, write, stats: dict = None, tables: str = "text", dedup: bool = False) -> dict:
+    """
+    Clean token stream and emit formatted output through CleanedTextWriter
+
+    Args:
+        tokens: Iterable of (kind, text) SGML tokens
+        write: Callable receiving cleaned text chunks in order
+        stats: Optional dict to collect stats into
+        tables: Table rendering, "text", "markdown" or "tsv"
+        dedup: Replace repeated paragraphs with references
+
+    Returns:
+        Stats dict
+    """
+    if stats is None:
+        stats = {}
+    return write_records(iter_cleaned_documents(tokens, stats, tables), write, stats, tables, dedup)
+
+
+def write_records(records, write, stats: dict, tables: str = "text", dedup: bool = False) -> dict:
+    """
+    Emit cleaned header/document records in order through CleanedTextWriter
+
+    Returns:
+        Stats dict with cleaned_chars (and dedup stats when deduplicating) added
+    """
+    writer = CleanedTextWriter(write, keep_tabs=tables == "tsv")
+    deduplicator = ParagraphDeduplicator() if dedup else None
+    for record in records:
+        if record["kind"] == "header":
+            writer.xbrl_filter.set_ciks(parse_header_ciks(record["text"]))
+        if deduplicator is not None:
+            record = deduplicator.dedup_record(record)
+        writer.write(format_record(record))
+    stats["cleaned_chars"] = writer.chars_written
+    stats["xbrl_lines_removed"] = writer.xbrl_filter.lines_removed
+    stats["xbrl_chars_removed"] = writer.xbrl_filter.chars_removed
+    if deduplicator is not None:
+        stats["dedup"] = deduplicator.stats
+    return stats
+
+
+# Streaming mode reads the raw submission in chunks of this size
+READ_CHUNK_SIZE = 1 << 20
+
+# Bytes of a document inspected for its <TYPE> before deciding to skip it
+TYPE_PEEK_SIZE = 64 * 1024
+RAW_TYPE_PATTERN = FIELD_PATTERNS["type"]
+
+
+def decode_submission_bytes(data) -> str:
+    """
+    Decode raw submission bytes the same way Path.read_text does
+    (UTF-8 with replacement, universal newlines)
+    """
+    text = bytes(data).decode('utf-8', errors='replace')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def classify_raw_document(head, complete: bool) -> Optional[str]:
+    """
+    Read document type from the raw bytes at the start of a <DOCUMENT> body
+
+    Args:
+        head: Leading bytes of the document body
+        complete: True if head is the whole body
+
+    Returns:
+        Document type, None if it can't be decided from these bytes yet
+        (no <TYPE> before <TEXT>, or the value may continue past head)
+    """
+    text_pos = head.find(TEXT_START)
+    region_end = text_pos if text_pos >= 0 else len(head)
+    match = RAW_TYPE_PATTERN.search(head, 0, region_end)
+    if match is None:
+        return None
+    if text_pos < 0 and not complete and match.end() >= len(head):
+        return None
+    return match.group(1).decode('utf-8', errors='replace').strip()
+
+
+def iter_submission_stream(stream, chunk_size: int = READ_CHUNK_SIZE, stats: dict = None):
+    """
+    Incremental counterpart of iter_submission_tokens over a binary stream
+
+    Only the current document is buffered: bytes before the first <DOCUMENT>
+    are kept until it appears (they hold the SEC header), bytes between
+    documents are discarded. Peak memory is bounded by the largest kept document.
+
+    Each document's type is read from its raw SGML header first. Types the
+    cleaner drops (GRAPHIC, ZIP, EX-101.*, ...) are passed over by searching
+    for </DOCUMENT> only, without buffering, decoding or regex-scanning the body.
+
+    Args:
+        stream: Binary file object positioned at start of submission
+        chunk_size: Bytes to read per call
+        stats: Optional dict, updated with bytes_read
+
+    Yields:
+        Same ('header', text) / ('document', text) tokens as iter_submission_tokens,
+        plus ('skipped', entry) with index, type and byte range for dropped documents
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("bytes_read", 0)
+
+    doc_start = DOC_START.encode()
+    doc_end = DOC_END.encode()
+    buf = bytearray()
+    base = 0  # File offset of buf[0]
+    state = 'preamble'  # preamble -> (peek -> document | skipping -> between)*
+    scanned = 0  # Offset in buf already searched for the current marker
+    doc_no = 0
+    entry = None
+    eof = False
+
+    while True:
+        if state in ('preamble', 'between'):
+            found = buf.find(doc_start, scanned)
+            if found >= 0:
+                if state == 'preamble':
+                    header_match = SEC_HEADER_PATTERN.search(decode_submission_bytes(buf[:found]))
+                    if header_match:
+                        yield 'header', header_match.group(1)
+                consumed = found + len(doc_start)
+                del buf[:consumed]
+                base += consumed
+                doc_no += 1
+                state = 'peek'
+                scanned = 0
+                continue
+            scanned = max(0, len(buf) - len(doc_start) + 1)
+            if state == 'between':
+                del buf[:scanned]
+                base += scanned
+                scanned = 0
+
+        elif state == 'skipping':
+            found = buf.find(doc_end)
+            if found >= 0:
+                entry["end"] = base + found
+                yield 'skipped', entry
+                consumed = found + len(doc_end)
+                del buf[:consumed]
+                base += consumed
+                state = 'between'
+                scanned = 0
+                continue
+            # Drop everything except a possible partial </DOCUMENT>
+            drop = max(0, len(buf) - len(doc_end) + 1)
+            del buf[:drop]
+            base += drop
+
+        else:  # peek / document
+            found = buf.find(doc_end, scanned)
+            if found >= 0:
+                doc_type = classify_raw_document(buf[:found], True) if state == 'peek' else None
+                if doc_type and is_skipped_doc_type(doc_type):
+                    yield 'skipped', {"index": doc_no, "type": doc_type, "start": base, "end": base + found}
+                else:
+                    yield 'document', decode_submission_bytes(buf[:found])
+                consumed = found + len(doc_end)
+                del buf[:consumed]
+                base += consumed
+                state = 'between'
+                scanned = 0
+                continue
+            scanned = max(0, len(buf) - len(doc_end) + 1)
+
+            if state == 'peek' and (len(buf) >= TYPE_PEEK_SIZE or buf.find(TEXT_START) >= 0):
+                doc_type = classify_raw_document(buf, False)
+                if doc_type and is_skipped_doc_type(doc_type):
+                    entry = {"index": doc_no, "type": doc_type, "start": base}
+                    state = 'skipping'
+                    continue
+                state = 'document'
+
+        if eof:
+            break
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        else:
+            stats["bytes_read"] += len(chunk)
+            buf += chunk
+
+    if state == 'preamble':
+        # No documents at all, header may still be present
+        header_match = SEC_HEADER_PATTERN.search(decode_submission_bytes(buf))
+        if header_match:
+            yield 'header', header_match.group(1)
+
+
+def iter_indexed_tokens(read, index: dict):
+    """
+    Yield SGML tokens for a submission using its offset index
+
+    Documents whose indexed type is skipped by the cleaner are yielded as
+    ('skipped', entry) without reading or decoding their bytes.
+
+    Args:
+        read: Callable (start, end) -> bytes for the raw submission
+        index: Index from filing_index.load_or_build_filing_index
+    """
+    if index["header"]:
+        yield 'header', decode_submission_bytes(read(*index["header"]))
+
+    for entry in index["documents"]:
+        doc_type = entry["type"] or f'DOCUMENT_{entry["index"]}'
+        if is_skipped_doc_type(doc_type):
+            yield 'skipped', entry
+            continue
+        yield 'document', decode_submission_bytes(read(entry["start"], entry["end"]))
+
+
+def file_range_reader(f):
+    """
+    Range reader over a seekable binary file, for iter_indexed_tokens
+    """
+    def read(start: int, end: int) -> bytes:
+        f.seek(start)
+        return f.read(end - start)
+    return read
+
+
+def iter_clean_filing(
+    input_path: str,
+    chunk_size: int = READ_CHUNK_SIZE,
+    stats: dict = None,
+    tables: str = "text"
+):
+    """
+    Generator API: read filing incrementally and yield cleaned records
+
+    Args:
+        input_path: Input file path (full-submission.txt)
+        chunk_size: Bytes to read per call
+        stats: Optional dict to collect reader/cleaner stats into
+        tables: Table rendering, "text", "markdown" or "tsv"
+
+    Yields:
+        Header record first, then one record per kept document, each with
+        kind, index, type, description, filename and text
+        (text is per-document cleaned, before the whole-output passes)
+    """
+    with open(input_path, 'rb') as f:
+        yield from iter_cleaned_documents(iter_submission_stream(f, chunk_size, stats), stats, tables)
+
+
+# Intra-filing parallelism only pays off for large submissions
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+
+def clean_indexed_document(input_path: str, entry: dict, tables: str = "text") -> Optional[dict]:
+    """
+    Read, decode and clean one indexed document (runs inside worker process)
+
+    Workers receive only the path and byte range, and return the cleaned
+    record, so large raw bodies are never pickled between processes.
+    """
+    with open(input_path, 'rb') as f:
+        data = file_range_reader(f)(entry["start"], entry["end"])
+    return clean_document(decode_submission_bytes(data), entry["index"], tables)
+
+
+def iter_cleaned_documents_parallel(
+    input_path: str,
+    index: dict,
+    workers: int,
+    stats: dict = None,
+    tables: str = "text"
+):
+    """
+    Clean indexed documents concurrently, yielding records in original order
+
+    Largest documents are submitted first so the long pole starts early;
+    records are yielded as soon as every earlier document has finished.
+
+    Args:
+        input_path: Raw submission path
+        index: Offset index for the submission
+        workers: Worker process count
+        stats: Optional dict, updated like iter_cleaned_documents
+        tables: Table rendering, "text", "markdown" or "tsv"
+
+    Yields:
+        Same records as iter_cleaned_documents
+    """
+    if stats is None:
+        stats = {}
+    for key in ("documents", "documents_kept", "documents_skipped_raw", "skipped_bytes"):
+        stats.setdefault(key, 0)
+
+    if index["header"]:
+        with open(input_path, 'rb') as f:
+            header = decode_submission_bytes(file_range_reader(f)(*index["header"]))
+        if header:
+            yield {"kind": "header", "text": clean_header(header)}
+
+    kept = []
+    for entry in index["documents"]:
+        stats["documents"] += 1
+        if is_skipped_doc_type(entry["type"] or f'DOCUMENT_{entry["index"]}'):
+            stats["documents_skipped_raw"] += 1
+            stats["skipped_bytes"] += entry["end"] - entry["start"]
+        else:
+            kept.append(entry)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for entry in sorted(kept, key=lambda e: e["end"] - e["start"], reverse=True):
+            futures[entry["index"]] = pool.submit(clean_indexed_document, input_path, entry, tables)
+
+        for entry in kept:
+            record = futures.pop(entry["index"]).result()
+            if record is not None:
+                stats["documents_kept"] += 1
+                yield record
+
+
+def should_clean_in_parallel(index: dict, workers: int) -> bool:
+    """
+    Use worker processes only if allowed and the kept documents are large enough
+    """
+    if workers <= 1:
+        return False
+    kept = [
+        entry for entry in index["documents"]
+        if not is_skipped_doc_type(entry["type"] or f'DOCUMENT_{entry["index"]}')
+    ]
+    kept_bytes = sum(entry["end"] - entry["start"] for entry in kept)
+    return len(kept) > 1 and kept_bytes >= PARALLEL_MIN_BYTES
+
+
+def print_clean_summary(output_file: Path, stats: dict, original_size: int, cleaned_size: int):
+    """
+    Print cleaning summary (document counts, bytes skipped before decode, sizes)
+    """
+    reduction = (1 - cleaned_size / original_size) * 100 if original_size else 0.0
+    skipped_share = stats.get("skipped_bytes", 0) / original_size * 100 if original_size else 0.0
+
+    print(f"Cleaning complete: {output_file}")
+    print(f"Documents: {stats.get('documents_kept', 0)} kept / {stats.get('documents', 0)} total")
+    print(f"Skipped before decode: {stats.get('documents_skipped_raw', 0)} documents, "
+          f"{stats.get('skipped_bytes', 0):,} bytes ({skipped_share:.1f}%)")
+    print(f"Original size: {original_size:,} bytes")
+    print(f"Cleaned size: {cleaned_size:,} bytes")
+    print(f"Compression: {reduction:.1f}%")
+    if stats.get("xbrl_lines_removed"):
+        print(f"XBRL metadata removed: {stats['xbrl_lines_removed']:,} lines, "
+              f"{stats['xbrl_chars_removed']:,} characters")
+    if "dedup" in stats:
+        dedup = stats["dedup"]
+        print(f"Deduplicated: {dedup['exact'] + dedup['near']} of {dedup['paragraphs']} paragraphs "
+              f"({dedup['exact']} exact, {dedup['near']} near), "
+              f"{dedup['bytes_saved']:,} bytes / {dedup['tokens_saved']:,} tokens saved")
+
+
+def clean_sec_filing_stream(
+    input_path: str,
+    output_path: str = None,
+    chunk_size: int = READ_CHUNK_SIZE,
+    tables: str = "text",
+    table_index: str = None,
+    section_index: bool = False,
+    dedup: bool = False,
+    xbrl_facts: str = None
+) -> dict:
+    """
+    Clean SEC filing in bounded memory, writing directly to the output file
+
+    Produces the same cleaned.txt as clean_sec_filing but never holds the
+    whole submission or the whole result in memory. If a valid offset index
+    already exists next to the filing, kept documents are read by seeking to
+    their byte ranges and skipped documents are not read at all.
+
+    Args:
+        input_path: Input file path (full-submission.txt)
+        output_path: Output file path (optional, defaults to cleaned.txt in same directory)
+        chunk_size: Bytes to read per call
+        tables: Table rendering, "text", "markdown" or "tsv"
+        table_index: Also write the table sidecar index in this format ("json" or "parquet")
+        section_index: Also write the Item section index (cleaned.sections.json)
+        dedup: Replace repeated and near-duplicate paragraphs with references
+        xbrl_facts: Also write the XBRL facts sidecar in this format ("json" or "parquet")
+
+    Returns:
+        Stats dict (bytes read, documents, output path and size)
+    """
+    input_file = Path(input_path)
+
+    if not input_file.exists():
+        raise FileNotFoundError(f"File not found: {input_path}")
+
+    if output_path is None:
+        output_file = input_file.parent / 'cleaned.txt'
+    else:
+        output_file = Path(output_path)
+
+    print(f"Reading (stream): {input_path}")
+    stats = {}
+    index = load_filing_index(str(input_file))
+    # Write to temp file and rename, never truncating a hardlinked cache entry
+    tmp_file = output_file.with_name(output_file.name + '.tmp')
+    with open(input_file, 'rb') as src, open(tmp_file, 'w', encoding='utf-8') as dst:
+        if index is not None:
+            tokens = iter_indexed_tokens(file_range_reader(src), index)
+        else:
+            tokens = iter_submission_stream(src, chunk_size, stats)
+        write_cleaned(tokens, dst.write, stats, tables, dedup)
+    tmp_file.replace(output_file)
+
+    original_size = input_file.stat().st_size
+    cleaned_size = output_file.stat().st_size
+    stats["output"] = str(output_file)
+    stats["cleaned_bytes"] = cleaned_size
+    print_clean_summary(output_file, stats, original_size, cleaned_size)
+    if table_index:
+        write_table_sidecar(str(output_file), table_index)
+    if section_index:
+        write_section_sidecar(str(output_file))
+    if xbrl_facts:
+        write_facts_sidecar(str(input_file), xbrl_facts)
+
+    return stats
+
+
+def clean_sec_filing(
+    input_path: str,
+    output_path: str = None,
+    workers: int = 1,
+    tables: str = "text",
+    table_index: str = None,
+    section_index: bool = False,
+    dedup: bool = False,
+    xbrl_facts: str = None
+) -> str:
     """
     Clean SEC filing file
 
+    Memory-maps the submission and uses its offset index (built and saved
+    as full-submission.index.json on first run), so skipped document types
+    are never decoded. Output is unchanged.
+
     Args:
         input_path: Input file path (full-submission.txt)
         output_path: Output file path (optional, defaults to cleaned.txt in same directory)
+        workers: Clean documents in this many processes when the filing's kept
+            documents exceed PARALLEL_MIN_BYTES (default 1: single process)
+        tables: Table rendering: "text" (cells joined by spaces, default), "markdown"
+            or "tsv" (each <table> as a compact block, spacer cells dropped)
+        table_index: Also write cleaned.tables.json / .parquet ("json" or "parquet"),
+            locating every Markdown/TSV table by heading and byte offset
+        section_index: Also write cleaned.sections.json, locating the 10-K/10-Q/20-F
+            Item sections (Item 1, 1A, 7, 8, ...) by byte offset with token estimates
+        dedup: Replace repeated paragraphs (forward-looking statement disclaimers,
+            certifications, signature pages, ...) with short references to their
+            first occurrence, and report bytes/tokens saved
+        xbrl_facts: Also write full-submission.facts.json / .parquet ("json" or "parquet"),
+            the filing's XBRL facts (concept, period, unit, value, dimensions)
 
     Returns:
         Cleaned text content
@@ -219,74 +1399,21 @@ def clean_sec_filing(input_path: str, output_path: str = None) -> str:
 
     # Read file
     print(f"Reading: {input_path}")
-    content = input_file.read_text(encoding='utf-8', errors='replace')
-    original_size = len(content)
-
-    # Extract SEC header info
-    header_match = re.search(r'<SEC-HEADER>(.*?)</SEC-HEADER>', content, re.DOTALL)
-    header = header_match.group(1) if header_match else ''
-
-    # Extract and process each document
-    doc_pattern = r'<DOCUMENT>(.*?)</DOCUMENT>'
-    documents = re.findall(doc_pattern, content, re.DOTALL)
-
-    result_parts = []
-
-    # Add cleaned header info
-    if header:
-        result_parts.append("=" * 60)
-        result_parts.append("SEC FILING HEADER")
-        result_parts.append("=" * 60)
-        # Clean tags from header
-        clean_header = re.sub(r'<[^>]+>', '', header)
-        clean_header = clean_whitespace(clean_header)
-        result_parts.append(clean_header)
-
-    # Process each document
-    for i, doc in enumerate(documents, 1):
-        # Extract document type
-        type_match = re.search(r'<TYPE>([^<\n]+)', doc)
-        doc_type = type_match.group(1).strip() if type_match else f'DOCUMENT_{i}'
-
-        # Process document content (returns None to skip)
-        processed = process_document(doc, doc_type)
-        if processed is None:
-            continue  # Completely skip useless documents
-
-        processed = clean_whitespace(processed)
-        if not processed.strip():
-            continue  # Skip empty content
-
-        # Extract document description
-        desc_match = re.search(r'<DESCRIPTION>([^<\n]+)', doc)
-        doc_desc = desc_match.group(1).strip() if desc_match else ''
-
-        # Extract filename
-        filename_match = re.search(r'<FILENAME>([^<\n]+)', doc)
-        doc_filename = filename_match.group(1).strip() if filename_match else ''
-
-        result_parts.append("")
-        result_parts.append("=" * 60)
-        result_parts.append(f"DOCUMENT: {doc_type}")
-        if doc_desc:
-            result_parts.append(f"DESCRIPTION: {doc_desc}")
-        if doc_filename:
-            result_parts.append(f"FILENAME: {doc_filename}")
-        result_parts.append("=" * 60)
-        result_parts.append(processed)
-
-    # Merge results
-    result = '\n'.join(result_parts)
-    result = clean_whitespace(result)
-
-    # UTF-8 encoding cleanup, ensure file can be safely uploaded to API
-    result = sanitize_utf8(result)
-
-    # Remove XBRL inline metadata (machine-readable tags, useless for analysis)
-    result = remove_xbrl_inline_data(result)
-
-    # Clean whitespace again (may have extra blank lines after XBRL removal)
-    result = clean_whitespace(result)
+    index = load_or_build_filing_index(str(input_file))
+    original_size = index["size"]
+
+    # Clean indexed documents, collecting emitted chunks
+    chunks = []
+    stats = {}
+    if original_size and should_clean_in_parallel(index, workers):
+        print(f"Cleaning {len(index['documents'])} documents with {workers} workers")
+        records = iter_cleaned_documents_parallel(str(input_file), index, workers, stats, tables)
+        write_records(records, chunks.append, stats, tables, dedup)
+    elif original_size:
+        with open(input_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            tokens = iter_indexed_tokens(lambda start, end: mm[start:end], index)
+            write_cleaned(tokens, chunks.append, stats, tables, dedup)
+    result = ''.join(chunks)
 
     # Determine output path
     if output_path is None:
@@ -294,16 +1421,18 @@ def clean_sec_filing(input_path: str, output_path: str = None) -> str:
     else:
         output_file = Path(output_path)
 
-    # Write file
-    output_file.write_text(result, encoding='utf-8')
-
-    cleaned_size = len(result)
-    reduction = (1 - cleaned_size / original_size) * 100
+    # Write file (temp + rename, never truncating a hardlinked cache entry)
+    tmp_file = output_file.with_name(output_file.name + '.tmp')
+    tmp_file.write_text(result, encoding='utf-8')
+    tmp_file.replace(output_file)
 
-    print(f"Cleaning complete: {output_file}")
-    print(f"Original size: {original_size:,} characters")
-    print(f"Cleaned size: {cleaned_size:,} characters")
-    print(f"Compression: {reduction:.1f}%")
+    print_clean_summary(output_file, stats, original_size, len(result.encode('utf-8')))
+    if table_index:
+        write_table_sidecar(str(output_file), table_index)
+    if section_index:
+        write_section_sidecar(str(output_file))
+    if xbrl_facts:
+        write_facts_sidecar(str(input_file), xbrl_facts)
 
     return result
 
@@ -322,11 +1451,64 @@ def main():
         default=None,
         help="Output file path (default: cleaned.txt in same directory)"
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Bounded-memory mode: process one <DOCUMENT> at a time, write output incrementally"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Clean documents of large filings in parallel processes (default: 1)"
+    )
+    parser.add_argument(
+        "--tables",
+        default="text",
+        choices=TABLE_FORMATS,
+        help="Table rendering: text (cells joined by spaces), markdown or tsv (compact "
+             "table blocks, spacer cells dropped) (default: text)"
+    )
+    parser.add_argument(
+        "--table-index",
+        default=None,
+        choices=TABLE_INDEX_FORMATS,
+        help="Also write a table sidecar (cleaned.tables.json or .parquet) with each table's "
+             "document type, heading and byte offset; requires --tables markdown or tsv"
+    )
+    parser.add_argument(
+        "--section-index",
+        action="store_true",
+        help="Also write cleaned.sections.json locating Item sections (Item 1, 1A, 7, 8, ...)"
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Replace repeated and near-duplicate paragraphs (disclaimers, certifications, "
+             "signature pages) with short references"
+    )
+    parser.add_argument(
+        "--xbrl-facts",
+        default=None,
+        choices=FACTS_FORMATS,
+        help="Also write the filing's XBRL facts (full-submission.facts.json or .parquet) "
+             "with concept, period, unit, value and dimensions"
+    )
 
     args = parser.parse_args()
 
+    if args.table_index and args.tables == "text":
+        print("Error: --table-index requires --tables markdown or tsv", file=sys.stderr)
+        sys.exit(1)
+
     try:
-        clean_sec_filing(args.input, args.output)
+        if args.stream:
+            clean_sec_filing_stream(args.input, args.output, tables=args.tables, table_index=args.table_index,
+                                    section_index=args.section_index, dedup=args.dedup, xbrl_facts=args.xbrl_facts)
+        else:
+            clean_sec_filing(args.input, args.output, workers=args.workers, tables=args.tables,
+                             table_index=args.table_index, section_index=args.section_index, dedup=args.dedup,
+                             xbrl_facts=args.xbrl_facts)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3.11
+"""
+Cleaned Filing Cache
+Content-addressed local cache of clean_sec_filing output
+
+Features:
+1. Key = SHA-256 of raw full-submission.txt + cleaner version/config fingerprint
+2. Hits are materialized instantly as a hardlink (copy if on another filesystem)
+3. Size-bounded, least-recently-used eviction (recency kept in a marker file beside each
+   entry, so hits never touch the shared inode and mtime-checked sidecars stay valid)
+4. Persistent hit/miss statistics
+
+Default location: ~/.cache/us-stock-researcher/cleaned (override with SEC_CLEAN_CACHE_DIR)
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "us-stock-researcher" / "cleaned"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2 GB
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def get_default_cache_dir() -> Path:
+    """
+    Cache directory from SEC_CLEAN_CACHE_DIR, or ~/.cache/us-stock-researcher/cleaned
+    """
+    return Path(os.getenv("SEC_CLEAN_CACHE_DIR", str(DEFAULT_CACHE_DIR)))
+
+
+def hash_file(path: str) -> str:
+    """
+    SHA-256 of file contents, read in chunks
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CleanedCache:
+    """Content-addressed store of cleaned filings"""
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir else get_default_cache_dir()
+        self.max_bytes = max_bytes
+        self.stats_path = self.cache_dir / "stats.json"
+
+    def make_key(self, raw_path: str, fingerprint: str) -> str:
+        """
+        Cache key for a raw submission under a given cleaner fingerprint
+        """
+        return f"{hash_file(raw_path)}-{fingerprint}"
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.txt"
+
+    @staticmethod
+    def _used_path(entry: Path) -> Path:
+        return entry.with_suffix('.used')
+
+    def _mark_used(self, entry: Path):
+        # Entry shares its inode with cleaned.txt outputs: touching it would change their
+        # mtime and invalidate the section/table/token sidecars, so touch a marker instead
+        try:
+            self._used_path(entry).touch()
+        except OSError:
+            pass
+
+    def _last_used(self, entry: Path) -> float:
+        try:
+            return self._used_path(entry).stat().st_mtime
+        except FileNotFoundError:
+            return entry.stat().st_mtime
+
+    def get(self, key: str, output_path: str) -> bool:
+        """
+        Materialize cached output at output_path
+
+        Returns:
+            True on hit, False on miss
+        """
+        entry = self._entry_path(key)
+        if not entry.exists():
+            return False
+
+        output = Path(output_path)
+        tmp = output.with_name(output.name + '.tmp')
+        try:
+            # Already linked to this entry (rename onto the same inode would be a no-op)
+            if not (output.exists() and os.path.samefile(entry, output)):
+                output.parent.mkdir(parents=True, exist_ok=True)
+                tmp.unlink(missing_ok=True)
+                try:
+                    os.link(entry, tmp)
+                except FileNotFoundError:
+                    raise
+                except OSError:
+                    # Different filesystem or no hardlink support
+                    shutil.copyfile(entry, tmp)
+                tmp.replace(output)
+        except FileNotFoundError:
+            # Entry evicted by a concurrent process since the exists() check: a miss
+            tmp.unlink(missing_ok=True)
+            return False
+
+        # Mark entry so LRU eviction sees it as recently used
+        self._mark_used(entry)
+        return True
+
+    def put(self, key: str, cleaned_path: str):
+        """
+        Store cleaned output under key, then evict down to max_bytes
+        """
+        entry = self._entry_path(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+        try:
+            os.link(cleaned_path, tmp)
+        except OSError:
+            shutil.copyfile(cleaned_path, tmp)
+        tmp.replace(entry)
+        tmp.unlink(missing_ok=True)  # Left behind if both already named the same inode
+        self._mark_used(entry)
+        self.evict()
+
+    def _entries(self) -> list[Path]:
+        if not self.cache_dir.exists():
+            return []
+        return [p for p in self.cache_dir.glob("*/*.txt") if p.is_file()]
+
+    def evict(self, max_bytes: int = None) -> int:
+        """
+        Remove least recently used entries until total size <= max_bytes
+
+        Returns:
+            Number of entries removed
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = []
+        for path in self._entries():
+            try:
+                entries.append((self._last_used(path), path.stat().st_size, path))
+            except FileNotFoundError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            path.unlink(missing_ok=True)
+            self._used_path(path).unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def load_stats(self) -> dict:
+        """
+        Persistent hit/miss counters
+        """
+        try:
+            return json.loads(self.stats_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {"hits": 0, "misses": 0, "bytes_served": 0}
+
+    def record(self, hits: int = 0, misses: int = 0, bytes_served: int = 0) -> dict:
+        """
+        Add to persistent counters (call from one process, e.g. after a batch)
+
+        Returns:
+            Updated stats
+        """
+        stats = self.load_stats()
+        stats["hits"] += hits
+        stats["misses"] += misses
+        stats["bytes_served"] += bytes_served
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.stats_path.with_suffix('.json.tmp')
+        tmp.write_text(json.dumps(stats, indent=2), encoding='utf-8')
+        tmp.replace(self.stats_path)
+        return stats
+
+    def usage(self) -> dict:
+        """
+        Current entry count and total size
+        """
+        sizes = [p.stat().st_size for p in self._entries()]
+        return {"entries": len(sizes), "bytes": sum(sizes), "max_bytes": self.max_bytes}
+
+    def clear(self):
+        """
+        Remove all entries and stats
+        """
+        if self.cache_dir.exists():
+            shutil.rmtree(self.cache_dir)
+
+
+def clean_with_cache(
+    raw_path: str,
+    cleaned_path: str,
+    clean_fn,
+    cache: Optional[CleanedCache],
+    fingerprint: str
+) -> bool:
+    """
+    Serve cleaned output from cache, or clean and store it
+
+    Args:
+        raw_path: full-submission.txt path
+        cleaned_path: Output path
+        clean_fn: Callable (raw_path, cleaned_path) performing the actual cleaning
+        cache: Cache instance, None to always clean
+        fingerprint: Cleaner version/config fingerprint
+
+    Returns:
+        True if served from cache
+    """
+    if cache is None:
+        clean_fn(raw_path, cleaned_path)
+        return False
+
+    key = cache.make_key(raw_path, fingerprint)
+    if cache.get(key, cleaned_path):
+        print(f"Cache hit: {cleaned_path}")
+        return True
+
+    clean_fn(raw_path, cleaned_path)
+    try:
+        cache.put(key, cleaned_path)
+    except OSError as e:
+        print(f"Warning: Could not store cleaned output in cache: {e}")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect or manage the cleaned SEC filing cache"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Cache directory (default: $SEC_CLEAN_CACHE_DIR or ~/.cache/us-stock-researcher/cleaned)"
+    )
+    parser.add_argument(
+        "--evict",
+        type=int,
+        default=None,
+        metavar="MAX_MB",
+        help="Evict least recently used entries down to MAX_MB"
+    )
+    parser.add_argument(
+        "--clear",
+        action="store_true",
+        help="Remove all cached entries and stats"
+    )
+
+    args = parser.parse_args()
+    cache = CleanedCache(args.cache_dir)
+
+    if args.clear:
+        cache.clear()
+        print(f"Cache cleared: {cache.cache_dir}")
+        return
+
+    if args.evict is not None:
+        removed = cache.evict(args.evict * 1024 * 1024)
+        print(f"Evicted {removed} entries")
+
+    stats = cache.load_stats()
+    usage = cache.usage()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = stats["hits"] / lookups * 100 if lookups else 0.0
+    print(f"Cache: {cache.cache_dir}")
+    print(f"Entries: {usage['entries']} ({usage['bytes'] / 1024 / 1024:.1f} MB "
+          f"of {usage['max_bytes'] / 1024 / 1024:.0f} MB)")
+    print(f"Hits: {stats['hits']}, misses: {stats['misses']} (hit rate {hit_rate:.1f}%)")
+    print(f"Served from cache: {stats['bytes_served'] / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
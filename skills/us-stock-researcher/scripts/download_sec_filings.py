@@ -4,36 +4,55 @@ SEC Filing Download Script
 Uses sec-edgar-downloader to download 10-K/10-Q filings from SEC EDGAR
 Auto-cleans HTML tags and binary data after download
 
+Fetch backends (--backend):
+- downloader: sec-edgar-downloader (new Downloader per call)
+- session: pooled keep-alive requests.Session with gzip, retries and timeouts
+- urllib: standard library only
+
 Default output to: <project_root>/investment-research/{TICKER}/tmp/sec_filings/
 """
 import argparse
 import os
 import sys
+from datetime import date, timedelta
 from pathlib import Path
 
-
-def get_default_output_dir(ticker: str, project_root: str = None) -> str:
-    """
-    Get default output directory: <project_root>/investment-research/{TICKER}/tmp/sec_filings
-    """
-    root = Path(project_root) if project_root else Path.cwd()
-    return str(root / "investment-research" / ticker / "tmp" / "sec_filings")
-
 try:
     from sec_edgar_downloader import Downloader
 except ImportError:
-    print("Error: Please install sec-edgar-downloader first")
-    print("Run: pip install sec-edgar-downloader")
-    sys.exit(1)
+    # Only needed for the default "downloader" backend
+    Downloader = None
 
 # Import cleaner module
 try:
-    from clean_sec_filing import clean_sec_filing
+    from batch_clean import clean_filings_parallel
+    from clean_sec_filing import TABLE_FORMATS
+    from cleaned_cache import CleanedCache
+    from edgar_client import (
+        BACKENDS, DEFAULT_RETRIES, EdgarClient, download_filings_http, get_user_agent, make_transport
+    )
+    from filing_store import (
+        get_default_output_dir, get_filing_dir, get_latest_filed_date, load_manifest, mark_processed,
+        save_manifest, sync_manifest
+    )
+    from table_index import TABLE_INDEX_FORMATS
+    from xbrl_facts import FACTS_FORMATS
 except ImportError:
     # If running as script directly, try importing from same directory
     script_dir = Path(__file__).parent
     sys.path.insert(0, str(script_dir))
-    from clean_sec_filing import clean_sec_filing
+    from batch_clean import clean_filings_parallel
+    from clean_sec_filing import TABLE_FORMATS
+    from cleaned_cache import CleanedCache
+    from edgar_client import (
+        BACKENDS, DEFAULT_RETRIES, EdgarClient, download_filings_http, get_user_agent, make_transport
+    )
+    from filing_store import (
+        get_default_output_dir, get_filing_dir, get_latest_filed_date, load_manifest, mark_processed,
+        save_manifest, sync_manifest
+    )
+    from table_index import TABLE_INDEX_FORMATS
+    from xbrl_facts import FACTS_FORMATS
 
 
 def download_filings(
@@ -42,7 +61,17 @@ def download_filings(
     limit: int = 1,
     output_dir: str = None,
     auto_clean: bool = True,
-    project_root: str = None
+    project_root: str = None,
+    workers: int = None,
+    use_cache: bool = True,
+    incremental: bool = False,
+    client: EdgarClient = None,
+    select: list[str] = None,
+    tables: str = "text",
+    table_index: str = None,
+    section_index: bool = False,
+    dedup: bool = False,
+    xbrl_facts: str = None
 ) -> list[Path]:
     """
     Download SEC filings
@@ -54,9 +83,26 @@ def download_filings(
         output_dir: Output directory, defaults to <project_root>/investment-research/{TICKER}/tmp/sec_filings
         auto_clean: Whether to auto-clean HTML and binary data (default True)
         project_root: Explicit project root directory (defaults to cwd)
+        workers: Cleaning worker processes (default: CPU count, capped at file count)
+        use_cache: Serve unchanged filings from the cleaned cache (default True)
+        incremental: Only fetch filings newer than the latest one on disk (tracked in
+            sec-edgar-filings/{ticker}/{type}/manifest.json) and return only new files (plus
+            held ones not cleaned successfully yet)
+        client: Fetch through this EdgarClient (shared session) instead of sec-edgar-downloader
+        select: Only fetch these document types from each filing (e.g. ["primary", "EX-99*"],
+            "primary" = the filing's own form); requires client
+        tables: Table rendering in cleaned output: "text", "markdown" or "tsv"
+        table_index: Also write a table sidecar next to each cleaned file ("json" or "parquet")
+        section_index: Also write an Item section index next to each cleaned file
+        dedup: Replace repeated paragraphs in cleaned output with references
+        xbrl_facts: Also write an XBRL facts sidecar next to each raw file ("json" or "parquet")
 
     Returns:
         List of downloaded file paths (if auto_clean=True, returns cleaned files)
+
+    Raises:
+        ValueError: If select is given without client
+        ImportError: If sec-edgar-downloader is needed (no client) but not installed
     """
     if output_dir is None:
         output_dir = get_default_output_dir(ticker, project_root)
@@ -68,42 +114,82 @@ def download_filings(
     print(f"Downloading {ticker} {filing_type} filings...")
     print(f"SEC EDGAR identity: {company_name} <{email}>")
 
-    # Create downloader
-    dl = Downloader(company_name, email, output_dir)
+    filing_dir = get_filing_dir(output_dir, ticker, filing_type)
 
-    # Download filings
-    dl.get(filing_type, ticker, limit=limit)
+    # Incremental mode: only ask EDGAR for filings after the latest one held
+    get_kwargs = {"limit": limit}
+    manifest = None
+    pending = []
+    if incremental:
+        manifest = load_manifest(filing_dir, ticker, filing_type)
+        # Filings on disk not cleaned yet (unknown to the manifest, or an earlier clean failed)
+        pending = sync_manifest(manifest, filing_dir)
+        latest = get_latest_filed_date(manifest)
+        if latest:
+            get_kwargs["after"] = (date.fromisoformat(latest) + timedelta(days=1)).isoformat()
+            print(f"Incremental: {len(manifest['filings'])} filings on disk, latest filed {latest}")
 
-    # Find downloaded files
-    filing_dir = Path(output_dir) / "sec-edgar-filings" / ticker / filing_type
+    listed_files = None
+    if client is not None:
+        listed_files = download_filings_http(
+            client, ticker, filing_type, output_dir=output_dir, select=select, **get_kwargs
+        )
+    elif select:
+        raise ValueError("Selective download requires an EDGAR client (--backend session or urllib)")
+    else:
+        if Downloader is None:
+            raise ImportError("Please install sec-edgar-downloader first (pip install sec-edgar-downloader), "
+                              "or use --backend session")
 
+        # Create downloader
+        dl = Downloader(company_name, email, output_dir)
+
+        # Download filings
+        dl.get(filing_type, ticker, **get_kwargs)
+
+    # Find downloaded files
     if not filing_dir.exists():
         print(f"Warning: Downloaded file directory not found {filing_dir}")
         return []
 
-    # Find all filing files
-    raw_files = list(filing_dir.glob("**/full-submission.txt"))
+    if manifest is not None:
+        raw_files = sorted(set(pending + sync_manifest(manifest, filing_dir)))
+        # Saved with the new filings still pending, they are marked processed once cleaned
+        save_manifest(filing_dir, manifest)
+        if not raw_files:
+            print("No new filings")
+            return []
+    elif listed_files is not None:
+        # Exactly the filings EDGAR listed (don't mix selected and full submissions)
+        raw_files = listed_files
+    else:
+        # Find all filing files
+        raw_files = list(filing_dir.glob("**/full-submission.txt"))
 
-    if not raw_files:
-        # Try other possible filenames
-        raw_files = list(filing_dir.glob("**/*.txt"))
+        if not raw_files:
+            # Try other possible filenames
+            raw_files = list(filing_dir.glob("**/*.txt"))
 
     print(f"Successfully downloaded {len(raw_files)} files")
 
     # Auto clean
     if auto_clean and raw_files:
         print("\nCleaning files...")
-        cleaned_files = []
-        for raw_file in raw_files:
-            try:
-                cleaned_path = raw_file.parent / "cleaned.txt"
-                clean_sec_filing(str(raw_file), str(cleaned_path))
-                cleaned_files.append(cleaned_path)
-            except Exception as e:
-                print(f"Cleaning failed {raw_file}: {e}")
-                cleaned_files.append(raw_file)  # Return original file on failure
-        return cleaned_files
+        # Failed files come back as their original path
+        cache = CleanedCache() if use_cache else None
+        summary = clean_filings_parallel(
+            raw_files, workers=workers, cache=cache, tables=tables, table_index=table_index,
+            section_index=section_index, dedup=dedup, xbrl_facts=xbrl_facts
+        )
+        print(f"Cleaned {summary['succeeded']}/{len(raw_files)} files in {summary['seconds']:.1f}s "
+              f"({summary['workers']} workers, {summary['cache_hits']} cache hits)")
+        if manifest is not None:
+            # Failed files stay pending and are cleaned again by the next incremental run
+            mark_processed(filing_dir, [r["input"] for r in summary["files"] if r["status"] == "ok"])
+        return [Path(p) for p in summary["outputs"]]
 
+    if manifest is not None:
+        mark_processed(filing_dir, raw_files)
     return raw_files
 
 
@@ -143,22 +229,138 @@ def main():
         default=None,
         help="Project root directory for default output path (default: current working directory)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Parallel cleaning processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch filings newer than those already downloaded, output only new files"
+    )
+    parser.add_argument(
+        "--tables",
+        default="text",
+        choices=TABLE_FORMATS,
+        help="Table rendering in cleaned output: text, markdown or tsv (default: text)"
+    )
+    parser.add_argument(
+        "--table-index",
+        default=None,
+        choices=TABLE_INDEX_FORMATS,
+        help="Also write a table sidecar (cleaned.tables.json or .parquet) per filing, "
+             "requires --tables markdown or tsv"
+    )
+    parser.add_argument(
+        "--section-index",
+        action="store_true",
+        help="Also write an Item section index (cleaned.sections.json) per filing, used by "
+             "gemini_deep_research.py --sections"
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Replace repeated and near-duplicate paragraphs (disclaimers, certifications, "
+             "signature pages) in cleaned output with short references"
+    )
+    parser.add_argument(
+        "--xbrl-facts",
+        default=None,
+        choices=FACTS_FORMATS,
+        help="Also write the XBRL facts (full-submission.facts.json or .parquet) per filing, used by "
+             "gemini_deep_research.py --xbrl-facts"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always re-clean, don't reuse cached cleaned output"
+    )
+    parser.add_argument(
+        "--backend",
+        default="downloader",
+        choices=["downloader", *BACKENDS],
+        help="Fetch backend: downloader (sec-edgar-downloader), session (pooled keep-alive "
+             "requests.Session), urllib (default: downloader)"
+    )
+    parser.add_argument(
+        "--base-url",
+        default=None,
+        help="Fetch from this base URL instead of sec.gov, e.g. a local mirror (session/urllib backends)"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30,
+        help="Read timeout in seconds (session/urllib backends, default: 30)"
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f"Retries on HTTP 429/503 and connection errors (session/urllib backends, default: {DEFAULT_RETRIES})"
+    )
+
+    parser.add_argument(
+        "--select",
+        default=None,
+        help="Only fetch these document types from each filing, comma-separated; 'primary' is the "
+             "filing's own form, '*' matches a prefix (e.g. primary,EX-99*). Session/urllib backends"
+    )
 
     args = parser.parse_args()
+    select = args.select.split(',') if args.select else None
 
-    files = download_filings(
-        ticker=args.ticker,
-        filing_type=args.type,
-        limit=args.limit,
-        output_dir=args.output,
-        auto_clean=not args.no_clean,
-        project_root=args.project_root
-    )
+    if args.backend == "downloader" and (args.base_url or select):
+        print("Error: --base-url and --select require --backend session or urllib", file=sys.stderr)
+        sys.exit(1)
+    if args.table_index and args.tables == "text":
+        print("Error: --table-index requires --tables markdown or tsv", file=sys.stderr)
+        sys.exit(1)
+
+    client = None
+    try:
+        if args.backend != "downloader":
+            client = EdgarClient(
+                user_agent=get_user_agent(),
+                base_url=args.base_url,
+                timeout=args.timeout,
+                retries=args.retries,
+                transport=make_transport(args.backend)
+            )
+        files = download_filings(
+            ticker=args.ticker,
+            filing_type=args.type,
+            limit=args.limit,
+            output_dir=args.output,
+            auto_clean=not args.no_clean,
+            project_root=args.project_root,
+            workers=args.workers,
+            use_cache=not args.no_cache,
+            incremental=args.incremental,
+            client=client,
+            select=select,
+            tables=args.tables,
+            table_index=args.table_index,
+            section_index=args.section_index,
+            dedup=args.dedup,
+            xbrl_facts=args.xbrl_facts
+        )
+    except (ImportError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if client is not None:
+        print(f"HTTP requests: {client.request_count} ({client.retry_count} retries)")
+        client.close()
 
     if files:
         print("\nOutput files:")
         for f in files:
             print(f"  - {f}")
+    elif args.incremental:
+        print("\nNo new filings since last run")
     else:
         print("\nNo files found")
         sys.exit(1)
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3.11
+"""
+SEC EDGAR HTTP Client
+Minimal EDGAR client for concurrent downloads under a shared request budget
+
+Features:
+1. Ticker -> CIK lookup, recent filings listing, full-submission.txt download
+2. Thread-safe token bucket enforcing SEC's 10 requests/second fair-access limit
+3. Base URL override, so it can run against a local stand-in EDGAR server
+   (fake_edgar.py builds and serves a small synthetic mirror of EDGAR paths)
+4. Pluggable transport: pooled keep-alive requests.Session ("session") or
+   plain urllib ("urllib"), both gzip-enabled
+5. Bounded retries with jittered exponential backoff on 429/503 (honors Retry-After)
+6. Selective mode: read the filing index, fetch only the wanted document types
+   and assemble them into an SGML submission the cleaner reads as usual
+
+Writes the same layout as sec-edgar-downloader:
+    <output_dir>/sec-edgar-filings/{TICKER}/{TYPE}/{accession}/full-submission.txt
+    <output_dir>/sec-edgar-filings/{TICKER}/{TYPE}/{accession}/selected-submission.txt (selective mode)
+"""
+import gzip
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from html import unescape
+from pathlib import Path
+from typing import Optional
+
+try:
+    from clean_sec_filing import is_skipped_doc_type
+    from filing_index import match_doc_type
+    from filing_store import SELECTED_SUBMISSION_NAME, get_filing_dir
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from clean_sec_filing import is_skipped_doc_type
+    from filing_index import match_doc_type
+    from filing_store import SELECTED_SUBMISSION_NAME, get_filing_dir
+
+SEC_WWW_URL = "https://www.sec.gov"
+SEC_DATA_URL = "https://data.sec.gov"
+
+# SEC fair access policy: at most 10 requests per second per client
+SEC_MAX_REQUESTS_PER_SECOND = 10
+
+# Throttled / temporarily unavailable: retry with backoff
+RETRY_STATUSES = (429, 503)
+DEFAULT_RETRIES = 4
+RETRY_BACKOFF = 1.0  # Base delay in seconds, doubled each attempt
+RETRY_MAX_DELAY = 30.0
+
+BACKENDS = ("session", "urllib")
+
+# Rows of the document tables in {accession}-index.htm: Seq, Description, Document, Type, Size
+INDEX_ROW_PATTERN = re.compile(r'<tr[^>]*>(.*?)</tr>', re.DOTALL | re.IGNORECASE)
+INDEX_CELL_PATTERN = re.compile(r'<td[^>]*>(.*?)</td>', re.DOTALL | re.IGNORECASE)
+INDEX_HREF_PATTERN = re.compile(r'href="([^"]+)"', re.IGNORECASE)
+INDEX_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Stands for the filing's own form type (e.g. 10-K) in a document selection
+PRIMARY_SELECTOR = "primary"
+SELECTION_HEADER_FIELD = "SELECTED DOCUMENT TYPES:"
+
+
+class EdgarHTTPError(Exception):
+    """Non-success HTTP status from EDGAR (after retries)"""
+
+    def __init__(self, url: str, status: int):
+        super().__init__(f"HTTP {status} for {url}")
+        self.url = url
+        self.status = status
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter"""
+
+    def __init__(self, rate: float = SEC_MAX_REQUESTS_PER_SECOND, capacity: float = 1):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst (1 = evenly spaced requests, never above rate in any window)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available, then take it
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_user_agent() -> str:
+    """
+    SEC-required User-Agent from SEC_EDGAR_COMPANY_NAME / SEC_EDGAR_EMAIL
+    """
+    company_name = os.getenv("SEC_EDGAR_COMPANY_NAME", "InvestmentResearch")
+    email = os.getenv("SEC_EDGAR_EMAIL", "research@example.com")
+    return f"{company_name} {email}"
+
+
+class UrllibTransport:
+    """urllib transport: new connection per request, gzip decoded by hand"""
+
+    def get(self, url: str, headers: dict, timeout: tuple) -> tuple[int, dict, bytes]:
+        """
+        GET url
+
+        Args:
+            url: URL
+            headers: Request headers
+            timeout: (connect, read) timeouts in seconds (urllib takes one, the larger is used)
+
+        Returns:
+            (status, response headers, body)
+        """
+        request = urllib.request.Request(url, headers={**headers, "Accept-Encoding": "gzip"})
+        try:
+            with urllib.request.urlopen(request, timeout=max(timeout)) as response:
+                status, response_headers, body = response.status, dict(response.headers), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers or {}), b""
+        if response_headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return status, response_headers, body
+
+    def close(self):
+        pass
+
+
+class SessionTransport:
+    """requests.Session transport: pooled keep-alive connections, gzip/deflate"""
+
+    def __init__(self, pool_size: int = 10):
+        """
+        Args:
+            pool_size: Connections kept alive per host (match the number of download threads)
+
+        Raises:
+            ImportError: If requests is not installed
+        """
+        try:
+            import requests
+            from requests.adapters import HTTPAdapter
+        except ImportError:
+            raise ImportError("Session backend requires requests (pip install requests, or use --backend urllib)")
+
+        self.session = requests.Session()
+        # Retries are handled by EdgarClient so each attempt goes through the rate limiter
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url: str, headers: dict, timeout: tuple) -> tuple[int, dict, bytes]:
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        return response.status_code, dict(response.headers), response.content
+
+    def close(self):
+        self.session.close()
+
+
+def make_transport(backend: str = "session", pool_size: int = 10):
+    """
+    Create HTTP transport by name ("session" or "urllib")
+    """
+    if backend == "session":
+        return SessionTransport(pool_size=pool_size)
+    if backend == "urllib":
+        return UrllibTransport()
+    raise ValueError(f"Unknown HTTP backend: {backend} (expected one of {', '.join(BACKENDS)})")
+
+
+def get_retry_delay(attempt: int, retry_after: str = None) -> float:
+    """
+    Delay before retry number attempt (0-based)
+
+    Uses Retry-After when the server sends seconds, otherwise exponential
+    backoff with full jitter so concurrent threads don't retry in lockstep.
+    """
+    if retry_after and retry_after.strip().isdigit():
+        return min(float(retry_after), RETRY_MAX_DELAY)
+    return random.uniform(0, min(RETRY_BACKOFF * 2 ** attempt, RETRY_MAX_DELAY))
+
+
+class EdgarClient:
+    """EDGAR client sharing one rate limiter across all threads"""
+
+    def __init__(
+        self,
+        user_agent: str = None,
+        base_url: str = None,
+        rate_limiter: TokenBucket = None,
+        timeout: float = 30,
+        connect_timeout: float = 10,
+        retries: int = DEFAULT_RETRIES,
+        transport=None
+    ):
+        """
+        Args:
+            user_agent: User-Agent header (default from environment)
+            base_url: Serve both www.sec.gov and data.sec.gov paths from this URL instead
+            rate_limiter: Shared limiter (default: new 10 req/s bucket)
+            timeout: Read timeout in seconds
+            connect_timeout: Connect timeout in seconds
+            retries: Retries on 429/503 and connection errors
+            transport: HTTP transport from make_transport (default: urllib)
+        """
+        self.user_agent = user_agent or get_user_agent()
+        self.www_url = (base_url or SEC_WWW_URL).rstrip('/')
+        self.data_url = (base_url or SEC_DATA_URL).rstrip('/')
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.timeout = (connect_timeout, timeout)
+        self.retries = retries
+        self.transport = transport or UrllibTransport()
+        self.request_count = 0
+        self.retry_count = 0
+        self._count_lock = threading.Lock()
+        self._tickers = None
+        self._tickers_lock = threading.Lock()
+
+    def fetch(self, url: str) -> bytes:
+        """
+        GET url under the shared rate limit, retrying on 429/503 and connection errors
+
+        Returns:
+            Response body
+
+        Raises:
+            EdgarHTTPError: Non-success status (after retries for retryable ones)
+        """
+        headers = {"User-Agent": self.user_agent}
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.acquire()
+            with self._count_lock:
+                self.request_count += 1
+            try:
+                status, response_headers, body = self.transport.get(url, headers, self.timeout)
+            except OSError:
+                # Connection reset / timeout (requests exceptions are OSError subclasses too)
+                if attempt == self.retries:
+                    raise
+                retry_after = None
+            else:
+                if status < 400:
+                    return body
+                if status not in RETRY_STATUSES or attempt == self.retries:
+                    raise EdgarHTTPError(url, status)
+                retry_after = response_headers.get("Retry-After")
+
+            with self._count_lock:
+                self.retry_count += 1
+            time.sleep(get_retry_delay(attempt, retry_after))
+
+    def close(self):
+        self.transport.close()
+
+    def fetch_json(self, url: str):
+        return json.loads(self.fetch(url))
+
+    def get_cik(self, ticker: str) -> str:
+        """
+        Look up zero-padded 10-digit CIK for ticker (ticker table fetched once per client)
+        """
+        with self._tickers_lock:
+            if self._tickers is None:
+                table = self.fetch_json(f"{self.www_url}/files/company_tickers.json")
+                self._tickers = {
+                    row["ticker"].upper(): str(row["cik_str"]).zfill(10)
+                    for row in table.values()
+                }
+        cik = self._tickers.get(ticker.upper())
+        if cik is None:
+            raise ValueError(f"Unknown ticker: {ticker}")
+        return cik
+
+    def get_recent_filings(
+        self,
+        cik: str,
+        filing_type: str,
+        limit: int = 1,
+        after: str = None
+    ) -> list[dict]:
+        """
+        List most recent filings of a form type, newest first
+
+        Args:
+            cik: 10-digit CIK
+            filing_type: Form type (e.g. 10-K)
+            limit: Maximum filings to return
+            after: Only filings filed on or after this date (YYYY-MM-DD)
+
+        Returns:
+            List of {accession, form, filed, period, primary_document, company, cik}
+        """
+        submissions = self.fetch_json(f"{self.data_url}/submissions/CIK{cik}.json")
+        recent = submissions["filings"]["recent"]
+        report_dates = recent.get("reportDate") or [""] * len(recent["form"])
+
+        filings = []
+        for i, form in enumerate(recent["form"]):
+            if form != filing_type:
+                continue
+            filed = recent["filingDate"][i]
+            if after and filed < after:
+                continue
+            filings.append({
+                "accession": recent["accessionNumber"][i],
+                "form": form,
+                "filed": filed,
+                "period": report_dates[i],
+                "primary_document": recent["primaryDocument"][i],
+                "company": submissions.get("name", ""),
+                "cik": cik,
+            })
+            if len(filings) >= limit:
+                break
+        return filings
+
+    def get_archive_url(self, cik: str, accession: str) -> str:
+        """
+        Archive directory URL of one filing
+        """
+        return f"{self.www_url}/Archives/edgar/data/{int(cik)}/{accession.replace('-', '')}"
+
+    def download_full_submission(self, cik: str, accession: str, dest: Path) -> Path:
+        """
+        Download {accession}.txt (the full submission) to dest (written atomically)
+        """
+        data = self.fetch(f"{self.get_archive_url(cik, accession)}/{accession}.txt")
+        write_atomic(dest, data)
+        return dest
+
+    def get_filing_documents(self, cik: str, accession: str) -> list[dict]:
+        """
+        List documents of one filing from its {accession}-index.htm page
+
+        Returns:
+            List of {sequence, description, filename, type, size, url} in index order
+        """
+        index_url = f"{self.get_archive_url(cik, accession)}/{accession}-index.htm"
+        page = self.fetch(index_url).decode('utf-8', errors='replace')
+
+        documents = []
+        for row in INDEX_ROW_PATTERN.findall(page):
+            cells = INDEX_CELL_PATTERN.findall(row)
+            href = INDEX_HREF_PATTERN.search(row)
+            if len(cells) < 4 or not href:
+                continue
+            text = [unescape(INDEX_TAG_PATTERN.sub('', cell)).strip() for cell in cells]
+            doc_type = text[3]
+            if not doc_type:
+                continue  # "Complete submission text file" row
+            # Inline XBRL documents link through the viewer: /ix?doc=/Archives/...
+            path = href.group(1).split('doc=', 1)[-1]
+            url = path if path.startswith('http') else f"{self.www_url}{path}"
+            documents.append({
+                "sequence": text[0],
+                "description": text[1],
+                "filename": text[2].split()[0] if text[2] else path.rsplit('/', 1)[-1],
+                "type": doc_type,
+                "size": int(text[4]) if len(text) > 4 and text[4].isdigit() else None,
+                "url": url,
+            })
+        return documents
+
+    def download_selected_documents(self, filing: dict, types: list[str], dest: Path) -> dict:
+        """
+        Fetch only the wanted document types of a filing into one SGML submission
+
+        Args:
+            filing: Filing from get_recent_filings
+            types: Document types, prefixes ending in '*', or "primary" for the filing's form
+            dest: Output path (written atomically)
+
+        Returns:
+            Dict: documents (fetched), bytes (document bytes transferred), listed (documents in index)
+        """
+        documents = self.get_filing_documents(filing["cik"], filing["accession"])
+        selected = select_filing_documents(documents, types, filing["form"])
+
+        contents = [self.fetch(doc["url"]) for doc in selected]
+        write_atomic(dest, build_selected_submission(filing, selected, contents, types))
+        return {
+            "documents": len(selected),
+            "bytes": sum(len(c) for c in contents),
+            "listed": len(documents),
+        }
+
+
+def write_atomic(dest: Path, data: bytes):
+    """
+    Write file via temp file + rename, so readers never see a partial download
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + '.tmp')
+    tmp.write_bytes(data)
+    tmp.replace(dest)
+
+
+def select_filing_documents(documents: list[dict], types: list[str], form: str) -> list[dict]:
+    """
+    Pick documents by type, leaving out those the cleaner would drop anyway
+
+    Args:
+        documents: Documents from get_filing_documents
+        types: Exact types, prefixes ending in '*', or "primary"
+        form: Filing form type that "primary" stands for
+
+    Returns:
+        Selected documents in index order
+    """
+    wanted = [form if t == PRIMARY_SELECTOR else t for t in types]
+    return [
+        doc for doc in documents
+        if match_doc_type(doc["type"], wanted) and not is_skipped_doc_type(doc["type"])
+    ]
+
+
+def format_sec_date(iso_date: str) -> str:
+    return iso_date.replace('-', '') if iso_date else ""
+
+
+def build_selected_submission(
+    filing: dict,
+    documents: list[dict],
+    contents: list[bytes],
+    types: list[str]
+) -> bytes:
+    """
+    Assemble fetched documents into full-submission.txt style SGML
+
+    The SEC header is rebuilt from the submissions metadata (filing date,
+    period, company, CIK), plus a line recording the document selection.
+
+    Returns:
+        Submission bytes
+    """
+    header = [
+        f"<SEC-HEADER>{filing['accession']}.hdr.sgml : {format_sec_date(filing['filed'])}",
+        f"ACCESSION NUMBER:\t\t{filing['accession']}",
+        f"CONFORMED SUBMISSION TYPE:\t{filing['form']}",
+        f"PUBLIC DOCUMENT COUNT:\t\t{len(documents)}",
+    ]
+    if filing.get("period"):
+        header.append(f"CONFORMED PERIOD OF REPORT:\t{format_sec_date(filing['period'])}")
+    header += [
+        f"FILED AS OF DATE:\t\t{format_sec_date(filing['filed'])}",
+        f"{SELECTION_HEADER_FIELD}\t{','.join(types)}",
+        "",
+        "FILER:",
+        "",
+        "\tCOMPANY DATA:\t",
+        f"\t\tCOMPANY CONFORMED NAME:\t\t\t{filing.get('company', '')}",
+        f"\t\tCENTRAL INDEX KEY:\t\t\t{filing['cik']}",
+        "</SEC-HEADER>",
+    ]
+
+    parts = ['\n'.join(header).encode('utf-8'), b'\n']
+    for doc, content in zip(documents, contents):
+        fields = [f"<TYPE>{doc['type']}", f"<SEQUENCE>{doc['sequence']}", f"<FILENAME>{doc['filename']}"]
+        if doc["description"]:
+            fields.append(f"<DESCRIPTION>{doc['description']}")
+        parts.append(('\n'.join(["<DOCUMENT>", *fields, "<TEXT>"]) + '\n').encode('utf-8'))
+        parts.append(content)
+        parts.append(b'\n</TEXT>\n</DOCUMENT>\n')
+    return b''.join(parts)
+
+
+def read_selection(raw_path: Path) -> Optional[list[str]]:
+    """
+    Document selection recorded in a selected-submission.txt header, None if absent
+    """
+    with open(raw_path, 'rb') as f:
+        head = f.read(16 * 1024).decode('utf-8', errors='replace')
+    for line in head.splitlines():
+        if line.startswith(SELECTION_HEADER_FIELD):
+            return line[len(SELECTION_HEADER_FIELD):].strip().split(',')
+    return None
+
+
+def download_filings_http(
+    client: EdgarClient,
+    ticker: str,
+    filing_type: str,
+    limit: int,
+    output_dir: str,
+    after: str = None,
+    select: list[str] = None
+) -> list[Path]:
+    """
+    Download a ticker's most recent filings with EdgarClient
+
+    Filings already present on disk are not fetched again, but are still
+    returned so the caller can clean them. In selective mode a filing is
+    fetched again if it was stored with a different selection.
+
+    Args:
+        client: Shared EDGAR client
+        ticker: Stock ticker
+        filing_type: Form type
+        limit: Number of filings
+        output_dir: Base output directory (sec-edgar-filings/ is created inside)
+        after: Only filings filed on or after this date (YYYY-MM-DD)
+        select: Only fetch these document types (e.g. ["primary", "EX-99*"]) into
+            selected-submission.txt instead of the full submission
+
+    Returns:
+        Paths of full-submission.txt (selected-submission.txt) files for the listed filings
+    """
+    cik = client.get_cik(ticker)
+    filing_dir = get_filing_dir(output_dir, ticker, filing_type)
+
+    raw_files = []
+    for filing in client.get_recent_filings(cik, filing_type, limit=limit, after=after):
+        if not select:
+            dest = filing_dir / filing["accession"] / "full-submission.txt"
+            if not dest.exists():
+                client.download_full_submission(cik, filing["accession"], dest)
+        else:
+            dest = filing_dir / filing["accession"] / SELECTED_SUBMISSION_NAME
+            if not dest.exists() or read_selection(dest) != select:
+                fetched = client.download_selected_documents(filing, select, dest)
+                print(f"  {filing['accession']}: {fetched['documents']} of {fetched['listed']} documents, "
+                      f"{fetched['bytes'] / 1024:.0f} KB")
+        raw_files.append(dest)
+    return raw_files
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3.11
+"""
+Stand-in EDGAR Server
+Builds a small synthetic mirror of EDGAR paths and serves it locally, for offline download runs
+
+Features:
+1. Writes files/company_tickers.json, submissions/CIK##########.json and per-filing
+   Archives/edgar/data/{cik}/{accession}/ directories (full submission, documents, -index.htm)
+2. Serves the mirror over HTTP on localhost; pass the printed URL as --base-url
+   to download_sec_filings.py, watchlist_scheduler.py or research_pipeline.py
+3. Run without --serve to check run_watchlist offline: incremental re-runs fetch and clean
+   nothing new, and --select fetches only the wanted documents
+
+Mirror layout (same paths as www.sec.gov and data.sec.gov):
+    <dir>/files/company_tickers.json
+    <dir>/submissions/CIK##########.json
+    <dir>/Archives/edgar/data/{cik}/{accession without dashes}/{accession}.txt
+    <dir>/Archives/edgar/data/{cik}/{accession without dashes}/{accession}-index.htm
+"""
+import argparse
+import functools
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from html import escape
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+try:
+    from edgar_client import EdgarClient, TokenBucket, make_transport
+    from watchlist_scheduler import run_watchlist
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from edgar_client import EdgarClient, TokenBucket, make_transport
+    from watchlist_scheduler import run_watchlist
+
+# ticker -> (CIK, company name, filings newest first as (accession, form, filed, period))
+MIRROR_COMPANIES = {
+    "AAPL": ("0000320193", "APPLE INC", [
+        ("0000320193-24-000123", "10-K", "2024-11-01", "2024-09-28"),
+        ("0000320193-24-000081", "10-Q", "2024-08-02", "2024-06-29"),
+        ("0000320193-23-000106", "10-K", "2023-11-03", "2023-09-30"),
+    ]),
+    "MSFT": ("0000789019", "MICROSOFT CORP", [
+        ("0000789019-24-000076", "10-K", "2024-07-30", "2024-06-30"),
+        ("0000789019-23-000014", "10-K", "2023-07-27", "2023-06-30"),
+    ]),
+}
+
+PRIMARY_TEMPLATE = """<html><head><title>{company} {form}</title></head><body>
+<p><b>{company}</b> {form} for the period ended {period}</p>
+<h2>Item 1. Business</h2>
+<p>{company} designs, manufactures and markets products and services. This stand-in filing was
+generated for offline runs and is not real disclosure.</p>
+<h2>Item 1A. Risk Factors</h2>
+<p>Results could be adversely affected by macroeconomic conditions, competition and supply chain disruption.</p>
+<h2>Item 7. Management's Discussion and Analysis of Financial Condition and Results of Operations</h2>
+<p>Net sales were ${sales:,} million for the period, compared with ${prior_sales:,} million a year earlier.</p>
+<h2>Item 8. Financial Statements and Supplementary Data</h2>
+<table>
+<tr><td></td><td>{year}</td><td>{prior_year}</td></tr>
+<tr><td>Net sales</td><td>$</td><td>{sales:,}</td><td>$</td><td>{prior_sales:,}</td></tr>
+<tr><td>Net income</td><td>$</td><td>{income:,}</td><td>$</td><td>{prior_income:,}</td></tr>
+</table>
+</body></html>
+"""
+
+EXHIBIT_TEMPLATE = """<html><body>
+<p>Subsidiaries of {company}</p>
+<p>{company} Operations International Limited (Ireland)</p>
+<p>{company} Sales LLC (Delaware)</p>
+</body></html>
+"""
+
+PRESS_TEMPLATE = """<html><body>
+<p>{company} reports results for the period ended {period}</p>
+<p>Net sales of ${sales:,} million.</p>
+</body></html>
+"""
+
+
+def build_documents(company: str, form: str, period: str, seed: int) -> list[dict]:
+    """
+    Documents of one synthetic filing: primary document, EX-21 and EX-99.1
+
+    Returns:
+        List of {sequence, type, filename, description, text}
+    """
+    year = int(period[:4])
+    values = {
+        "company": company, "form": form, "period": period, "year": year, "prior_year": year - 1,
+        "sales": 90000 + seed * 1370, "prior_sales": 85000 + seed * 1210,
+        "income": 21000 + seed * 310, "prior_income": 19000 + seed * 290,
+    }
+    stem = f"{company.split()[0].lower()}-{period.replace('-', '')}"
+    return [
+        {"type": form, "filename": f"{stem}.htm", "description": form, "text": PRIMARY_TEMPLATE.format(**values)},
+        {"type": "EX-21.1", "filename": "ex21.htm", "description": "SUBSIDIARIES",
+         "text": EXHIBIT_TEMPLATE.format(**values)},
+        {"type": "EX-99.1", "filename": "ex99.htm", "description": "PRESS RELEASE",
+         "text": PRESS_TEMPLATE.format(**values)},
+    ]
+
+
+def build_submission(cik: str, company: str, accession: str, form: str, filed: str, period: str,
+                     documents: list[dict]) -> str:
+    """
+    Full submission text (SEC header plus one SGML block per document)
+    """
+    filed_compact = filed.replace('-', '')
+    parts = [
+        f"<SEC-HEADER>{accession}.hdr.sgml : {filed_compact}\n"
+        f"ACCESSION NUMBER:\t\t{accession}\n"
+        f"CONFORMED SUBMISSION TYPE:\t{form}\n"
+        f"PUBLIC DOCUMENT COUNT:\t\t{len(documents)}\n"
+        f"CONFORMED PERIOD OF REPORT:\t{period.replace('-', '')}\n"
+        f"FILED AS OF DATE:\t\t{filed_compact}\n\n"
+        f"FILER:\n\n\tCOMPANY DATA:\t\n"
+        f"\t\tCOMPANY CONFORMED NAME:\t\t\t{company}\n"
+        f"\t\tCENTRAL INDEX KEY:\t\t\t{cik}\n"
+        f"</SEC-HEADER>\n"
+    ]
+    for sequence, doc in enumerate(documents, 1):
+        parts.append(
+            f"<DOCUMENT>\n<TYPE>{doc['type']}\n<SEQUENCE>{sequence}\n<FILENAME>{doc['filename']}\n"
+            f"<DESCRIPTION>{doc['description']}\n<TEXT>\n{doc['text']}</TEXT>\n</DOCUMENT>\n"
+        )
+    return ''.join(parts)
+
+
+def build_index_page(archive_path: str, accession: str, documents: list[dict], submission_size: int) -> str:
+    """
+    {accession}-index.htm document table, in the layout edgar_client parses
+    """
+    rows = ['<tr><th scope="col">Seq</th><th scope="col">Description</th><th scope="col">Document</th>'
+            '<th scope="col">Type</th><th scope="col">Size</th></tr>']
+    for sequence, doc in enumerate(documents, 1):
+        href = f"{archive_path}/{doc['filename']}"
+        if sequence == 1:
+            href = f"/ix?doc={href}"  # Inline XBRL primary documents link through the viewer
+        rows.append(
+            f'<tr>\n<td scope="row">{sequence}</td>\n<td scope="row">{escape(doc["description"])}</td>\n'
+            f'<td scope="row"><a href="{href}">{doc["filename"]}</a></td>\n'
+            f'<td scope="row">{doc["type"]}</td>\n<td scope="row">{len(doc["text"].encode())}</td>\n</tr>'
+        )
+    rows.append(
+        f'<tr>\n<td scope="row">&nbsp;</td>\n<td scope="row">Complete submission text file</td>\n'
+        f'<td scope="row"><a href="{archive_path}/{accession}.txt">{accession}.txt</a></td>\n'
+        f'<td scope="row">&nbsp;</td>\n<td scope="row">{submission_size}</td>\n</tr>'
+    )
+    return f'<html><body>\n<table class="tableFile" summary="Document Format Files">\n' \
+           f'{chr(10).join(rows)}\n</table>\n</body></html>\n'
+
+
+def build_mirror(root: str, companies: dict = None) -> Path:
+    """
+    Write the stand-in EDGAR mirror under root
+
+    Args:
+        root: Mirror directory (created if missing)
+        companies: Ticker -> (CIK, name, filings), default MIRROR_COMPANIES
+
+    Returns:
+        Mirror directory
+    """
+    root = Path(root)
+    companies = companies or MIRROR_COMPANIES
+    tickers = {}
+    for i, (ticker, (cik, company, filings)) in enumerate(companies.items()):
+        tickers[str(i)] = {"cik_str": int(cik), "ticker": ticker, "title": company}
+        recent = {key: [] for key in ("accessionNumber", "form", "filingDate", "reportDate", "primaryDocument")}
+        for seed, (accession, form, filed, period) in enumerate(filings):
+            documents = build_documents(company, form, period, seed)
+            archive_path = f"/Archives/edgar/data/{int(cik)}/{accession.replace('-', '')}"
+            filing_dir = root / archive_path.lstrip('/')
+            filing_dir.mkdir(parents=True, exist_ok=True)
+            submission = build_submission(cik, company, accession, form, filed, period, documents)
+            (filing_dir / f"{accession}.txt").write_text(submission, encoding='utf-8')
+            for doc in documents:
+                (filing_dir / doc["filename"]).write_text(doc["text"], encoding='utf-8')
+            (filing_dir / f"{accession}-index.htm").write_text(
+                build_index_page(archive_path, accession, documents, len(submission.encode())), encoding='utf-8'
+            )
+            recent["accessionNumber"].append(accession)
+            recent["form"].append(form)
+            recent["filingDate"].append(filed)
+            recent["reportDate"].append(period)
+            recent["primaryDocument"].append(documents[0]["filename"])
+
+        (root / "submissions").mkdir(parents=True, exist_ok=True)
+        (root / "submissions" / f"CIK{cik}.json").write_text(
+            json.dumps({"cik": cik, "name": company, "tickers": [ticker], "filings": {"recent": recent}}),
+            encoding='utf-8'
+        )
+
+    (root / "files").mkdir(parents=True, exist_ok=True)
+    (root / "files" / "company_tickers.json").write_text(json.dumps(tickers), encoding='utf-8')
+    return root
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """Static file handler without per-request logging"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_mirror(root: str, port: int = 0) -> ThreadingHTTPServer:
+    """
+    Serve a mirror directory on localhost in a background thread
+
+    Args:
+        root: Mirror directory
+        port: Port to listen on (0 = any free port)
+
+    Returns:
+        Running server (its URL is http://127.0.0.1:{server.server_port}; call shutdown() to stop)
+    """
+    handler = functools.partial(QuietHandler, directory=str(root))
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def check_watchlist(work_dir: Path, base_url: str) -> list[str]:
+    """
+    Run run_watchlist against the stand-in server: a full incremental run, an incremental
+    re-run that finds nothing new, and a selective run
+
+    Returns:
+        Failure messages (empty if every check passed)
+    """
+    failures = []
+
+    def expect(label: str, actual, expected):
+        status = "ok" if actual == expected else "FAILED"
+        print(f"  [{status}] {label}: {actual} (expected {expected})")
+        if actual != expected:
+            failures.append(f"{label}: {actual} != {expected}")
+
+    def run(project_root: Path, select: list[str] = None) -> dict:
+        client = EdgarClient(
+            base_url=base_url, rate_limiter=TokenBucket(rate=100), transport=make_transport("urllib")
+        )
+        jobs = [{"ticker": "AAPL", "form": "10-K", "limit": 2}, {"ticker": "MSFT", "form": "10-K", "limit": 1}]
+        summary = run_watchlist(
+            jobs, client, project_root=str(project_root), clean_workers=2, incremental=select is None,
+            select=select
+        )
+        client.close()
+        return summary
+
+    first = run(work_dir / "full")
+    expect("first run jobs failed", first["failed"], 0)
+    expect("first run raw files", sum(len(job["raw_files"]) for job in first["jobs"]), 3)
+    cleaned = [out for job in first["jobs"] for out in job["outputs"] if out.endswith("cleaned.txt")]
+    expect("first run cleaned files", len(cleaned), 3)
+    expect("first run errors", [err for job in first["jobs"] for err in job["errors"]], [])
+
+    second = run(work_dir / "full")
+    expect("incremental re-run raw files", sum(len(job["raw_files"]) for job in second["jobs"]), 0)
+
+    selected = run(work_dir / "selected", select=["primary"])
+    raw_files = [Path(raw) for job in selected["jobs"] for raw in job["raw_files"]]
+    expect("selective run raw files", sorted({raw.name for raw in raw_files}), ["selected-submission.txt"])
+    exhibits = sum('<TYPE>EX-' in raw.read_text(encoding='utf-8') for raw in raw_files)
+    expect("selective run exhibits fetched", exhibits, 0)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build and serve a stand-in EDGAR mirror, or check run_watchlist against it offline"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Serve the mirror until interrupted instead of running the watchlist check"
+    )
+    parser.add_argument(
+        "--dir",
+        default=None,
+        help="Mirror directory (default: a temporary directory, removed on exit)"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="Port for --serve (default: 8765)"
+    )
+
+    args = parser.parse_args()
+
+    temp_dir = None if args.dir else Path(tempfile.mkdtemp(prefix="fake-edgar-"))
+    work_dir = Path(args.dir) if args.dir else temp_dir
+    try:
+        mirror = build_mirror(work_dir / "mirror")
+        if args.serve:
+            server = serve_mirror(mirror, args.port)
+            print(f"Serving stand-in EDGAR mirror {mirror}")
+            print(f"Use: --backend urllib --base-url http://127.0.0.1:{server.server_port}")
+            print(f"Tickers: {', '.join(MIRROR_COMPANIES)} (Ctrl-C to stop)")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                server.shutdown()
+            return
+
+        start = time.perf_counter()
+        server = serve_mirror(mirror)
+        try:
+            failures = check_watchlist(work_dir, f"http://127.0.0.1:{server.server_port}")
+        finally:
+            server.shutdown()
+        if failures:
+            print(f"\n{len(failures)} checks failed")
+            sys.exit(1)
+        print(f"\nAll checks passed in {time.perf_counter() - start:.2f}s")
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3.11
+"""
+Fake Gemini Client
+In-memory stand-in for the google-genai client surface used by file_search_registry, for offline checks
+
+Features:
+1. files (upload / get / delete), file_search_stores (create / get / import_file / delete) and
+   operations (get) with the attributes the registry reads
+2. Counts every call, so a check can assert which remote steps were skipped
+3. Imports finish immediately, or after a set number of operation polls
+4. Run directly to check that a repeat get_or_create_store reuses the registered store
+   instead of uploading and indexing again
+"""
+import argparse
+import itertools
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+try:
+    from file_search_registry import FileSearchRegistry, get_or_create_store
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from file_search_registry import FileSearchRegistry, get_or_create_store
+
+
+class FakeNotFound(Exception):
+    """Raised for unknown file, store or operation names (like the API's 404)"""
+
+
+class _Files:
+    def __init__(self, client):
+        self.client = client
+        self.items = {}
+
+    def upload(self, file: str, config: dict = None) -> SimpleNamespace:
+        self.client.calls["files.upload"] += 1
+        name = f"files/fake-{next(self.client.ids)}"
+        self.items[name] = SimpleNamespace(
+            name=name,
+            display_name=(config or {}).get("display_name"),
+            size_bytes=Path(file).stat().st_size,
+            expiration_time=datetime.now(timezone.utc) + timedelta(hours=48),
+        )
+        return self.items[name]
+
+    def get(self, name: str) -> SimpleNamespace:
+        self.client.calls["files.get"] += 1
+        if name not in self.items:
+            raise FakeNotFound(name)
+        return self.items[name]
+
+    def delete(self, name: str):
+        self.client.calls["files.delete"] += 1
+        self.items.pop(name, None)
+
+
+class _FileSearchStores:
+    def __init__(self, client):
+        self.client = client
+        self.items = {}
+
+    def create(self, config: dict = None) -> SimpleNamespace:
+        self.client.calls["file_search_stores.create"] += 1
+        name = f"fileSearchStores/fake-{next(self.client.ids)}"
+        self.items[name] = SimpleNamespace(
+            name=name,
+            display_name=(config or {}).get("display_name"),
+            active_documents_count=0,
+            pending_documents_count=0,
+        )
+        return self.items[name]
+
+    def get(self, name: str) -> SimpleNamespace:
+        self.client.calls["file_search_stores.get"] += 1
+        if name not in self.items:
+            raise FakeNotFound(name)
+        return self.items[name]
+
+    def import_file(self, file_search_store_name: str, file_name: str) -> SimpleNamespace:
+        self.client.calls["file_search_stores.import_file"] += 1
+        store = self.get(file_search_store_name)
+        self.client.files.get(file_name)
+        store.pending_documents_count += 1
+        return self.client.operations.start(store)
+
+    def delete(self, name: str, config: dict = None):
+        self.client.calls["file_search_stores.delete"] += 1
+        self.items.pop(name, None)
+
+
+class _Operations:
+    def __init__(self, client):
+        self.client = client
+        self.items = {}
+
+    def start(self, store: SimpleNamespace) -> SimpleNamespace:
+        name = f"operations/fake-{next(self.client.ids)}"
+        self.items[name] = {"store": store, "polls_left": self.client.index_polls}
+        return self._status(name)
+
+    def _status(self, name: str) -> SimpleNamespace:
+        state = self.items[name]
+        done = state["polls_left"] <= 0
+        if done and state["store"].pending_documents_count:
+            state["store"].pending_documents_count -= 1
+            state["store"].active_documents_count += 1
+        return SimpleNamespace(name=name, done=done, error=None)
+
+    def get(self, operation) -> SimpleNamespace:
+        self.client.calls["operations.get"] += 1
+        name = getattr(operation, "name", operation)
+        if name not in self.items:
+            raise FakeNotFound(name)
+        self.items[name]["polls_left"] -= 1
+        return self._status(name)
+
+
+class FakeGenaiClient:
+    """files / file_search_stores / operations of genai.Client, held in memory"""
+
+    def __init__(self, index_polls: int = 0):
+        """
+        Args:
+            index_polls: operations.get calls before an import reports done (0 = done at once)
+        """
+        self.index_polls = index_polls
+        self.calls = Counter()
+        self.ids = itertools.count(1)  # Names are never reused, even after a delete
+        self.files = _Files(self)
+        self.file_search_stores = _FileSearchStores(self)
+        self.operations = _Operations(self)
+
+
+def check_registry_reuse(work_dir: Path) -> list[str]:
+    """
+    Index one file twice through get_or_create_store with a registry, then once more
+    after its store is deleted remotely
+
+    Returns:
+        Failure messages (empty if every check passed)
+    """
+    filing = work_dir / "cleaned.txt"
+    filing.write_text("ITEM 1. BUSINESS\nFake filing used to check the File Search registry.\n", encoding='utf-8')
+    registry = FileSearchRegistry(work_dir / "registry.json")
+    client = FakeGenaiClient()
+    failures = []
+
+    def expect(label: str, actual, expected):
+        status = "ok" if actual == expected else "FAILED"
+        print(f"  [{status}] {label}: {actual} (expected {expected})")
+        if actual != expected:
+            failures.append(f"{label}: {actual} != {expected}")
+
+    first = get_or_create_store(client, str(filing), registry)
+    expect("first call uploads", client.calls["files.upload"], 1)
+    expect("first call imports", client.calls["file_search_stores.import_file"], 1)
+
+    second = get_or_create_store(client, str(filing), registry)
+    expect("second call returns the same store", second, first)
+    expect("second call skips upload", client.calls["files.upload"], 1)
+    expect("second call skips import", client.calls["file_search_stores.import_file"], 1)
+    expect("second call records the use", next(iter(registry.load().values()))["uses"], 2)
+
+    client.file_search_stores.delete(first)
+    third = get_or_create_store(client, str(filing), registry)
+    expect("deleted store is re-created", third != first, True)
+    expect("live upload is re-imported without uploading", client.calls["files.upload"], 1)
+    expect("deleted store is re-imported", client.calls["file_search_stores.import_file"], 2)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check File Search registry reuse offline against a fake genai client"
+    )
+    parser.add_argument(
+        "--keep",
+        action="store_true",
+        help="Keep the temporary filing and registry, and print their directory"
+    )
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    work_dir = Path(tempfile.mkdtemp(prefix="fake-genai-"))
+    try:
+        failures = check_registry_reuse(work_dir)
+    finally:
+        if args.keep:
+            print(f"Work directory: {work_dir}")
+        else:
+            shutil.rmtree(work_dir)
+
+    if failures:
+        print(f"\n{len(failures)} checks failed")
+        sys.exit(1)
+    print(f"\nAll checks passed in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3.11
+"""
+File Search Store Registry
+Persistent local registry of filings already uploaded and indexed for Gemini File Search
+
+Features:
+1. Key = SHA-256 of the uploaded file's contents (same hash as the cleaned cache)
+2. Maps each key to its Files API file and File Search Store, with creation, last use and expiry times
+3. Entries are validated against the remote before reuse; missing or emptied stores are re-created
+4. A still-live Files API upload is re-imported instead of uploaded again
+5. Only needs a client object with the genai files / file_search_stores / operations
+   interface, so it runs against the in-memory fake in fake_genai.py as well
+
+Default location: ~/.cache/us-stock-researcher/file-search-stores.json (override with SEC_FILE_SEARCH_REGISTRY)
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    from cleaned_cache import hash_file
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from cleaned_cache import hash_file
+
+DEFAULT_REGISTRY_PATH = Path.home() / ".cache" / "us-stock-researcher" / "file-search-stores.json"
+# Stores persist until deleted, re-index after this long anyway so stale stores get replaced
+DEFAULT_TTL_DAYS = 30
+# Files API uploads are deleted after 48 hours
+FILE_TTL_SECONDS = 48 * 3600
+INDEX_POLL_SECONDS = 5
+INDEX_TIMEOUT_SECONDS = 600
+
+
+def get_default_registry_path() -> Path:
+    """
+    Registry path from SEC_FILE_SEARCH_REGISTRY, or ~/.cache/us-stock-researcher/file-search-stores.json
+    """
+    return Path(os.getenv("SEC_FILE_SEARCH_REGISTRY", str(DEFAULT_REGISTRY_PATH)))
+
+
+class FileSearchRegistry:
+    """Content hash -> Files API file and File Search Store"""
+
+    def __init__(self, path: str = None, ttl_days: float = DEFAULT_TTL_DAYS):
+        self.path = Path(path) if path else get_default_registry_path()
+        self.ttl_seconds = ttl_days * 86400
+        # Serializes read-modify-write when several research threads share the registry
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        """
+        All entries, {content hash: entry}
+        """
+        try:
+            return json.loads(self.path.read_text(encoding='utf-8'))["entries"]
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def save(self, entries: dict):
+        """
+        Replace all entries (written atomically)
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"entries": entries}, indent=2), encoding='utf-8')
+        tmp.replace(self.path)
+
+    def get(self, content_hash: str) -> Optional[dict]:
+        """
+        Entry for a content hash, None if unknown or past its expiry
+        """
+        entry = self.load().get(content_hash)
+        if entry is None or is_expired(entry):
+            return None
+        return entry
+
+    def put(self, content_hash: str, entry: dict):
+        """
+        Add or replace the entry for a content hash
+        """
+        with self._lock:
+            entries = self.load()
+            entries[content_hash] = entry
+            self.save(entries)
+
+    def touch(self, content_hash: str):
+        """
+        Record a reuse of an entry
+        """
+        with self._lock:
+            entries = self.load()
+            if content_hash in entries:
+                entries[content_hash]["last_used_at"] = time.time()
+                entries[content_hash]["uses"] = entries[content_hash].get("uses", 0) + 1
+                self.save(entries)
+
+    def remove(self, content_hash: str) -> Optional[dict]:
+        """
+        Drop an entry
+
+        Returns:
+            Removed entry, None if it wasn't registered
+        """
+        with self._lock:
+            entries = self.load()
+            entry = entries.pop(content_hash, None)
+            if entry is not None:
+                self.save(entries)
+        return entry
+
+    def clear(self):
+        """
+        Remove the registry file (remote stores are left alone)
+        """
+        self.path.unlink(missing_ok=True)
+
+
+def is_expired(entry: dict, now: float = None) -> bool:
+    """
+    Whether an entry is past its store expiry
+    """
+    return (now or time.time()) >= entry.get("expires_at", 0)
+
+
+def file_is_live(entry: dict, now: float = None) -> bool:
+    """
+    Whether an entry's Files API upload is still within its 48-hour lifetime
+    """
+    return bool(entry.get("file_name")) and (now or time.time()) < entry.get("file_expires_at", 0)
+
+
+def validate_store(client, entry: dict) -> bool:
+    """
+    Check that an entry's File Search Store still exists remotely and holds documents
+
+    Returns:
+        False if the store is gone, or reports no active or pending documents
+    """
+    try:
+        store = client.file_search_stores.get(name=entry["store_name"])
+    except Exception:
+        return False
+    active = getattr(store, "active_documents_count", None)
+    pending = getattr(store, "pending_documents_count", None)
+    if active is None and pending is None:
+        return True  # Counts not reported, existence is all we can check
+    return bool(active or pending)
+
+
+def validate_file(client, entry: dict) -> bool:
+    """
+    Check that an entry's Files API upload is within its lifetime and still exists remotely
+    """
+    if not file_is_live(entry):
+        return False
+    try:
+        client.files.get(name=entry["file_name"])
+    except Exception:
+        return False
+    return True
+
+
+def wait_for_operation(client, operation, timeout: float = INDEX_TIMEOUT_SECONDS):
+    """
+    Poll a long-running import operation until done
+
+    Returns:
+        Finished operation
+    """
+    wait_count = 0
+    start_time = time.time()
+    while not operation.done:
+        if time.time() - start_time > timeout:
+            raise TimeoutError(f"File indexing timed out after {timeout}s")
+        time.sleep(INDEX_POLL_SECONDS)
+        wait_count += 1
+        operation = client.operations.get(operation)
+        print(f"  Indexing status: "
+              f"{'Complete' if operation.done else f'Processing... ({wait_count * INDEX_POLL_SECONDS}s)'}")
+    error = getattr(operation, "error", None)
+    if error:
+        raise RuntimeError(f"File import failed: {error}")
+    return operation
+
+
+def upload_file(client, file_path: str) -> tuple[str, float]:
+    """
+    Upload a file to the Files API
+
+    Returns:
+        (file name, expiry as epoch seconds)
+    """
+    print("Uploading file to Files API...")
+    uploaded_file = client.files.upload(
+        file=file_path,
+        config={'display_name': Path(file_path).stem}
+    )
+    print(f"File upload successful: {uploaded_file.name}")
+    expiration = getattr(uploaded_file, "expiration_time", None)
+    expires_at = expiration.timestamp() if hasattr(expiration, "timestamp") else time.time() + FILE_TTL_SECONDS
+    return uploaded_file.name, expires_at
+
+
+def get_or_create_store(
+    client,
+    file_path: str,
+    registry: Optional[FileSearchRegistry] = None,
+    display_name: str = None,
+    index_timeout: float = INDEX_TIMEOUT_SECONDS
+) -> str:
+    """
+    File Search Store holding file_path, reused from the registry when possible
+
+    A registered store that still validates remotely is returned without any
+    upload or indexing. Otherwise the file is uploaded (or its still-live
+    Files API upload reused), imported into a new store, indexed and registered.
+
+    Args:
+        client: genai.Client (or an object with the same files / file_search_stores / operations interface)
+        file_path: Local file path
+        registry: Registry to look up and record stores in (None = always upload)
+        display_name: New store's display name (default: sec-filing-<hash prefix>)
+        index_timeout: Maximum seconds to wait for indexing
+
+    Returns:
+        File Search Store name
+    """
+    content_hash = hash_file(file_path)
+    entry = registry.load().get(content_hash) if registry else None
+    if entry is not None and not is_expired(entry):
+        if validate_store(client, entry):
+            registry.touch(content_hash)
+            print(f"Reusing File Search Store {entry['store_name']} (indexed "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['created_at']))}), "
+                  f"skipping upload and indexing")
+            return entry["store_name"]
+        print(f"Registered File Search Store {entry['store_name']} no longer valid, re-indexing")
+
+    if entry is not None and validate_file(client, entry):
+        file_name, file_expires_at = entry["file_name"], entry["file_expires_at"]
+        print(f"Reusing uploaded file {file_name}, skipping upload")
+    else:
+        file_name, file_expires_at = upload_file(client, file_path)
+
+    if not display_name:
+        display_name = f"sec-filing-{content_hash[:12]}"
+    print(f"Creating File Search Store: {display_name}")
+    file_search_store = client.file_search_stores.create(
+        config={'display_name': display_name}
+    )
+    print(f"File Search Store created: {file_search_store.name}")
+
+    print("Importing file to File Search Store...")
+    operation = client.file_search_stores.import_file(
+        file_search_store_name=file_search_store.name,
+        file_name=file_name
+    )
+    print("Waiting for file indexing to complete...")
+    wait_for_operation(client, operation, index_timeout)
+    print("File import and indexing complete!")
+
+    if registry is not None:
+        now = time.time()
+        try:
+            registry.put(content_hash, {
+                "source": str(Path(file_path).resolve()),
+                "size": Path(file_path).stat().st_size,
+                "display_name": display_name,
+                "file_name": file_name,
+                "file_expires_at": file_expires_at,
+                "store_name": file_search_store.name,
+                "created_at": now,
+                "last_used_at": now,
+                "expires_at": now + registry.ttl_seconds,
+                "uses": 1,
+            })
+        except OSError as e:
+            print(f"Warning: Could not record File Search Store in registry: {e}")
+    return file_search_store.name
+
+
+def prune_registry(client, registry: FileSearchRegistry, delete_remote: bool = True) -> int:
+    """
+    Drop expired entries and entries whose store no longer validates
+
+    Args:
+        client: genai.Client, None to only drop locally expired entries
+        registry: Registry to prune
+        delete_remote: Also delete expired entries' stores remotely
+
+    Returns:
+        Number of entries removed
+    """
+    entries = registry.load()
+    removed = 0
+    for content_hash, entry in list(entries.items()):
+        if is_expired(entry):
+            if client is not None and delete_remote:
+                try:
+                    client.file_search_stores.delete(name=entry["store_name"], config={'force': True})
+                    print(f"Deleted expired store {entry['store_name']}")
+                except Exception as e:
+                    print(f"Warning: Could not delete store {entry['store_name']}: {e}")
+        elif client is None or validate_store(client, entry):
+            continue
+        del entries[content_hash]
+        removed += 1
+    registry.save(entries)
+    return removed
+
+
+def make_client():
+    """
+    genai client for validation and pruning from the command line
+    """
+    try:
+        from google import genai
+    except ImportError:
+        print("Error: Please install google-genai first")
+        print("Run: pip install google-genai")
+        sys.exit(1)
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        print("Error: Please set environment variable GEMINI_API_KEY")
+        sys.exit(1)
+    return genai.Client(api_key=api_key)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect or manage the registry of File Search Stores built for SEC filings"
+    )
+    parser.add_argument(
+        "--registry",
+        default=None,
+        help="Registry file (default: $SEC_FILE_SEARCH_REGISTRY or ~/.cache/us-stock-researcher/file-search-stores.json)"
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Check each entry's store and uploaded file against the remote (GEMINI_API_KEY)"
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Delete expired stores remotely and drop entries that are expired or no longer valid (GEMINI_API_KEY)"
+    )
+    parser.add_argument(
+        "--clear",
+        action="store_true",
+        help="Remove the local registry (remote stores are kept)"
+    )
+
+    args = parser.parse_args()
+    registry = FileSearchRegistry(args.registry)
+
+    if args.clear:
+        registry.clear()
+        print(f"Registry cleared: {registry.path}")
+        return
+
+    client = make_client() if args.validate or args.prune else None
+    if args.prune:
+        removed = prune_registry(client, registry)
+        print(f"Pruned {removed} entries")
+
+    entries = registry.load()
+    print(f"Registry: {registry.path}")
+    print(f"Entries: {len(entries)}")
+    now = time.time()
+    for content_hash, entry in sorted(entries.items(), key=lambda item: -item[1].get("last_used_at", 0)):
+        status = "expired" if is_expired(entry, now) else f"{(entry['expires_at'] - now) / 86400:.0f}d left"
+        file_status = "file live" if file_is_live(entry, now) else "file expired"
+        if client is not None:
+            status += ", store ok" if validate_store(client, entry) else ", store INVALID"
+            if file_is_live(entry, now):
+                file_status = "file live" if validate_file(client, entry) else "file missing"
+        print(f"  {content_hash[:12]}  {entry['store_name']}  {Path(entry['source']).parent.name}/"
+              f"{Path(entry['source']).name}  uses {entry.get('uses', 0)}  {status}, {file_status}")
+
+
+if __name__ == "__main__":
+    main()
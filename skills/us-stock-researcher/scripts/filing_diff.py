@@ -0,0 +1,534 @@
+#!/usr/bin/env python3.11
+"""
+Cross-Period Filing Diff
+Compares a cleaned filing with the previous period's and keeps only what changed
+
+Features:
+1. Aligns Item sections by id (section_index.py), whole primary document when no Items are found
+2. Paragraph-level diff per section, paragraphs that only moved between sections are not reported
+3. Word-level [-old-]{+new+} markup for edited paragraphs, cell-level for tables of the same shape
+4. One-line summaries for unchanged sections (title, paragraph and token counts)
+5. Writes a compact "changes since last period" document (cleaned.diff.txt)
+6. Finds the previous period's cleaned.txt among sibling accession directories
+"""
+import argparse
+import difflib
+import re
+import sys
+from pathlib import Path
+from typing import Optional
+
+try:
+    from section_index import load_or_build_section_index, read_range
+    from token_counter import FilingTokenizer, count_file_tokens, count_tokens
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from section_index import load_or_build_section_index, read_range
+    from token_counter import FilingTokenizer, count_file_tokens, count_tokens
+
+SEPARATOR = "=" * 60
+
+PERIOD_PATTERN = re.compile(r'^\s*CONFORMED PERIOD OF REPORT:\s*(\d{8})', re.MULTILINE)
+FILED_PATTERN = re.compile(r'^\s*FILED AS OF DATE:\s*(\d{8})', re.MULTILINE)
+SUBMISSION_TYPE_PATTERN = re.compile(r'^\s*CONFORMED SUBMISSION TYPE:\s*(\S+)', re.MULTILINE)
+HEADER_READ_BYTES = 16 * 1024
+
+PARAGRAPH_SPLIT_PATTERN = re.compile(r'\n[ \t]*\n')
+WORD_PATTERN = re.compile(r'[^\s]+|\n')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# Markdown cell separator, "\|" is an escaped pipe inside a cell
+CELL_SPLIT_PATTERN = re.compile(r'(?<!\\)\|')
+
+# Edited paragraphs below this word similarity are shown as removed + added instead
+MIN_EDIT_SIMILARITY = 0.5
+# Removed paragraphs are only previewed, the analysis is about the current filing
+REMOVED_PREVIEW_CHARS = 300
+
+# Pseudo-section used when a filing has no detectable Item headings
+FULL_DOCUMENT_ID = "document"
+
+
+def get_diff_path(cleaned_path: str) -> Path:
+    """
+    Diff document location: cleaned.txt -> cleaned.diff.txt
+    """
+    return Path(cleaned_path).with_suffix('.diff.txt')
+
+
+def read_filing_dates(cleaned_path: str) -> dict:
+    """
+    Read form, period of report and filing date from the SEC header of cleaned.txt
+
+    Returns:
+        Dict: form, period, filed (YYYY-MM-DD or None)
+    """
+    with open(cleaned_path, 'rb') as f:
+        head = f.read(HEADER_READ_BYTES).decode('utf-8', errors='replace')
+
+    def find(pattern):
+        match = pattern.search(head)
+        return match.group(1) if match else None
+
+    def iso(value):
+        return f"{value[:4]}-{value[4:6]}-{value[6:]}" if value else None
+
+    return {
+        "form": find(SUBMISSION_TYPE_PATTERN),
+        "period": iso(find(PERIOD_PATTERN)),
+        "filed": iso(find(FILED_PATTERN)),
+    }
+
+
+def find_previous_filing(cleaned_path: str) -> Optional[Path]:
+    """
+    Find the previous period's cleaned file next to this one
+
+    Looks at sibling accession directories ({TYPE}/{accession}/cleaned.txt) and
+    picks the latest filing dated before this one (period of report, else filing date)
+
+    Returns:
+        Previous cleaned path, None if there is none
+    """
+    current = Path(cleaned_path).resolve()
+
+    def sort_key(path):
+        dates = read_filing_dates(str(path))
+        return dates["period"] or dates["filed"]
+
+    current_key = sort_key(current)
+    if current_key is None:
+        return None
+
+    candidates = []
+    for path in current.parent.parent.glob(f"*/{current.name}"):
+        if path.resolve() == current:
+            continue
+        key = sort_key(path)
+        if key and key < current_key:
+            candidates.append((key, path))
+    return max(candidates)[1] if candidates else None
+
+
+def load_filing_sections(cleaned_path: str, section_ids: list[str] = None) -> dict:
+    """
+    Read the header and Item sections of a cleaned filing
+
+    Args:
+        cleaned_path: cleaned.txt path
+        section_ids: Only these Item ids (default: all)
+
+    Returns:
+        Dict: form, header (text), sections ({id: {title, text, tokens}} in filing order)
+    """
+    index = load_or_build_section_index(cleaned_path)
+    header = read_range(cleaned_path, index["header"]["offset"], index["header"]["length"]).strip()
+    sections = {}
+    for section in index["sections"]:
+        if section_ids and section["id"] not in section_ids:
+            continue
+        sections[section["id"]] = {
+            "title": section["title"],
+            "text": read_range(cleaned_path, section["offset"], section["length"]),
+            "tokens": section["tokens"],
+        }
+
+    if not index["sections"]:
+        # No Item headings: compare everything after the SEC header as one section
+        with open(cleaned_path, 'rb') as f:
+            f.seek(index["header"]["length"])
+            text = f.read().decode('utf-8', errors='replace')
+        sections[FULL_DOCUMENT_ID] = {"title": "Full filing", "text": text, "tokens": count_tokens(text)}
+
+    return {"form": index["form"], "header": header, "sections": sections}
+
+
+def split_paragraphs(text: str) -> list[str]:
+    """
+    Split section text at blank lines
+    """
+    return [p.strip() for p in PARAGRAPH_SPLIT_PATTERN.split(text) if p.strip()]
+
+
+def paragraph_key(paragraph: str) -> str:
+    """
+    Comparison key: whitespace-normalized text (re-wrapping is not a change)
+    """
+    return WHITESPACE_PATTERN.sub(' ', paragraph)
+
+
+def join_words(words: list[str]) -> str:
+    """
+    Join word tokens with spaces, keeping line breaks (table rows) as breaks
+    """
+    return ' '.join(words).replace(' \n ', '\n').replace(' \n', '\n').replace('\n ', '\n')
+
+
+def split_table_rows(paragraph: str) -> Optional[list[list[str]]]:
+    """
+    Cells per row of a Markdown or TSV table paragraph
+
+    Returns:
+        Rows of cells, None if the paragraph is not a table
+    """
+    lines = paragraph.split('\n')
+    if all(line.startswith('|') and line.rstrip().endswith('|') for line in lines):
+        return [[cell.strip() for cell in CELL_SPLIT_PATTERN.split(line.strip()[1:-1])] for line in lines]
+    if len(lines) > 1 and all('\t' in line for line in lines):
+        return [line.split('\t') for line in lines]
+    return None
+
+
+def table_diff(old: str, new: str) -> Optional[str]:
+    """
+    Mark changed cells of a table whose shape (rows x columns) is unchanged
+
+    Cells are compared by position, so a shifted period column reads as
+    "[-383,285-]{+391,035+}" per cell instead of a misaligned word diff
+
+    Returns:
+        New table with changed cells marked, None if not tables of the same shape
+    """
+    old_rows = split_table_rows(old)
+    new_rows = split_table_rows(new)
+    if old_rows is None or new_rows is None or [len(r) for r in old_rows] != [len(r) for r in new_rows]:
+        return None
+    markdown = new.startswith('|')
+    lines = []
+    for old_row, new_row in zip(old_rows, new_rows):
+        cells = [n if o == n else f"[-{o}-]{{+{n}+}}" for o, n in zip(old_row, new_row)]
+        lines.append(f"| {' | '.join(cells)} |" if markdown else '\t'.join(cells))
+    return '\n'.join(lines)
+
+
+def word_diff(old: str, new: str) -> tuple[str, float]:
+    """
+    Mark word-level changes between two versions of a paragraph
+
+    Returns:
+        (new text with [-removed-] and {+added+} markup, word similarity 0..1)
+    """
+    old_words = WORD_PATTERN.findall(old)
+    new_words = WORD_PATTERN.findall(new)
+    matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+    parts = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            parts.append(join_words(new_words[j1:j2]))
+            continue
+        removed = join_words([w for w in old_words[i1:i2] if w != '\n'])
+        added = join_words([w for w in new_words[j1:j2] if w != '\n'])
+        parts.append((f"[-{removed}-]" if removed else "") + (f"{{+{added}+}}" if added else ""))
+    return join_words(parts), matcher.ratio()
+
+
+def preview(text: str, chars: int = REMOVED_PREVIEW_CHARS) -> str:
+    """
+    First chars of a paragraph on one line
+    """
+    text = paragraph_key(text)
+    return text if len(text) <= chars else text[:chars].rstrip() + "..."
+
+
+def diff_section(old_text: str, new_text: str, moved_from: set, moved_to: set) -> dict:
+    """
+    Paragraph-level diff of one section
+
+    Args:
+        old_text: Section text in the previous filing
+        new_text: Section text in the current filing
+        moved_from: Paragraph keys anywhere in the previous filing
+        moved_to: Paragraph keys anywhere in the current filing
+
+    Returns:
+        Dict: paragraphs, unchanged, added, removed, edited, moved counts, changes (list of (kind, text))
+    """
+    old_paragraphs = split_paragraphs(old_text)
+    new_paragraphs = split_paragraphs(new_text)
+    old_keys = [paragraph_key(p) for p in old_paragraphs]
+    new_keys = [paragraph_key(p) for p in new_paragraphs]
+
+    result = {"paragraphs": len(new_paragraphs), "unchanged": 0, "added": 0, "removed": 0,
+              "edited": 0, "moved": 0, "changes": []}
+
+    def add(index):
+        # Same paragraph elsewhere in the previous filing: moved, not new
+        if new_keys[index] in moved_from:
+            result["moved"] += 1
+            return
+        result["added"] += 1
+        result["changes"].append(("Added", new_paragraphs[index]))
+
+    def remove(index):
+        if old_keys[index] in moved_to:
+            return
+        result["removed"] += 1
+        result["changes"].append(("Removed", preview(old_paragraphs[index])))
+
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            result["unchanged"] += i2 - i1
+            continue
+        # Pair replaced paragraphs in order, leftovers are plain removals/additions
+        pairs = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+        for k in range(pairs):
+            marked = table_diff(old_paragraphs[i1 + k], new_paragraphs[j1 + k])
+            similarity = 1.0
+            if marked is None:
+                marked, similarity = word_diff(old_paragraphs[i1 + k], new_paragraphs[j1 + k])
+            if similarity >= MIN_EDIT_SIMILARITY:
+                result["edited"] += 1
+                result["changes"].append(("Edited", marked))
+            else:
+                remove(i1 + k)
+                add(j1 + k)
+        for i in range(i1 + pairs, i2):
+            remove(i)
+        for j in range(j1 + pairs, j2):
+            add(j)
+
+    return result
+
+
+def section_heading(section_id: str, title: str) -> str:
+    """
+    Display heading of a section ("Item 7. Management's Discussion ...")
+    """
+    if section_id == FULL_DOCUMENT_ID:
+        return title
+    part, _, item = section_id.rpartition('-')
+    label = f"Part {part}, Item {item}" if part else f"Item {item}"
+    return f"{label}. {title}" if title else label
+
+
+def diff_filings(cleaned_path: str, previous_path: str, section_ids: list[str] = None, tokenizer=None) -> dict:
+    """
+    Compare a cleaned filing with the previous period's and build the changes document
+
+    Args:
+        cleaned_path: Current cleaned.txt
+        previous_path: Previous period's cleaned.txt
+        section_ids: Only compare these Item ids (default: all)
+        tokenizer: token_counter tokenizer for the savings figures (default: filing approximation)
+
+    Returns:
+        Dict: text (changes document), tokens, full_tokens, current/previous (form, period, filed),
+        sections (per-section status and counts), totals, changed (False if nothing changed)
+    """
+    tokenizer = tokenizer or FilingTokenizer()
+    section_ids = [s.upper() for s in section_ids] if section_ids else None
+    current = load_filing_sections(cleaned_path, section_ids)
+    previous = load_filing_sections(previous_path, section_ids)
+    current_dates = read_filing_dates(cleaned_path)
+    previous_dates = read_filing_dates(previous_path)
+
+    moved_to = {paragraph_key(p) for s in current["sections"].values() for p in split_paragraphs(s["text"])}
+    moved_from = {paragraph_key(p) for s in previous["sections"].values() for p in split_paragraphs(s["text"])}
+
+    sections = []
+    totals = {"paragraphs": 0, "unchanged": 0, "added": 0, "removed": 0, "edited": 0, "moved": 0}
+    for section_id, section in current["sections"].items():
+        old = previous["sections"].get(section_id)
+        if old is None:
+            paragraphs = split_paragraphs(section["text"])
+            entry = {"paragraphs": len(paragraphs), "unchanged": 0, "added": len(paragraphs), "removed": 0,
+                     "edited": 0, "moved": 0, "changes": [("Added", p) for p in paragraphs], "status": "new"}
+        else:
+            entry = diff_section(old["text"], section["text"], moved_from, moved_to)
+            entry["status"] = "changed" if entry["changes"] else "unchanged"
+        entry.update(id=section_id, title=section["title"], tokens=section["tokens"])
+        sections.append(entry)
+        for key in totals:
+            totals[key] += entry[key]
+
+    removed_sections = [
+        {"id": section_id, "title": old["title"], "status": "removed"}
+        for section_id, old in previous["sections"].items() if section_id not in current["sections"]
+    ]
+
+    text = format_diff(current, current_dates, previous_dates, sections, removed_sections, totals)
+    if section_ids:
+        full_tokens = sum(s["tokens"] for s in current["sections"].values())
+    else:
+        full_tokens = count_file_tokens(cleaned_path, tokenizer)
+    return {
+        "text": text,
+        "tokens": count_tokens(text, tokenizer),
+        "full_tokens": full_tokens,
+        "current": current_dates,
+        "previous": previous_dates,
+        "sections": [{k: v for k, v in s.items() if k != "changes"} for s in sections] + removed_sections,
+        "totals": totals,
+        "changed": any(s["status"] != "unchanged" for s in sections) or bool(removed_sections),
+    }
+
+
+def describe_filing(dates: dict) -> str:
+    """
+    One-line filing label: "10-Q, period 2025-06-28, filed 2025-08-01"
+    """
+    parts = [dates["form"] or "filing"]
+    if dates["period"]:
+        parts.append(f"period {dates['period']}")
+    if dates["filed"]:
+        parts.append(f"filed {dates['filed']}")
+    return ', '.join(parts)
+
+
+def format_diff(
+    current: dict,
+    current_dates: dict,
+    previous_dates: dict,
+    sections: list[dict],
+    removed_sections: list[dict],
+    totals: dict
+) -> str:
+    """
+    Render the changes document: summary, current SEC header, unchanged sections, changes per section
+    """
+    counts = {status: sum(1 for s in sections if s["status"] == status) for status in ("changed", "unchanged", "new")}
+    lines = [
+        SEPARATOR,
+        "CHANGES SINCE LAST PERIOD",
+        SEPARATOR,
+        f"Current: {describe_filing(current_dates)}",
+        f"Previous: {describe_filing(previous_dates)}",
+        f"Sections: {counts['changed']} changed, {counts['unchanged']} unchanged, "
+        f"{counts['new']} new, {len(removed_sections)} removed",
+        f"Paragraphs: {totals['edited']} edited, {totals['added']} added, {totals['removed']} removed, "
+        f"{totals['unchanged'] + totals['moved']} unchanged",
+        "Edits are marked [-previous text-]{+current text+}; removed paragraphs are previewed only",
+        "",
+        "",
+        current["header"],
+    ]
+
+    unchanged = [s for s in sections if s["status"] == "unchanged"]
+    if unchanged or removed_sections:
+        lines += ["", "", SEPARATOR, "UNCHANGED SECTIONS", SEPARATOR]
+        for s in unchanged:
+            lines.append(f"- {section_heading(s['id'], s['title'])}: unchanged "
+                         f"({s['paragraphs']:,} paragraphs, {s['tokens']:,} tokens, not included)")
+        for s in removed_sections:
+            lines.append(f"- {section_heading(s['id'], s['title'])}: not present in the current filing")
+
+    for s in sections:
+        if s["status"] == "unchanged":
+            continue
+        if s["status"] == "new":
+            note = "new section, not in the previous filing"
+        else:
+            note = (f"{s['edited']} edited, {s['added']} added, {s['removed']} removed, "
+                    f"{s['unchanged'] + s['moved']} of {s['paragraphs']} paragraphs unchanged")
+        lines += ["", "", SEPARATOR, f"{section_heading(s['id'], s['title'])} ({note})", SEPARATOR]
+        for kind, text in s["changes"]:
+            lines += ["", f"[{kind}]", text]
+
+    return '\n'.join(lines) + '\n'
+
+
+def write_diff(result: dict, cleaned_path: str, output_path: str = None) -> Path:
+    """
+    Persist the changes document (written atomically)
+
+    Args:
+        result: diff_filings result
+        cleaned_path: Current cleaned.txt (default location: cleaned.diff.txt next to it)
+        output_path: Explicit output path
+
+    Returns:
+        Written path
+    """
+    diff_path = Path(output_path) if output_path else get_diff_path(cleaned_path)
+    diff_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = diff_path.with_name(diff_path.name + '.tmp')
+    tmp_path.write_text(result["text"], encoding='utf-8')
+    tmp_path.replace(diff_path)
+    return diff_path
+
+
+def print_diff_summary(result: dict):
+    """
+    Print section statuses and token savings of a diff
+    """
+    print(f"Current: {describe_filing(result['current'])}")
+    print(f"Previous: {describe_filing(result['previous'])}")
+    print(f"{'ITEM':<10} {'STATUS':<10} {'EDITED':>7} {'ADDED':>6} {'REMOVED':>8}  TITLE")
+    for s in result["sections"]:
+        if s["status"] == "removed":
+            print(f"{s['id']:<10} {s['status']:<10} {'':>7} {'':>6} {'':>8}  {s['title']}")
+            continue
+        print(f"{s['id']:<10} {s['status']:<10} {s['edited']:>7} {s['added']:>6} {s['removed']:>8}  {s['title']}")
+    saved = 1 - result["tokens"] / max(result["full_tokens"], 1)
+    size = f"{saved:.0%} smaller" if saved >= 0 else f"{-saved:.0%} larger"
+    print(f"Tokens: {result['tokens']:,} (full filing {result['full_tokens']:,}, {size})")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare a cleaned filing with the previous period's and write only what changed"
+    )
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="Current cleaned file path (cleaned.txt)"
+    )
+    parser.add_argument(
+        "--previous",
+        default=None,
+        help="Previous period's cleaned file (default: latest earlier filing in a sibling accession directory)"
+    )
+    parser.add_argument(
+        "--sections",
+        default=None,
+        help="Only compare these Item sections, comma-separated (e.g. 1A,7,8)"
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Changes document path (default: cleaned.diff.txt next to the input)"
+    )
+    parser.add_argument(
+        "--print",
+        action="store_true",
+        dest="print_text",
+        help="Print the changes document instead of writing it"
+    )
+
+    args = parser.parse_args()
+
+    if not Path(args.input).exists():
+        print(f"Error: Input file not found {args.input}")
+        sys.exit(1)
+
+    previous = args.previous or find_previous_filing(args.input)
+    if previous is None:
+        print("Error: No previous filing found, pass --previous")
+        sys.exit(1)
+    if not Path(previous).exists():
+        print(f"Error: Previous file not found {previous}")
+        sys.exit(1)
+
+    sections = args.sections.split(',') if args.sections else None
+    try:
+        result = diff_filings(args.input, str(previous), sections)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.print_text:
+        print(result["text"])
+        return
+
+    if result["current"]["form"] != result["previous"]["form"]:
+        print(f"Warning: Comparing {result['current']['form']} with {result['previous']['form']}, "
+              f"sections may not align")
+    diff_path = write_diff(result, args.input, args.output)
+    print_diff_summary(result)
+    print(f"Changes document: {diff_path}")
+
+
+if __name__ == "__main__":
+    main()
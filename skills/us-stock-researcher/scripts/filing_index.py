@@ -0,0 +1,252 @@
+#!/usr/bin/env python3.11
+"""
+SEC Filing Offset Index
+Locates documents inside a raw full-submission.txt without decoding it
+
+Features:
+1. Memory-maps the submission and finds <SEC-HEADER> / <DOCUMENT> boundaries on raw bytes
+2. Reads <TYPE>, <SEQUENCE>, <DESCRIPTION>, <FILENAME> of each document from its SGML header
+3. Persists an offset table next to the filing (full-submission.index.json)
+4. Later runs reuse the table and read only the byte ranges they need
+"""
+import argparse
+import json
+import mmap
+import re
+import sys
+from pathlib import Path
+from typing import Optional
+
+# Bump when the index layout changes, stale files are rebuilt
+INDEX_VERSION = 1
+
+DOC_START = b'<DOCUMENT>'
+DOC_END = b'</DOCUMENT>'
+HEADER_START = b'<SEC-HEADER>'
+HEADER_END = b'</SEC-HEADER>'
+TEXT_START = b'<TEXT>'
+
+# Same fields as the cleaner's str patterns; \r excluded so CRLF files give the same values
+FIELD_PATTERNS = {
+    "type": re.compile(rb'<TYPE>([^<\r\n]+)'),
+    "sequence": re.compile(rb'<SEQUENCE>([^<\r\n]+)'),
+    "description": re.compile(rb'<DESCRIPTION>([^<\r\n]+)'),
+    "filename": re.compile(rb'<FILENAME>([^<\r\n]+)'),
+}
+
+
+def get_index_path(input_path: str) -> Path:
+    """
+    Index file location: full-submission.txt -> full-submission.index.json
+    """
+    return Path(input_path).with_suffix('.index.json')
+
+
+def _decode_field(value: bytes) -> str:
+    return value.decode('utf-8', errors='replace').strip()
+
+
+def scan_documents(data, size: int) -> dict:
+    """
+    Find header and document byte ranges in raw submission bytes
+
+    Args:
+        data: bytes-like object supporting find() and regex search (bytes or mmap)
+        size: Length of data
+
+    Returns:
+        Dict with header range (or None) and list of document entries
+    """
+    header = None
+    header_start = data.find(HEADER_START)
+    if header_start >= 0:
+        body_start = header_start + len(HEADER_START)
+        header_end = data.find(HEADER_END, body_start)
+        if header_end >= 0:
+            header = [body_start, header_end]
+
+    documents = []
+    pos = 0
+    while True:
+        start = data.find(DOC_START, pos)
+        if start < 0:
+            break
+        start += len(DOC_START)
+        end = data.find(DOC_END, start)
+        if end < 0:
+            break
+
+        # Header fields live before <TEXT>, only TYPE falls back to the whole body
+        text_start = data.find(TEXT_START, start, end)
+        fields_end = text_start if text_start >= 0 else end
+
+        entry = {"index": len(documents) + 1}
+        for name, pattern in FIELD_PATTERNS.items():
+            match = pattern.search(data, start, fields_end)
+            if match is None and name == "type" and fields_end < end:
+                match = pattern.search(data, start, end)
+            entry[name] = _decode_field(match.group(1)) if match else ''
+        entry["start"] = start
+        entry["end"] = end
+        documents.append(entry)
+
+        pos = end + len(DOC_END)
+
+    return {"header": header, "documents": documents}
+
+
+def build_filing_index(input_path: str) -> dict:
+    """
+    Build offset index for a full-submission.txt by memory-mapping it
+
+    Args:
+        input_path: Raw submission path
+
+    Returns:
+        Index dict: version, source size/mtime, header range, document entries
+    """
+    input_file = Path(input_path)
+    stat = input_file.stat()
+
+    if stat.st_size == 0:
+        scanned = {"header": None, "documents": []}
+    else:
+        with open(input_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            scanned = scan_documents(mm, stat.st_size)
+
+    return {
+        "version": INDEX_VERSION,
+        "source": input_file.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        **scanned,
+    }
+
+
+def write_filing_index(index: dict, input_path: str) -> Path:
+    """
+    Persist index next to the filing
+
+    Returns:
+        Index file path
+    """
+    index_path = get_index_path(input_path)
+    tmp_path = index_path.with_suffix('.json.tmp')
+    tmp_path.write_text(json.dumps(index, indent=1), encoding='utf-8')
+    tmp_path.replace(index_path)
+    return index_path
+
+
+def load_filing_index(input_path: str) -> Optional[dict]:
+    """
+    Load persisted index if it is still valid for the filing
+
+    Returns:
+        Index dict, None if missing, unreadable, or stale (size/mtime/version changed)
+    """
+    index_path = get_index_path(input_path)
+    if not index_path.exists():
+        return None
+
+    try:
+        index = json.loads(index_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+    stat = Path(input_path).stat()
+    if (index.get("version") != INDEX_VERSION
+            or index.get("size") != stat.st_size
+            or index.get("mtime_ns") != stat.st_mtime_ns):
+        return None
+
+    return index
+
+
+def load_or_build_filing_index(input_path: str, persist: bool = True) -> dict:
+    """
+    Reuse persisted index or build (and persist) a new one
+
+    Args:
+        input_path: Raw submission path
+        persist: Write a newly built index next to the filing
+
+    Returns:
+        Index dict
+    """
+    index = load_filing_index(input_path)
+    if index is not None:
+        return index
+
+    index = build_filing_index(input_path)
+    if persist:
+        try:
+            write_filing_index(index, input_path)
+        except OSError as e:
+            print(f"Warning: Could not write filing index: {e}")
+    return index
+
+
+def match_doc_type(doc_type: str, types: list[str]) -> bool:
+    """
+    Check document type against exact types or prefixes ending in '*'
+    """
+    for wanted in types:
+        if wanted.endswith('*'):
+            if doc_type.startswith(wanted[:-1]):
+                return True
+        elif doc_type == wanted:
+            return True
+    return False
+
+
+def select_documents(index: dict, types: list[str]) -> list[dict]:
+    """
+    Pick document entries by type
+
+    Args:
+        index: Filing index
+        types: Exact types or prefixes ending in '*' (e.g. ['10-K', 'EX-99.*'])
+
+    Returns:
+        Matching entries in file order
+    """
+    return [entry for entry in index["documents"] if match_doc_type(entry["type"], types)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build byte offset index of documents in an SEC full-submission.txt"
+    )
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="Input file path (full-submission.txt)"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Ignore persisted index and rebuild it"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        if args.rebuild:
+            index = build_filing_index(args.input)
+            write_filing_index(index, args.input)
+        else:
+            index = load_or_build_filing_index(args.input)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Index: {get_index_path(args.input)}")
+    print(f"{'#':>4}  {'TYPE':<14} {'BYTES':>12}  FILENAME / DESCRIPTION")
+    for entry in index["documents"]:
+        size = entry["end"] - entry["start"]
+        label = entry["filename"] or entry["description"]
+        print(f"{entry['index']:>4}  {entry['type']:<14} {size:>12,}  {label}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3.11
+"""
+Local Filing Store
+Layout helpers shared by the downloaders: default output directory and
+per ticker/form accession manifest
+
+Layout (same as sec-edgar-downloader):
+    <output_dir>/sec-edgar-filings/{TICKER}/{TYPE}/{accession}/full-submission.txt
+    <output_dir>/sec-edgar-filings/{TICKER}/{TYPE}/{accession}/selected-submission.txt (selective mode)
+    <output_dir>/sec-edgar-filings/{TICKER}/{TYPE}/manifest.json
+"""
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+MANIFEST_NAME = "manifest.json"
+SELECTED_SUBMISSION_NAME = "selected-submission.txt"
+RAW_SUBMISSION_NAMES = ("full-submission.txt", SELECTED_SUBMISSION_NAME)
+FILED_DATE_PATTERN = re.compile(rb'FILED AS OF DATE:\s*(\d{8})')
+
+
+def get_default_output_dir(ticker: str, project_root: str = None) -> str:
+    """
+    Get default output directory: <project_root>/investment-research/{TICKER}/tmp/sec_filings
+    """
+    root = Path(project_root) if project_root else Path.cwd()
+    return str(root / "investment-research" / ticker / "tmp" / "sec_filings")
+
+
+def get_filing_dir(output_dir: str, ticker: str, filing_type: str) -> Path:
+    """
+    Directory holding one accession subdirectory per filing
+    """
+    return Path(output_dir) / "sec-edgar-filings" / ticker / filing_type
+
+
+def read_filed_date(raw_path: Path) -> Optional[str]:
+    """
+    Read 'FILED AS OF DATE' from the SEC header at the start of a submission
+
+    Returns:
+        Date as YYYY-MM-DD, None if not found
+    """
+    with open(raw_path, 'rb') as f:
+        head = f.read(16 * 1024)
+    match = FILED_DATE_PATTERN.search(head)
+    if not match:
+        return None
+    return datetime.strptime(match.group(1).decode(), "%Y%m%d").date().isoformat()
+
+
+def load_manifest(filing_dir: Path, ticker: str, filing_type: str) -> dict:
+    """
+    Load accession-number manifest for one ticker/form directory
+
+    Returns:
+        Manifest dict: ticker, form, filings {accession: {filed, raw, size, mtime_ns, pending}}
+    """
+    manifest_path = filing_dir / MANIFEST_NAME
+    if manifest_path.exists():
+        try:
+            return json.loads(manifest_path.read_text(encoding='utf-8'))
+        except ValueError:
+            print(f"Warning: Ignoring unreadable manifest {manifest_path}")
+    return {"ticker": ticker, "form": filing_type, "filings": {}}
+
+
+def save_manifest(filing_dir: Path, manifest: dict):
+    """
+    Persist manifest (written atomically)
+    """
+    filing_dir.mkdir(parents=True, exist_ok=True)
+    manifest["updated_at"] = datetime.now().isoformat(timespec="seconds")
+    manifest_path = filing_dir / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix('.json.tmp')
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+    tmp_path.replace(manifest_path)
+
+
+def sync_manifest(manifest: dict, filing_dir: Path) -> list[Path]:
+    """
+    Record accession directories on disk: new ones, and raw submissions rewritten since
+    (e.g. fetched again with another --select), detected by path, size and mtime
+
+    New and rewritten filings stay pending until mark_processed, so a filing whose
+    cleaning failed or was interrupted is returned again by the next run.
+
+    Returns:
+        Raw submission paths that are new, rewritten or still pending (to clean)
+    """
+    changed = []
+    if not filing_dir.exists():
+        return changed
+
+    # One raw submission per accession: the latest written, if both layouts are on disk
+    latest = {}
+    for name in RAW_SUBMISSION_NAMES:
+        for raw_file in filing_dir.glob(f"*/{name}"):
+            stat = raw_file.stat()
+            accession = raw_file.parent.name
+            if accession not in latest or stat.st_mtime_ns > latest[accession][1].st_mtime_ns:
+                latest[accession] = (raw_file, stat)
+
+    for accession, (raw_file, stat) in sorted(latest.items()):
+        entry = manifest["filings"].get(accession)
+        raw = str(raw_file.relative_to(filing_dir))
+        # Entries from older manifests have no size/mtime yet: recorded without re-cleaning
+        unchanged = (entry is not None and entry["raw"] == raw
+                     and entry.get("size", stat.st_size) == stat.st_size
+                     and entry.get("mtime_ns", stat.st_mtime_ns) == stat.st_mtime_ns)
+        if unchanged:
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            if entry.get("pending"):
+                changed.append(raw_file)
+            continue
+        manifest["filings"][accession] = {
+            "filed": read_filed_date(raw_file),
+            "raw": raw,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "pending": True,
+        }
+        changed.append(raw_file)
+    return changed
+
+
+def mark_processed(filing_dir: Path, raw_files: list) -> int:
+    """
+    Clear the pending flag of filings that were cleaned (or kept raw by choice), and save the manifest
+
+    Args:
+        filing_dir: Ticker/form directory holding the manifest
+        raw_files: Raw submission paths handled successfully
+
+    Returns:
+        Number of manifest entries updated
+    """
+    filing_dir = Path(filing_dir)
+    if not (filing_dir / MANIFEST_NAME).exists():
+        return 0
+    manifest = load_manifest(filing_dir, filing_dir.parent.name, filing_dir.name)
+    updated = 0
+    for raw_file in raw_files:
+        entry = manifest["filings"].get(Path(raw_file).parent.name)
+        if entry is not None and entry.get("pending"):
+            entry["pending"] = False
+            updated += 1
+    if updated:
+        save_manifest(filing_dir, manifest)
+    return updated
+
+
+def get_latest_filed_date(manifest: dict) -> Optional[str]:
+    """
+    Most recent filing date held in manifest (YYYY-MM-DD), None if empty
+    """
+    dates = [f["filed"] for f in manifest["filings"].values() if f.get("filed")]
+    return max(dates) if dates else None
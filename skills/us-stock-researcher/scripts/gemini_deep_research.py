@@ -4,10 +4,22 @@ Gemini Deep Research Agent Financial Analysis Script
 Uses Google Gemini Deep Research Agent combined with investment analysis framework for deep financial analysis
 
 Supports two-phase deep research:
-- Phase 1: Local filing deep analysis (using Files API to upload complete file)
+- Phase 1: Local filing deep analysis (using Files API to upload complete file,
+  a token-budgeted selection of Item sections passed inline, or only the changes
+  since the previous period's filing)
 - Phase 2: Web deep research (based on Phase 1 results, search competitors, industry trends)
+
+Async variants (run_two_phase_research_async, ...) wait on an event loop instead
+of sleeping, so many tickers can run concurrently (see batch_research.py)
+
+Status polling is adaptive (see research_poller.py): quick early checks, backoff,
+and tighter checks around the completion time learned from earlier runs
+
+Two-phase runs record their progress in {output_dir}/tmp/research-checkpoint.json
+(see research_checkpoint.py); --resume reattaches to the recorded interactions
 """
 import argparse
+import asyncio
 import json
 import os
 import sys
@@ -23,22 +35,43 @@ except ImportError:
     print("Run: pip install google-genai")
     sys.exit(1)
 
-
-def estimate_tokens(text: str) -> int:
+try:
+    from file_search_registry import FileSearchRegistry, get_or_create_store
+    from research_checkpoint import ResearchCheckpoint, get_checkpoint_path
+    from research_poller import AdaptivePoller, DurationHistory, StatusMultiplexer
+    from filing_diff import diff_filings, find_previous_filing, write_diff
+    from section_index import DEFAULT_SECTIONS, load_or_build_section_index, select_sections
+    from token_counter import DEFAULT_TOKENIZER, TOKENIZER_NAMES, count_file_tokens, count_tokens, get_tokenizer
+    from xbrl_facts import load_fact_table
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from file_search_registry import FileSearchRegistry, get_or_create_store
+    from research_checkpoint import ResearchCheckpoint, get_checkpoint_path
+    from research_poller import AdaptivePoller, DurationHistory, StatusMultiplexer
+    from filing_diff import diff_filings, find_previous_filing, write_diff
+    from section_index import DEFAULT_SECTIONS, load_or_build_section_index, select_sections
+    from token_counter import DEFAULT_TOKENIZER, TOKENIZER_NAMES, count_file_tokens, count_tokens, get_tokenizer
+    from xbrl_facts import load_fact_table
+
+
+def estimate_tokens(text: str, tokenizer=None) -> int:
     """
-    Simple token count estimation for text
+    Token count of text
 
-    Uses character count / 4 simple estimation, no extra dependencies needed
-    English ~4 characters = 1 token, Chinese ~1-2 characters = 1 token
-    This estimation is conservative, suitable for deciding whether to upload file
+    Uses token_counter's offline filing approximation by default (digits count
+    one token each, so numeric-heavy filings aren't undercounted like with
+    character count / 4), no extra dependencies needed
 
     Args:
         text: Input text
+        tokenizer: token_counter tokenizer (default: filing approximation)
 
     Returns:
-        Estimated token count
+        Token count
     """
-    return len(text) // 4
+    return count_tokens(text, tokenizer)
 
 
 def load_prompt_template(template_name: str) -> str:
@@ -63,13 +96,30 @@ class GeminiDeepResearchAnalyzer:
     # Below this value, pass directly via prompt, saving upload and indexing time
     TOKEN_THRESHOLD = 80000
 
-    def __init__(self):
+    def __init__(
+        self,
+        tokenizer: str = DEFAULT_TOKENIZER,
+        registry: FileSearchRegistry = None,
+        durations: DurationHistory = None
+    ):
+        """
+        Args:
+            tokenizer: Token counting for the inline/File Search decision: "filing"
+                (offline approximation), "chars" (characters / 4) or "remote" (count_tokens API)
+            registry: File Search Store registry for reusing indexed filings (None = upload every run)
+            durations: Research duration history for adaptive polling (default: shared history file)
+        """
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("Please set environment variable GEMINI_API_KEY")
 
         self.client = genai.Client(api_key=api_key)
         self.agent_model = "deep-research-pro-preview-12-2025"
+        self.tokenizer = get_tokenizer(tokenizer, client=self.client)
+        self.registry = registry
+        self.durations = durations or DurationHistory()
+        # One status checker for every research awaited by the async API
+        self.status_multiplexer = StatusMultiplexer(self.client.interactions.get)
 
     def upload_file_to_store(self, file_path: str, display_name: str = None) -> str:
         """
@@ -78,6 +128,9 @@ class GeminiDeepResearchAnalyzer:
         Uses two-step process: first upload to Files API, then import to File Search Store
         Per official docs: https://ai.google.dev/gemini-api/docs/file-search#importing-files
 
+        Stores are recorded by content hash in the File Search registry, so a
+        filing indexed on an earlier run is reused without upload or indexing.
+
         Args:
             file_path: Local file path
             display_name: File Search Store display name (auto-generated if not provided)
@@ -89,102 +142,263 @@ class GeminiDeepResearchAnalyzer:
         file_size = Path(file_path).stat().st_size
         print(f"File size: {file_size / 1024 / 1024:.2f} MB")
 
-        if not display_name:
-            display_name = f"sec-filing-{int(time.time())}"
+        return get_or_create_store(self.client, file_path, self.registry, display_name)
 
-        # 1. First upload file to Files API
-        file_display_name = Path(file_path).stem
-        print(f"Step 1: Uploading file to Files API...")
-        uploaded_file = self.client.files.upload(
-            file=file_path,
-            config={'display_name': file_display_name}
-        )
-        print(f"File upload successful: {uploaded_file.name}")
+    @staticmethod
+    def _read_research_status(status, elapsed: float, label: str = None) -> tuple[bool, Optional[str]]:
+        """
+        Log one polled interaction status
 
-        # 2. Create File Search Store
-        print(f"Step 2: Creating File Search Store: {display_name}")
-        file_search_store = self.client.file_search_stores.create(
-            config={'display_name': display_name}
-        )
-        print(f"File Search Store created: {file_search_store.name}")
+        Args:
+            status: interactions.get result
+            elapsed: Seconds waited so far
+            label: Log prefix (e.g. ticker) when several researches run at once
 
-        # 3. Import file to File Search Store
-        print(f"Step 3: Importing file to File Search Store...")
-        operation = self.client.file_search_stores.import_file(
-            file_search_store_name=file_search_store.name,
-            file_name=uploaded_file.name
-        )
+        Returns:
+            (finished, result text); text is None if the research failed
+        """
+        prefix = f"[{label}] " if label else ""
+        current_status = status.status
+        print(f"{prefix}[{datetime.now().strftime('%H:%M:%S')}] Status: {current_status} (waited {int(elapsed)}s)")
+
+        if current_status == "completed":
+            print(f"\n{prefix}Research complete!")
+            return True, status.outputs[-1].text
+        elif current_status == "failed":
+            print(f"\n{prefix}Research failed: {status}")
+            return True, None
+        return False, None
+
+    def _make_poller(self, kind: str, poll_interval: int = None) -> AdaptivePoller:
+        """
+        Polling schedule for one research, tightened around this kind's usual duration
 
-        # 4. Wait for indexing to complete
-        print("Waiting for file indexing to complete...")
-        wait_count = 0
-        max_index_wait = 600  # 5 minutes
-        start_time = time.time()
-        while not operation.done:
-            if time.time() - start_time > max_index_wait:
-                raise TimeoutError(f"File indexing timed out after {max_index_wait}s")
-            time.sleep(5)
-            wait_count += 1
-            operation = self.client.operations.get(operation)
-            print(f"  Indexing status: {'Complete' if operation.done else f'Processing... ({wait_count * 5}s)'}")
-
-        print(f"File import and indexing complete!")
-        return file_search_store.name
+        Args:
+            kind: Research kind for the duration history ("phase1", "phase1-file-search", "phase2")
+            poll_interval: Fixed polling interval in seconds, None for adaptive polling
+        """
+        return AdaptivePoller(self.durations.expected_window(kind), fixed_interval=poll_interval)
 
     def _wait_for_research(
         self,
         interaction_id: str,
         poll_interval: int,
-        max_wait_time: int
+        max_wait_time: int,
+        label: str = None,
+        kind: str = "phase1",
+        created_at: float = None
     ) -> Optional[str]:
         """
         Wait for Deep Research task to complete
 
         Args:
             interaction_id: Research task ID
-            poll_interval: Polling interval in seconds
+            poll_interval: Fixed polling interval in seconds, None for adaptive polling
             max_wait_time: Maximum wait time in seconds
+            label: Log prefix (e.g. ticker)
+            kind: Research kind, for the duration history
+            created_at: When the interaction was created (epoch seconds), when
+                reattaching to it after a restart (default: now)
 
         Returns:
-            Research result text, None on timeout
+            Research result text, None on timeout or failure
         """
-        start_time = time.time()
+        start_time = created_at or time.time()
+        deadline = time.time() + max_wait_time
+        poller = self._make_poller(kind, poll_interval)
+        last_pending = None
 
         while True:
             elapsed = time.time() - start_time
 
-            if elapsed > max_wait_time:
+            if time.time() > deadline:
                 print(f"Timeout: Waited over {max_wait_time} seconds")
                 return None
 
             try:
                 status = self.client.interactions.get(interaction_id)
-                current_status = status.status
+                finished, result = self._read_research_status(status, elapsed, label)
+                if finished:
+                    if result is not None and last_pending is not None:
+                        # Completed somewhere since the last pending check
+                        self.durations.record(kind, (last_pending + time.time() - start_time) / 2)
+                    return result
+                last_pending = elapsed
 
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Status: {current_status} (waited {int(elapsed)}s)")
+            except Exception as e:
+                print(f"Status query error: {e}")
 
-                if current_status == "completed":
-                    print("\nResearch complete!")
-                    return status.outputs[-1].text
-                elif current_status == "failed":
-                    print(f"\nResearch failed: {status}")
-                    return None
+            elapsed = time.time() - start_time
+            # Last check right at the deadline rather than sleeping past it
+            time.sleep(max(0, min(poller.next_delay(elapsed), deadline - time.time() + 1)))
+
+    async def _wait_for_research_async(
+        self,
+        interaction_id: str,
+        poll_interval: int,
+        max_wait_time: int,
+        label: str = None,
+        kind: str = "phase1",
+        created_at: float = None
+    ) -> Optional[str]:
+        """
+        Async _wait_for_research: status checks go through the shared status
+        multiplexer, which serves all researches awaited at once from one task
+
+        Returns:
+            Research result text, None on timeout or failure
+        """
+        start_time = created_at or time.time()
+        deadline = time.time() + max_wait_time
+        poller = self._make_poller(kind, poll_interval)
+        delay = 0
+        last_pending = None
+
+        while True:
+            if time.time() > deadline:
+                print(f"{f'[{label}] ' if label else ''}Timeout: Waited over {max_wait_time} seconds")
+                return None
+
+            try:
+                status = await self.status_multiplexer.get_status(interaction_id, delay)
+                elapsed = time.time() - start_time
+                finished, result = self._read_research_status(status, elapsed, label)
+                if finished:
+                    if result is not None and last_pending is not None:
+                        self.durations.record(kind, (last_pending + elapsed) / 2)
+                    return result
+                last_pending = elapsed
 
             except Exception as e:
-                print(f"Status query error: {e}")
+                print(f"{f'[{label}] ' if label else ''}Status query error: {e}")
+
+            elapsed = time.time() - start_time
+            delay = max(0, min(poller.next_delay(elapsed), deadline - time.time() + 1))
+
+    def _interaction_failed(self, interaction_id: str) -> bool:
+        """
+        Whether an interaction has ended in failure (False while running, or if the check fails)
+        """
+        try:
+            return self.client.interactions.get(interaction_id).status in ("failed", "cancelled")
+        except Exception:
+            return False
+
+    def _discard_failed(self, checkpoint: ResearchCheckpoint, phase: str, entry: dict):
+        """
+        Drop a phase's failed interaction from the checkpoint, so resuming submits it again
 
-            time.sleep(poll_interval)
+        A timed-out interaction is kept: it may still finish, and resuming reattaches to it.
+        """
+        if checkpoint is not None and self._interaction_failed(entry["interaction"]):
+            checkpoint.update(**{phase: None})
 
-        return None
+    @staticmethod
+    def _get_resume_entry(checkpoint: ResearchCheckpoint, phase: str, label: str = None) -> Optional[dict]:
+        """
+        Interaction recorded for a phase ("phase1"/"phase2") by an earlier run, None to submit a new one
+        """
+        entry = checkpoint.state.get(phase) if checkpoint is not None else None
+        if entry:
+            print(f"{f'[{label}] ' if label else ''}Reattaching to {phase.replace('phase', 'Phase ')} "
+                  f"research: {entry['interaction']}")
+        return entry
 
-    def _run_with_inline_content(
+    def open_checkpoint(
+        self,
+        output_dir: str,
+        company_ticker: str,
+        input_file: str,
+        analysis_prompt: str,
+        resume: bool = False,
+        label: str = None,
+        phase1_options: dict = None
+    ) -> ResearchCheckpoint:
+        """
+        Checkpoint for a run: the earlier run's when resuming it, else a new one
+
+        A checkpoint is only resumed if it was written for the same filing,
+        analysis framework and Phase 1 options. A phase whose saved report is
+        missing is redone (reattaching to its interaction, which still holds the result).
+
+        Args:
+            output_dir: Output directory (checkpoint at {output_dir}/tmp/research-checkpoint.json)
+            company_ticker: Company ticker
+            input_file: SEC filing path
+            analysis_prompt: Analysis framework prompt
+            resume: Continue the recorded run instead of starting a new one
+            label: Log prefix (e.g. ticker)
+            phase1_options: sections, token_budget, previous_file, previous_report of this run
+
+        Returns:
+            Checkpoint; its state holds stage, paths, store_name and the phase interactions
+        """
+        prefix = f"[{label}] " if label else ""
+        checkpoint = ResearchCheckpoint(get_checkpoint_path(output_dir))
+        if resume:
+            if checkpoint.load() and checkpoint.matches(input_file, analysis_prompt, phase1_options):
+                state = checkpoint.state
+                stage = state["stage"]
+                if stage != "phase1" and not Path(state["paths"]["phase1"]).exists():
+                    stage = "phase1"
+                elif stage == "complete" and not Path(state["paths"]["phase2"]).exists():
+                    stage = "phase2"
+                if stage != state["stage"]:
+                    checkpoint.update(stage=stage)
+                print(f"{prefix}Resuming from checkpoint {checkpoint.path} (stage: {stage})")
+                return checkpoint
+            print(f"{prefix}No checkpoint for this filing, framework and Phase 1 options, starting a new run")
+        checkpoint.start(
+            company_ticker, input_file, analysis_prompt, self.get_report_paths(output_dir, company_ticker), phase1_options
+        )
+        return checkpoint
+
+    def _create_research(self, prompt: str, store_name: str = None, label: str = None) -> str:
+        """
+        Create a background Deep Research interaction
+
+        Args:
+            prompt: Full research prompt
+            store_name: File Search Store to give the agent (file_search tool), None for none
+            label: Log prefix (e.g. ticker)
+
+        Returns:
+            Interaction ID
+        """
+        kwargs = {}
+        if store_name:
+            kwargs["tools"] = [
+                {
+                    "type": "file_search",
+                    "file_search_store_names": [store_name]
+                }
+            ]
+        interaction = self.client.interactions.create(
+            input=prompt,
+            agent=self.agent_model,
+            background=True,
+            **kwargs
+        )
+
+        print(f"{f'[{label}] ' if label else ''}Research task created: {interaction.id}")
+        return interaction.id
+
+    @staticmethod
+    def _save_report(output_file: str, result: str, phase: str):
+        """
+        Write a phase report, creating its directory
+        """
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+        Path(output_file).write_text(result, encoding='utf-8')
+        print(f"\n{phase} report saved to: {output_file}")
+
+    def _build_inline_request(
         self,
         file_content: str,
         analysis_prompt: str,
-        output_file: str,
-        poll_interval: int,
-        max_wait_time: int
-    ) -> str:
+        template_name: str = "phase1-inline-template.md",
+        template_fields: dict = None
+    ) -> dict:
         """
         Small file mode: Embed file content directly in prompt
 
@@ -194,56 +408,26 @@ class GeminiDeepResearchAnalyzer:
         Args:
             file_content: Filing file content
             analysis_prompt: Analysis framework prompt
-            output_file: Output report path
-            poll_interval: Polling interval (seconds)
-            max_wait_time: Maximum wait time (seconds)
+            template_name: Prompt template in prompts/ (default: phase1-inline-template.md)
+            template_fields: Extra template fields (e.g. previous_report for the diff template)
 
         Returns:
-            Phase 1 analysis report content
+            Phase 1 request: prompt, store_name (None)
         """
         print("Using direct input mode (small file optimization)")
 
         # Load and fill template from prompts
-        template = load_prompt_template("phase1-inline-template.md")
+        template = load_prompt_template(template_name)
         phase1_prompt = template.format(
             analysis_prompt=analysis_prompt,
-            file_content=file_content
+            file_content=file_content,
+            **(template_fields or {})
         )
 
         print(f"Full prompt length: {len(phase1_prompt)} characters")
-        print("Starting Phase 1 Deep Research Agent (direct input mode)...")
+        return {"prompt": phase1_prompt, "store_name": None}
 
-        # Create Deep Research interaction (no file_search tool)
-        interaction = self.client.interactions.create(
-            input=phase1_prompt,
-            agent=self.agent_model,
-            background=True
-        )
-
-        interaction_id = interaction.id
-        print(f"Research task created: {interaction_id}")
-
-        # Wait for completion
-        result = self._wait_for_research(interaction_id, poll_interval, max_wait_time)
-
-        if result is None:
-            raise RuntimeError("Phase 1 Deep Research analysis failed or timed out")
-
-        # Save result
-        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
-        Path(output_file).write_text(result, encoding='utf-8')
-        print(f"\nPhase 1 report saved to: {output_file}")
-
-        return result
-
-    def _run_with_file_search(
-        self,
-        input_file: str,
-        analysis_prompt: str,
-        output_file: str,
-        poll_interval: int,
-        max_wait_time: int
-    ) -> str:
+    def _build_file_search_request(self, input_file: str, analysis_prompt: str) -> dict:
         """
         Large file mode: Upload to File Search Store
 
@@ -253,12 +437,9 @@ class GeminiDeepResearchAnalyzer:
         Args:
             input_file: SEC filing file path
             analysis_prompt: Analysis framework prompt
-            output_file: Output report path
-            poll_interval: Polling interval (seconds)
-            max_wait_time: Maximum wait time (seconds)
 
         Returns:
-            Phase 1 analysis report content
+            Phase 1 request: prompt, store_name
         """
         print("Using File Search Store mode (large file)")
 
@@ -270,44 +451,194 @@ class GeminiDeepResearchAnalyzer:
         phase1_prompt = template.format(analysis_prompt=analysis_prompt)
 
         print(f"Analysis prompt length: {len(phase1_prompt)} characters")
-        print("Starting Phase 1 Deep Research Agent (File Search mode)...")
+        return {"prompt": phase1_prompt, "store_name": store_name}
 
-        # Create Deep Research interaction with file_search tool
-        interaction = self.client.interactions.create(
-            input=phase1_prompt,
-            agent=self.agent_model,
-            background=True,
-            tools=[
-                {
-                    "type": "file_search",
-                    "file_search_store_names": [store_name]
-                }
-            ]
-        )
+    def _build_section_content(self, input_file: str, sections: list[str], token_budget: int) -> Optional[str]:
+        """
+        Assemble selected Item sections of a cleaned filing within a token budget
 
-        interaction_id = interaction.id
-        print(f"Research task created: {interaction_id}")
+        Args:
+            input_file: Cleaned filing path (cleaned.txt)
+            sections: Item ids in priority order (e.g. ["1", "1A", "7", "8"])
+            token_budget: Maximum estimated tokens
 
-        # Wait for completion
-        result = self._wait_for_research(interaction_id, poll_interval, max_wait_time)
+        Returns:
+            Filing excerpt (SEC header plus sections), None if no Item sections were found
+        """
+        index = load_or_build_section_index(input_file)
+        if not index["sections"]:
+            print("No Item sections found in filing, using full file")
+            return None
+
+        selection = select_sections(input_file, sections, token_budget, index, self.tokenizer)
+        print(f"Sections: {', '.join(selection['included']) or 'none'} "
+              f"({selection['tokens']:,} tokens, budget {token_budget:,})")
+        if selection["truncated"]:
+            print(f"  Truncated to fit budget: {', '.join(selection['truncated'])}")
+        if selection["dropped"]:
+            print(f"  Dropped (over budget): {', '.join(selection['dropped'])}")
+        if selection["missing"]:
+            print(f"  Not found: {', '.join(selection['missing'])}")
+        if not selection["included"]:
+            print("No requested section found, using full file")
+            return None
+
+        items = ', '.join(f"Item {section_id}" for section_id in selection["included"])
+        note = f"[Excerpt of the {index['form'] or 'filing'}: {items} only, other sections omitted]"
+        return f"{note}\n\n{selection['text']}"
+
+    def _build_diff_content(self, input_file: str, previous_file: str, sections: list[str] = None) -> Optional[str]:
+        """
+        Build the "changes since last period" document of a cleaned filing
 
-        if result is None:
-            raise RuntimeError("Phase 1 Deep Research analysis failed or timed out")
+        Args:
+            input_file: Current cleaned filing path (cleaned.txt)
+            previous_file: Previous period's cleaned.txt, or "auto" to find it among sibling accession directories
+            sections: Only compare these Item ids (default: all)
 
-        # Save result
-        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
-        Path(output_file).write_text(result, encoding='utf-8')
-        print(f"\nPhase 1 report saved to: {output_file}")
+        Returns:
+            Changes document, None if there is no previous filing
+        """
+        if previous_file == "auto":
+            previous_file = find_previous_filing(input_file)
+            if previous_file is None:
+                print("No previous filing found, using full file")
+                return None
+        if Path(previous_file).resolve() == Path(input_file).resolve():
+            print("Previous filing is the current one, using full file")
+            return None
+
+        result = diff_filings(input_file, str(previous_file), sections, self.tokenizer)
+        if result["current"]["form"] != result["previous"]["form"]:
+            print(f"Warning: Comparing {result['current']['form']} with {result['previous']['form']}, "
+                  f"sections may not align")
+        diff_path = write_diff(result, input_file)
+        counts = {}
+        for section in result["sections"]:
+            counts[section["status"]] = counts.get(section["status"], 0) + 1
+        print(f"Changes since {previous_file}: "
+              + ', '.join(f"{n} {status}" for status, n in counts.items()) + " sections")
+        print(f"Changes document: {diff_path} "
+              f"({result['tokens']:,} tokens, full filing {result['full_tokens']:,})")
+        return result["text"]
+
+    def build_phase1_request(
+        self,
+        input_file: str,
+        analysis_prompt: str,
+        output_file: str,
+        sections: list[str] = None,
+        token_budget: int = None,
+        previous_file: str = None,
+        previous_report: str = None
+    ) -> dict:
+        """
+        Select the Phase 1 input mode and build its prompt (uploading large files)
 
-        return result
+        Separate from running the research, so a pipeline (research_pipeline.py)
+        can upload and index the next filing while earlier researches run.
+
+        Returns:
+            Phase 1 request: prompt, store_name (File Search Store, None for inline modes)
+        """
+        if previous_file:
+            diff_content = self._build_diff_content(input_file, previous_file, sections)
+            if diff_content is not None:
+                report = "Not available (no previous analysis provided)"
+                if previous_report:
+                    report = Path(previous_report).read_text(encoding='utf-8')
+                else:
+                    print("Warning: Diff mode without --previous-report, the unchanged sections "
+                          "will not be seen by the model (only what changed is sent)")
+                token_count = estimate_tokens(diff_content, self.tokenizer) + estimate_tokens(report, self.tokenizer)
+                print(f"Token count ({self.tokenizer.name}): {token_count:,} (threshold: {self.TOKEN_THRESHOLD:,})")
+                if token_count <= self.TOKEN_THRESHOLD:
+                    print("Using diff mode (changes since last period)")
+                    return self._build_inline_request(
+                        file_content=diff_content,
+                        analysis_prompt=analysis_prompt,
+                        template_name="phase1-diff-template.md",
+                        template_fields={"previous_report": report}
+                    )
+                print("Changes exceed inline threshold, analyzing the filing instead")
+
+        # Read file content (or selected sections) and estimate token count
+        file_content = None
+        if sections:
+            file_content = self._build_section_content(input_file, sections, token_budget or self.TOKEN_THRESHOLD)
+            if file_content is not None and estimate_tokens(file_content, self.tokenizer) > self.TOKEN_THRESHOLD:
+                # Budget above the inline threshold: upload the excerpt instead of the whole filing
+                input_file = str(Path(output_file).with_suffix('.sections.txt'))
+                Path(input_file).parent.mkdir(parents=True, exist_ok=True)
+                Path(input_file).write_text(file_content, encoding='utf-8')
+        if file_content is None:
+            file_content = Path(input_file).read_text(encoding='utf-8')
+            # Memoized beside the filing (cleaned.tokens.json), so reruns don't recount
+            token_count = count_file_tokens(input_file, self.tokenizer)
+        else:
+            token_count = estimate_tokens(file_content, self.tokenizer)
+        file_size_kb = len(file_content.encode('utf-8')) / 1024
+
+        print(f"File size: {file_size_kb:.1f} KB")
+        print(f"Token count ({self.tokenizer.name}): {token_count:,} (threshold: {self.TOKEN_THRESHOLD:,})")
+
+        # Auto-select processing method based on token count
+        if token_count <= self.TOKEN_THRESHOLD:
+            return self._build_inline_request(file_content=file_content, analysis_prompt=analysis_prompt)
+        else:
+            return self._build_file_search_request(input_file=input_file, analysis_prompt=analysis_prompt)
+
+    def _submit_phase1(
+        self,
+        input_file: str,
+        analysis_prompt: str,
+        output_file: str,
+        sections: list[str] = None,
+        token_budget: int = None,
+        previous_file: str = None,
+        previous_report: str = None,
+        request: dict = None,
+        checkpoint: ResearchCheckpoint = None,
+        label: str = None
+    ) -> dict:
+        """
+        Build the Phase 1 request (unless given) and create its interaction,
+        recording the store and interaction in the checkpoint
+
+        Returns:
+            Interaction entry: interaction (ID), created_at (epoch seconds), kind
+        """
+        if request is None:
+            request = self.build_phase1_request(
+                input_file, analysis_prompt, output_file, sections, token_budget, previous_file, previous_report
+            )
+        if checkpoint is not None:
+            checkpoint.update(store_name=request["store_name"])
+
+        print(f"{f'[{label}] ' if label else ''}Starting Phase 1 Deep Research Agent...")
+        interaction_id = self._create_research(request["prompt"], request["store_name"], label)
+        entry = {
+            "interaction": interaction_id,
+            "created_at": time.time(),
+            "kind": "phase1-file-search" if request["store_name"] else "phase1",
+        }
+        # Recorded before the long wait, so a restarted run can reattach to it
+        if checkpoint is not None:
+            checkpoint.update(phase1=entry)
+        return entry
 
     def run_phase1_local_analysis(
         self,
         input_file: str,
         analysis_prompt: str,
         output_file: str,
-        poll_interval: int = 30,
-        max_wait_time: int = 1800
+        poll_interval: int = None,
+        max_wait_time: int = 1800,
+        sections: list[str] = None,
+        token_budget: int = None,
+        previous_file: str = None,
+        previous_report: str = None,
+        checkpoint: ResearchCheckpoint = None
     ) -> str:
         """
         Phase 1: Local filing deep analysis (smart mode auto-selection)
@@ -316,12 +647,27 @@ class GeminiDeepResearchAnalyzer:
         - Small files (<= 80K tokens): Pass directly via prompt, skip upload step
         - Large files (> 80K tokens): Upload to File Search Store
 
+        With sections, only those Item sections (plus the SEC header) are used,
+        cut to token_budget, so most filings fit the inline path.
+
+        With previous_file (diff mode), only the changes since the previous
+        period's filing are sent, together with the previous period's Phase 1
+        report for the unchanged sections. Falls back to the modes above when
+        the changes don't fit the inline threshold.
+
         Args:
             input_file: SEC filing file path
             analysis_prompt: Analysis framework prompt
             output_file: Output report path
-            poll_interval: Polling interval (seconds)
+            poll_interval: Fixed polling interval (seconds), None for adaptive polling
             max_wait_time: Maximum wait time (seconds)
+            sections: Item ids to analyze in priority order (e.g. ["1", "1A", "7", "8"]),
+                None for the whole filing
+            token_budget: Token budget for the sections (default: TOKEN_THRESHOLD)
+            previous_file: Previous period's cleaned.txt ("auto" = find it), None for no diff
+            previous_report: Previous period's Phase 1 report path (used with previous_file)
+            checkpoint: Run checkpoint (open_checkpoint); reattaches to its Phase 1
+                interaction if it has one, else records the new one
 
         Returns:
             Phase 1 analysis report content
@@ -330,39 +676,102 @@ class GeminiDeepResearchAnalyzer:
         print("Phase 1: Local Filing Deep Analysis")
         print(f"{'='*60}")
 
-        # Read file content and estimate token count
-        file_content = Path(input_file).read_text(encoding='utf-8')
-        file_size_kb = len(file_content.encode('utf-8')) / 1024
-        token_count = estimate_tokens(file_content)
+        entry = self._get_resume_entry(checkpoint, "phase1")
+        if entry is None:
+            entry = self._submit_phase1(
+                input_file, analysis_prompt, output_file, sections, token_budget, previous_file, previous_report,
+                checkpoint=checkpoint
+            )
 
-        print(f"File size: {file_size_kb:.1f} KB")
-        print(f"Token estimate: {token_count:,} (threshold: {self.TOKEN_THRESHOLD:,})")
+        # Wait for completion
+        result = self._wait_for_research(
+            entry["interaction"], poll_interval, max_wait_time, kind=entry["kind"], created_at=entry["created_at"]
+        )
 
-        # Auto-select processing method based on token count
-        if token_count <= self.TOKEN_THRESHOLD:
-            return self._run_with_inline_content(
-                file_content=file_content,
-                analysis_prompt=analysis_prompt,
-                output_file=output_file,
-                poll_interval=poll_interval,
-                max_wait_time=max_wait_time
-            )
-        else:
-            return self._run_with_file_search(
-                input_file=input_file,
-                analysis_prompt=analysis_prompt,
-                output_file=output_file,
-                poll_interval=poll_interval,
-                max_wait_time=max_wait_time
+        if result is None:
+            self._discard_failed(checkpoint, "phase1", entry)
+            raise RuntimeError("Phase 1 Deep Research analysis failed or timed out")
+
+        self._save_report(output_file, result, "Phase 1")
+        if checkpoint is not None:
+            checkpoint.update(stage="phase2")
+        return result
+
+    async def run_phase1_local_analysis_async(
+        self,
+        input_file: str,
+        analysis_prompt: str,
+        output_file: str,
+        poll_interval: int = None,
+        max_wait_time: int = 1800,
+        sections: list[str] = None,
+        token_budget: int = None,
+        previous_file: str = None,
+        previous_report: str = None,
+        label: str = None,
+        request: dict = None,
+        checkpoint: ResearchCheckpoint = None
+    ) -> str:
+        """
+        Async run_phase1_local_analysis
+
+        Reading, token counting, upload and interaction creation run in worker
+        threads; waiting for the research runs on the event loop. Same args,
+        plus label (log prefix, e.g. ticker) and request (prebuilt by
+        build_phase1_request, skips reading and uploading the filing).
+
+        Returns:
+            Phase 1 analysis report content
+        """
+        print(f"[{label or input_file}] Phase 1: Local Filing Deep Analysis")
+
+        entry = self._get_resume_entry(checkpoint, "phase1", label)
+        if entry is None:
+            entry = await asyncio.to_thread(
+                self._submit_phase1,
+                input_file, analysis_prompt, output_file, sections, token_budget, previous_file, previous_report,
+                request, checkpoint, label
             )
 
+        result = await self._wait_for_research_async(
+            entry["interaction"], poll_interval, max_wait_time, label, entry["kind"], entry["created_at"]
+        )
+
+        if result is None:
+            await asyncio.to_thread(self._discard_failed, checkpoint, "phase1", entry)
+            raise RuntimeError(f"Phase 1 Deep Research analysis failed or timed out ({label or input_file})")
+
+        self._save_report(output_file, result, f"[{label}] Phase 1" if label else "Phase 1")
+        if checkpoint is not None:
+            checkpoint.update(stage="phase2")
+        return result
+
+    def _build_phase2_prompt(self, phase1_result: str, company_name: str) -> str:
+        """
+        Fill the Phase 2 web research template from the Phase 1 report
+        """
+        # Extract research questions from Phase 1
+        research_questions = self._extract_research_questions(phase1_result)
+
+        # Load and fill template from prompts
+        template = load_prompt_template("phase2-web-research-template.md")
+        phase2_prompt = template.format(
+            company_name=company_name,
+            phase1_result=phase1_result,
+            research_questions=research_questions
+        )
+
+        print(f"Phase 2 prompt length: {len(phase2_prompt)} characters")
+        return phase2_prompt
+
     def run_phase2_web_research(
         self,
         phase1_result: str,
         company_name: str,
         output_file: str,
-        poll_interval: int = 30,
-        max_wait_time: int = 1800
+        poll_interval: int = None,
+        max_wait_time: int = 1800,
+        checkpoint: ResearchCheckpoint = None
     ) -> str:
         """
         Phase 2: Web deep research
@@ -373,8 +782,10 @@ class GeminiDeepResearchAnalyzer:
             phase1_result: Phase 1 analysis result
             company_name: Company name (for search)
             output_file: Output report path
-            poll_interval: Polling interval (seconds)
+            poll_interval: Fixed polling interval (seconds), None for adaptive polling
             max_wait_time: Maximum wait time (seconds)
+            checkpoint: Run checkpoint (open_checkpoint); reattaches to its Phase 2
+                interaction if it has one, else records the new one
 
         Returns:
             Phase 2 research report content
@@ -383,47 +794,101 @@ class GeminiDeepResearchAnalyzer:
         print("Phase 2: Web Deep Research")
         print(f"{'='*60}")
 
-        # Extract research questions from Phase 1
-        research_questions = self._extract_research_questions(phase1_result)
+        entry = self._get_resume_entry(checkpoint, "phase2")
+        if entry is None:
+            phase2_prompt = self._build_phase2_prompt(phase1_result, company_name)
+            print("Starting Phase 2 Deep Research Agent (web search mode)...")
 
-        # Load and fill template from prompts
-        template = load_prompt_template("phase2-web-research-template.md")
-        phase2_prompt = template.format(
-            company_name=company_name,
-            phase1_result=phase1_result,
-            research_questions=research_questions
+            # Create web search Deep Research interaction
+            try:
+                interaction_id = self._create_research(phase2_prompt)
+            except Exception as e:
+                print(f"Failed to create Phase 2 research task: {e}")
+                return f"Phase 2 research failed: {e}"
+            entry = {"interaction": interaction_id, "created_at": time.time(), "kind": "phase2"}
+            if checkpoint is not None:
+                checkpoint.update(phase2=entry)
+
+        # Wait for completion
+        result = self._wait_for_research(
+            entry["interaction"], poll_interval, max_wait_time, kind="phase2", created_at=entry["created_at"]
         )
 
-        print(f"Phase 2 prompt length: {len(phase2_prompt)} characters")
-        print("Starting Phase 2 Deep Research Agent (web search mode)...")
+        completed = result is not None
+        if not completed:
+            self._discard_failed(checkpoint, "phase2", entry)
+            result = "Phase 2 web research timed out or failed"
 
-        # Create web search Deep Research interaction
-        try:
-            interaction = self.client.interactions.create(
-                input=phase2_prompt,
-                agent=self.agent_model,
-                background=True
-            )
-        except Exception as e:
-            print(f"Failed to create Phase 2 research task: {e}")
-            return f"Phase 2 research failed: {e}"
+        self._save_report(output_file, result, "Phase 2")
+        if completed and checkpoint is not None:
+            checkpoint.update(stage="complete")
+        return result
 
-        interaction_id = interaction.id
-        print(f"Research task created: {interaction_id}")
+    async def run_phase2_web_research_async(
+        self,
+        phase1_result: str,
+        company_name: str,
+        output_file: str,
+        poll_interval: int = None,
+        max_wait_time: int = 1800,
+        label: str = None,
+        checkpoint: ResearchCheckpoint = None
+    ) -> str:
+        """
+        Async run_phase2_web_research (same args, plus label log prefix)
 
-        # Wait for completion
-        result = self._wait_for_research(interaction_id, poll_interval, max_wait_time)
+        Returns:
+            Phase 2 research report content
+        """
+        print(f"[{label or company_name}] Phase 2: Web Deep Research")
 
-        if result is None:
-            result = "Phase 2 web research timed out or failed"
+        entry = self._get_resume_entry(checkpoint, "phase2", label)
+        if entry is None:
+            phase2_prompt = self._build_phase2_prompt(phase1_result, company_name)
+            try:
+                interaction_id = await asyncio.to_thread(self._create_research, phase2_prompt, None, label)
+            except Exception as e:
+                print(f"[{label or company_name}] Failed to create Phase 2 research task: {e}")
+                return f"Phase 2 research failed: {e}"
+            entry = {"interaction": interaction_id, "created_at": time.time(), "kind": "phase2"}
+            if checkpoint is not None:
+                checkpoint.update(phase2=entry)
+
+        result = await self._wait_for_research_async(
+            entry["interaction"], poll_interval, max_wait_time, label, "phase2", entry["created_at"]
+        )
 
-        # Save Phase 2 result
-        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
-        Path(output_file).write_text(result, encoding='utf-8')
-        print(f"\nPhase 2 report saved to: {output_file}")
+        completed = result is not None
+        if not completed:
+            await asyncio.to_thread(self._discard_failed, checkpoint, "phase2", entry)
+            result = "Phase 2 web research timed out or failed"
 
+        self._save_report(output_file, result, f"[{label}] Phase 2" if label else "Phase 2")
+        if completed and checkpoint is not None:
+            checkpoint.update(stage="complete")
         return result
 
+    @staticmethod
+    def get_report_paths(output_dir: str, company_ticker: str) -> dict:
+        """
+        Today's report paths under an output directory (creates its tmp subdirectory)
+
+        Returns:
+            Dict: phase1, phase2 (temp reports), final_output (saved by Claude after integration)
+        """
+        date_str = datetime.now().strftime("%Y-%m-%d")
+
+        # Create output directory and tmp subdirectory
+        output_path = Path(output_dir)
+        tmp_dir = output_path / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        return {
+            "phase1": str(tmp_dir / f"phase1-{date_str}.md"),
+            "phase2": str(tmp_dir / f"phase2-{date_str}.md"),
+            "final_output": str(output_path / f"{company_ticker}-Investment-Report-{date_str}.md"),
+        }
+
     def run_two_phase_research(
         self,
         input_file: str,
@@ -431,20 +896,35 @@ class GeminiDeepResearchAnalyzer:
         output_dir: str,
         company_ticker: str,
         company_name: str,
-        poll_interval: int = 30,
-        max_wait_time: int = 1800
+        poll_interval: int = None,
+        max_wait_time: int = 1800,
+        sections: list[str] = None,
+        token_budget: int = None,
+        previous_file: str = None,
+        previous_report: str = None,
+        resume: bool = False
     ) -> dict:
         """
         Execute complete two-phase deep research
 
+        Progress (stage, File Search Store, interaction IDs) is checkpointed in
+        {output_dir}/tmp/research-checkpoint.json. With resume, a run
+        interrupted during either wait reattaches to its interaction, and
+        phases whose reports are already saved are skipped.
+
         Args:
             input_file: SEC filing file path
             analysis_prompt: Analysis framework prompt
             output_dir: Output directory (e.g., investment-research/TSM)
             company_ticker: Company ticker (e.g., TSM, AAPL)
             company_name: Company name (for Phase 2 web search)
-            poll_interval: Polling interval (seconds)
+            poll_interval: Fixed polling interval (seconds), None for adaptive polling
             max_wait_time: Maximum wait time per phase (seconds)
+            sections: Phase 1 Item sections in priority order, None for the whole filing
+            token_budget: Token budget for the sections (default: TOKEN_THRESHOLD)
+            previous_file: Previous period's cleaned.txt for Phase 1 diff mode ("auto" = find it)
+            previous_report: Previous period's Phase 1 report (used with previous_file)
+            resume: Continue the checkpointed run on this filing and framework, if any
 
         Returns:
             Dictionary containing report paths and content
@@ -454,55 +934,126 @@ class GeminiDeepResearchAnalyzer:
         print("Starting Two-Phase Deep Research")
         print(f"{'#'*60}")
 
-        date_str = datetime.now().strftime("%Y-%m-%d")
-
-        # Create output directory and tmp subdirectory
-        output_path = Path(output_dir)
-        tmp_dir = output_path / "tmp"
-        tmp_dir.mkdir(parents=True, exist_ok=True)
-
-        # Temp file paths (Phase 1 and Phase 2 reports)
-        phase1_output = tmp_dir / f"phase1-{date_str}.md"
-        phase2_output = tmp_dir / f"phase2-{date_str}.md"
-
-        # Final report path (saved by Claude after integration)
-        final_output = output_path / f"{company_ticker}-Investment-Report-{date_str}.md"
+        checkpoint = self.open_checkpoint(
+            output_dir, company_ticker, input_file, analysis_prompt, resume,
+            phase1_options={"sections": sections, "token_budget": token_budget,
+                            "previous_file": previous_file, "previous_report": previous_report}
+        )
+        paths = checkpoint.state["paths"]
+        stage = checkpoint.state["stage"]
 
         # Phase 1: Local filing analysis
-        phase1_result = self.run_phase1_local_analysis(
-            input_file=input_file,
-            analysis_prompt=analysis_prompt,
-            output_file=str(phase1_output),
-            poll_interval=poll_interval,
-            max_wait_time=max_wait_time
-        )
+        if stage == "phase1":
+            phase1_result = self.run_phase1_local_analysis(
+                input_file=input_file,
+                analysis_prompt=analysis_prompt,
+                output_file=paths["phase1"],
+                poll_interval=poll_interval,
+                max_wait_time=max_wait_time,
+                sections=sections,
+                token_budget=token_budget,
+                previous_file=previous_file,
+                previous_report=previous_report,
+                checkpoint=checkpoint
+            )
+        else:
+            print(f"Phase 1 report already saved: {paths['phase1']}")
+            phase1_result = Path(paths["phase1"]).read_text(encoding='utf-8')
 
         # Phase 2: Web deep research
-        phase2_result = self.run_phase2_web_research(
-            phase1_result=phase1_result,
-            company_name=company_name,
-            output_file=str(phase2_output),
-            poll_interval=poll_interval,
-            max_wait_time=max_wait_time
-        )
+        if stage != "complete":
+            phase2_result = self.run_phase2_web_research(
+                phase1_result=phase1_result,
+                company_name=company_name,
+                output_file=paths["phase2"],
+                poll_interval=poll_interval,
+                max_wait_time=max_wait_time,
+                checkpoint=checkpoint
+            )
+        else:
+            print(f"Phase 2 report already saved: {paths['phase2']}")
+            phase2_result = Path(paths["phase2"]).read_text(encoding='utf-8')
 
         # No longer auto-merge, return both report paths
         # Report integration done by Claude in skill workflow per report-merge-prompt.md
         print(f"\n{'='*60}")
         print("Two-Phase Research Complete")
         print(f"{'='*60}")
-        print(f"Phase 1 report: {phase1_output}")
-        print(f"Phase 2 report: {phase2_output}")
-        print(f"Final report path: {final_output}")
+        print(f"Phase 1 report: {paths['phase1']}")
+        print(f"Phase 2 report: {paths['phase2']}")
+        print(f"Final report path: {paths['final_output']}")
         print("\nPlease use report-merge-prompt.md guide to integrate both reports")
 
-        return {
-            "phase1": str(phase1_output),
-            "phase2": str(phase2_output),
-            "final_output": str(final_output),
-            "phase1_content": phase1_result,
-            "phase2_content": phase2_result
-        }
+        return dict(paths, phase1_content=phase1_result, phase2_content=phase2_result)
+
+    async def run_two_phase_research_async(
+        self,
+        input_file: str,
+        analysis_prompt: str,
+        output_dir: str,
+        company_ticker: str,
+        company_name: str,
+        poll_interval: int = None,
+        max_wait_time: int = 1800,
+        sections: list[str] = None,
+        token_budget: int = None,
+        previous_file: str = None,
+        previous_report: str = None,
+        resume: bool = False,
+        phase1_request: dict = None
+    ) -> dict:
+        """
+        Async run_two_phase_research, for running many tickers on one event loop
+
+        Same args and result; log lines are prefixed with the ticker.
+        phase1_request: Prebuilt Phase 1 request (build_phase1_request), None to build it here
+
+        Returns:
+            Dictionary containing report paths and content
+        """
+        checkpoint = self.open_checkpoint(
+            output_dir, company_ticker, input_file, analysis_prompt, resume, company_ticker,
+            phase1_options={"sections": sections, "token_budget": token_budget,
+                            "previous_file": previous_file, "previous_report": previous_report}
+        )
+        paths = checkpoint.state["paths"]
+        stage = checkpoint.state["stage"]
+
+        if stage == "phase1":
+            phase1_result = await self.run_phase1_local_analysis_async(
+                input_file=input_file,
+                analysis_prompt=analysis_prompt,
+                output_file=paths["phase1"],
+                poll_interval=poll_interval,
+                max_wait_time=max_wait_time,
+                sections=sections,
+                token_budget=token_budget,
+                previous_file=previous_file,
+                previous_report=previous_report,
+                label=company_ticker,
+                request=phase1_request,
+                checkpoint=checkpoint
+            )
+        else:
+            print(f"[{company_ticker}] Phase 1 report already saved: {paths['phase1']}")
+            phase1_result = Path(paths["phase1"]).read_text(encoding='utf-8')
+
+        if stage != "complete":
+            phase2_result = await self.run_phase2_web_research_async(
+                phase1_result=phase1_result,
+                company_name=company_name,
+                output_file=paths["phase2"],
+                poll_interval=poll_interval,
+                max_wait_time=max_wait_time,
+                label=company_ticker,
+                checkpoint=checkpoint
+            )
+        else:
+            print(f"[{company_ticker}] Phase 2 report already saved: {paths['phase2']}")
+            phase2_result = Path(paths["phase2"]).read_text(encoding='utf-8')
+
+        print(f"[{company_ticker}] Two-Phase Research Complete: {paths['phase1']}, {paths['phase2']}")
+        return dict(paths, phase1_content=phase1_result, phase2_content=phase2_result)
 
     def _extract_research_questions(self, phase1_result: str) -> str:
         """Extract research questions from Phase 1 result"""
@@ -540,7 +1091,7 @@ class GeminiDeepResearchAnalyzer:
         input_file: str,
         analysis_prompt: str,
         output_file: str,
-        poll_interval: int = 30,
+        poll_interval: int = None,
         max_wait_time: int = 1800
     ) -> str:
         """
@@ -600,8 +1151,9 @@ def main():
     parser.add_argument(
         "--poll-interval",
         type=int,
-        default=30,
-        help="Polling interval in seconds (default: 30)"
+        default=None,
+        help="Fixed polling interval in seconds (default: adaptive, backing off between quick early "
+             "checks and frequent checks around the usual completion time)"
     )
     parser.add_argument(
         "--max-wait",
@@ -609,6 +1161,53 @@ def main():
         default=1800,
         help="Maximum wait time in seconds (default: 1800)"
     )
+    parser.add_argument(
+        "--sections",
+        default=None,
+        help="Phase 1 on these Item sections only, comma-separated in priority order "
+             f"(e.g. 1,1A,7,8; 10-Q: I-2,II-1A; 'default' = {','.join(DEFAULT_SECTIONS)})"
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=None,
+        help=f"Token budget for --sections (default: {GeminiDeepResearchAnalyzer.TOKEN_THRESHOLD}, the inline limit)"
+    )
+    parser.add_argument(
+        "--tokenizer",
+        default=DEFAULT_TOKENIZER,
+        choices=TOKENIZER_NAMES,
+        help="Token counting for the inline/File Search decision: filing (offline approximation), "
+             "chars (characters / 4) or remote (Gemini count_tokens API) (default: filing)"
+    )
+    parser.add_argument(
+        "--diff-against",
+        default=None,
+        help="Phase 1 on the changes since this previous period's cleaned.txt only "
+             "('auto' = latest earlier filing in a sibling accession directory)"
+    )
+    parser.add_argument(
+        "--previous-report",
+        default=None,
+        help="Previous period's Phase 1 report, gives the model the unchanged sections in --diff-against mode"
+    )
+    parser.add_argument(
+        "--no-store-cache",
+        action="store_true",
+        help="Always upload and index large filings, don't reuse File Search Stores from earlier runs"
+    )
+    parser.add_argument(
+        "--xbrl-facts",
+        action="store_true",
+        help="Add a table of key XBRL financials (revenue, margins, cash flow, balance sheet) from the "
+             "raw submission next to --input to the Phase 1 prompt"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the run recorded in <output-dir>/tmp/research-checkpoint.json: reattach to its "
+             "in-flight or finished interactions and skip saved reports (--phase all or local)"
+    )
 
     args = parser.parse_args()
 
@@ -621,6 +1220,9 @@ def main():
     phase1_output = args.phase1_output
     poll_interval = args.poll_interval
     max_wait = args.max_wait
+    sections = None
+    if args.sections:
+        sections = DEFAULT_SECTIONS if args.sections == "default" else args.sections.split(',')
 
     # Validate input file
     if phase in ["all", "local"]:
@@ -632,6 +1234,18 @@ def main():
         print(f"Error: Analysis framework file not found {prompt_file}")
         sys.exit(1)
 
+    if args.diff_against and args.diff_against != "auto" and not Path(args.diff_against).exists():
+        print(f"Error: Previous filing not found {args.diff_against}")
+        sys.exit(1)
+
+    if args.previous_report and not Path(args.previous_report).exists():
+        print(f"Error: Previous report not found {args.previous_report}")
+        sys.exit(1)
+
+    if args.resume and phase == "web":
+        print("Error: --resume requires --phase all or local")
+        sys.exit(1)
+
     # Infer company name (if not provided)
     if not company_name:
         company_name = company_ticker.upper()
@@ -639,8 +1253,18 @@ def main():
     # Read analysis framework
     analysis_prompt = Path(prompt_file).read_text(encoding='utf-8')
 
+    # Exact reported figures, so the model doesn't have to read them off flattened tables
+    if args.xbrl_facts and phase in ["all", "local"]:
+        fact_table = load_fact_table(input_file)
+        if fact_table:
+            analysis_prompt += f"\n\n**Key XBRL Facts** (as tagged in the filing):\n\n{fact_table}\n"
+            print(f"XBRL fact table added ({estimate_tokens(fact_table):,} tokens)")
+        else:
+            print("Warning: No XBRL facts found next to the filing, continuing without fact table")
+
     # Execute analysis
-    analyzer = GeminiDeepResearchAnalyzer()
+    registry = None if args.no_store_cache else FileSearchRegistry()
+    analyzer = GeminiDeepResearchAnalyzer(tokenizer=args.tokenizer, registry=registry)
 
     if phase == "all":
         # Complete two-phase analysis
@@ -651,26 +1275,39 @@ def main():
             company_ticker=company_ticker,
             company_name=company_name,
             poll_interval=poll_interval,
-            max_wait_time=max_wait
+            max_wait_time=max_wait,
+            sections=sections,
+            token_budget=args.token_budget,
+            previous_file=args.diff_against,
+            previous_report=args.previous_report,
+            resume=args.resume
         )
         print(f"\nAnalysis complete!")
         print(f"Phase 1 report: {result['phase1']}")
         print(f"Phase 2 report: {result['phase2']}")
         print(f"Final report path: {result['final_output']}")
     elif phase == "local":
-        # Phase 1 local analysis only
-        date_str = datetime.now().strftime("%Y-%m-%d")
-        tmp_dir = Path(output_dir) / "tmp"
-        tmp_dir.mkdir(parents=True, exist_ok=True)
-        output_file = tmp_dir / f"phase1-{date_str}.md"
-
-        result = analyzer.run_phase1_local_analysis(
-            input_file=input_file,
-            analysis_prompt=analysis_prompt,
-            output_file=str(output_file),
-            poll_interval=poll_interval,
-            max_wait_time=max_wait
+        # Phase 1 local analysis only (checkpointed, so --phase all --resume can continue with Phase 2)
+        checkpoint = analyzer.open_checkpoint(
+            output_dir, company_ticker, input_file, analysis_prompt, args.resume,
+            phase1_options={"sections": sections, "token_budget": args.token_budget,
+                            "previous_file": args.diff_against, "previous_report": args.previous_report}
         )
+        output_file = checkpoint.state["paths"]["phase1"]
+
+        if checkpoint.state["stage"] == "phase1":
+            result = analyzer.run_phase1_local_analysis(
+                input_file=input_file,
+                analysis_prompt=analysis_prompt,
+                output_file=output_file,
+                poll_interval=poll_interval,
+                max_wait_time=max_wait,
+                sections=sections,
+                token_budget=args.token_budget,
+                previous_file=args.diff_against,
+                previous_report=args.previous_report,
+                checkpoint=checkpoint
+            )
         print(f"\nAnalysis complete! Report: {output_file}")
     elif phase == "web":
         # Phase 2 web research only
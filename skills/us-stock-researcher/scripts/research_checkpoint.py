@@ -0,0 +1,196 @@
+#!/usr/bin/env python3.11
+"""
+Research Checkpoint
+Records the progress of a two-phase Deep Research run so a restarted process can resume it
+
+Features:
+1. One checkpoint per output directory: {output_dir}/tmp/research-checkpoint.json
+2. Records the stage, report paths, File Search Store and each phase's interaction ID
+   (written as soon as the interaction is created, before the long wait)
+3. Resuming reattaches to an in-flight or finished interaction instead of submitting it again,
+   and skips phases whose reports are already saved
+4. Ties the checkpoint to its input filing, analysis framework and Phase 1 options
+   (sections, token budget, diff inputs), so a different run starts fresh
+5. Atomic writes (tmp file + replace), safe to interrupt at any point
+
+Stages: phase1 (uploading / researching) -> phase2 (Phase 1 report saved) -> complete
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+CHECKPOINT_NAME = "research-checkpoint.json"
+CHECKPOINT_VERSION = 1
+STAGES = ["phase1", "phase2", "complete"]
+# Options that change the Phase 1 request, part of the checkpoint identity
+PHASE1_OPTIONS = ["sections", "token_budget", "previous_file", "previous_report"]
+PATH_OPTIONS = ["previous_file", "previous_report"]
+
+
+def get_checkpoint_path(output_dir: str) -> Path:
+    """
+    Checkpoint location: {output_dir}/tmp/research-checkpoint.json
+    """
+    return Path(output_dir) / "tmp" / CHECKPOINT_NAME
+
+
+def hash_prompt(analysis_prompt: str) -> str:
+    """
+    SHA-256 of the analysis framework text
+    """
+    return hashlib.sha256(analysis_prompt.encode('utf-8')).hexdigest()
+
+
+def normalize_phase1_options(options: dict = None) -> dict:
+    """
+    Phase 1 options as recorded in a checkpoint: unset ones left out, file paths resolved
+
+    Args:
+        options: Any of PHASE1_OPTIONS (other keys are ignored)
+    """
+    normalized = {}
+    for name in PHASE1_OPTIONS:
+        value = (options or {}).get(name)
+        if value is None:
+            continue
+        if name in PATH_OPTIONS and value != "auto":
+            value = str(Path(value).resolve())
+        elif name == "sections":
+            value = list(value)
+        normalized[name] = value
+    return normalized
+
+
+class ResearchCheckpoint:
+    """Progress of one two-phase research run, persisted after every step"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.state = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        """
+        Read the checkpoint into state
+
+        Returns:
+            Checkpoint state, empty if missing, unreadable or from another version
+        """
+        try:
+            state = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            state = {}
+        self.state = state if state.get("version") == CHECKPOINT_VERSION else {}
+        return self.state
+
+    def save(self):
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(self.state, indent=2), encoding='utf-8')
+            tmp.replace(self.path)
+
+    def start(self, ticker: str, input_file: str, analysis_prompt: str, paths: dict, phase1_options: dict = None):
+        """
+        Begin a new run (replaces any earlier checkpoint)
+
+        Args:
+            ticker: Company ticker
+            input_file: SEC filing path
+            analysis_prompt: Analysis framework text
+            paths: Report paths (get_report_paths)
+            phase1_options: sections, token_budget, previous_file, previous_report of this run
+        """
+        self.state = {
+            "version": CHECKPOINT_VERSION,
+            "ticker": ticker,
+            "input": str(Path(input_file).resolve()) if input_file else None,
+            "prompt_sha256": hash_prompt(analysis_prompt),
+            "phase1_options": normalize_phase1_options(phase1_options),
+            "paths": paths,
+            "stage": "phase1",
+            # For inspection only: a resubmitted Phase 1 finds its store again through the File Search registry
+            "store_name": None,
+            "phase1": None,
+            "phase2": None,
+            "started_at": datetime.now().isoformat(timespec='seconds'),
+        }
+        self.update()
+
+    def matches(self, input_file: str, analysis_prompt: str, phase1_options: dict = None) -> bool:
+        """
+        Whether the loaded checkpoint belongs to a run on this filing and framework with the same Phase 1 options
+        """
+        if not self.state:
+            return False
+        input_path = str(Path(input_file).resolve()) if input_file else None
+        return (self.state.get("input") == input_path
+                and self.state.get("prompt_sha256") == hash_prompt(analysis_prompt)
+                and self.state.get("phase1_options", {}) == normalize_phase1_options(phase1_options))
+
+    def update(self, **fields):
+        """
+        Merge fields into the state and write it
+        """
+        self.state.update(fields, updated_at=datetime.now().isoformat(timespec='seconds'))
+        self.save()
+
+    def clear(self):
+        """
+        Delete the checkpoint file
+        """
+        self.state = {}
+        self.path.unlink(missing_ok=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Show or clear the two-phase research checkpoint of an output directory"
+    )
+    parser.add_argument(
+        "--output-dir",
+        required=True,
+        help="Research output directory (e.g., investment-research/TSM)"
+    )
+    parser.add_argument(
+        "--clear",
+        action="store_true",
+        help="Delete the checkpoint, so the next --resume starts from scratch"
+    )
+
+    args = parser.parse_args()
+    checkpoint = ResearchCheckpoint(get_checkpoint_path(args.output_dir))
+
+    if args.clear:
+        checkpoint.clear()
+        print(f"Checkpoint cleared: {checkpoint.path}")
+        return
+
+    state = checkpoint.load()
+    if not state:
+        print(f"No checkpoint: {checkpoint.path}")
+        sys.exit(1)
+
+    print(f"Checkpoint: {checkpoint.path}")
+    print(f"  Ticker: {state['ticker']}")
+    print(f"  Input: {state['input']}")
+    if state.get("phase1_options"):
+        print("  Phase 1 options: " + ', '.join(f"{k}={v}" for k, v in state["phase1_options"].items()))
+    print(f"  Stage: {state['stage']} (updated {state.get('updated_at')})")
+    if state.get("store_name"):
+        print(f"  File Search Store: {state['store_name']}")
+    for phase in ["phase1", "phase2"]:
+        entry = state.get(phase)
+        if entry:
+            created = datetime.fromtimestamp(entry["created_at"]).isoformat(timespec='seconds')
+            print(f"  {phase}: {entry['interaction']} (created {created})")
+        print(f"  {phase} report: {state['paths'][phase]}" + (" (saved)" if Path(state['paths'][phase]).exists() else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+#!/usr/bin/env python3.11
+"""
+Watchlist Research Pipeline
+Streams each ticker through download -> clean -> token count -> upload/index -> research
+
+Features:
+1. One stage per step, connected by bounded queues: a ticker moves on as soon as its
+   previous stage is done, so EDGAR downloads, CPU cleaning, File Search indexing and
+   Deep Research waits for different tickers overlap
+2. Per-stage worker limits (download threads, cleaning/counting processes, uploads,
+   researches in flight); bounded queues keep fast stages from running far ahead
+3. Downloads share one EdgarClient under the SEC 10 requests/second token bucket
+4. Tickers with an INPUT filing in the research list skip download and cleaning
+5. Per-ticker stage timings and errors in a structured summary; one failure doesn't stop the rest
+
+Research list format: same as batch_research.py ('TICKER [INPUT] [PROMPT] ["Company Name"]')
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    from batch_clean import clean_one_filing
+    from batch_research import DEFAULT_CONCURRENCY, parse_research_list, resolve_job
+    from cleaned_cache import CleanedCache
+    from edgar_client import BACKENDS, SEC_MAX_REQUESTS_PER_SECOND, EdgarClient, TokenBucket, make_transport
+    from file_search_registry import FileSearchRegistry
+    from filing_store import mark_processed, read_filed_date
+    from gemini_deep_research import GeminiDeepResearchAnalyzer
+    from section_index import DEFAULT_SECTIONS
+    from token_counter import DEFAULT_TOKENIZER, TOKENIZER_NAMES, count_file_tokens, get_tokenizer
+    from watchlist_scheduler import download_job
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from batch_clean import clean_one_filing
+    from batch_research import DEFAULT_CONCURRENCY, parse_research_list, resolve_job
+    from cleaned_cache import CleanedCache
+    from edgar_client import BACKENDS, SEC_MAX_REQUESTS_PER_SECOND, EdgarClient, TokenBucket, make_transport
+    from file_search_registry import FileSearchRegistry
+    from filing_store import mark_processed, read_filed_date
+    from gemini_deep_research import GeminiDeepResearchAnalyzer
+    from section_index import DEFAULT_SECTIONS
+    from token_counter import DEFAULT_TOKENIZER, TOKENIZER_NAMES, count_file_tokens, get_tokenizer
+    from watchlist_scheduler import download_job
+
+STAGES = ["download", "clean", "tokens", "upload", "research"]
+DEFAULT_DOWNLOAD_WORKERS = 4
+DEFAULT_UPLOAD_WORKERS = 4
+# Tickers waiting between two stages
+DEFAULT_QUEUE_SIZE = 4
+
+
+def count_tokens_job(path: str, tokenizer_name: str) -> int:
+    """
+    Count (and memoize) a cleaned filing's tokens (runs inside worker process)
+    """
+    return count_file_tokens(path, get_tokenizer(tokenizer_name))
+
+
+class ResearchPipeline:
+    """
+    Runs research list jobs through the pipeline stages on one event loop
+
+    Each stage has its own workers reading from a bounded queue. Blocking
+    work runs off the loop: downloads, uploads and interaction calls in
+    threads, cleaning and offline token counting in a process pool.
+    """
+
+    def __init__(
+        self,
+        analyzer: GeminiDeepResearchAnalyzer,
+        client: EdgarClient = None,
+        project_root: str = None,
+        default_prompt: str = None,
+        form: str = "10-K",
+        incremental: bool = False,
+        cache: CleanedCache = None,
+        phase: str = "all",
+        download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+        clean_workers: int = None,
+        upload_workers: int = DEFAULT_UPLOAD_WORKERS,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        **options
+    ):
+        """
+        Args:
+            analyzer: Shared analyzer (uploads, File Search registry, status multiplexer)
+            client: EDGAR client for the download stage (None = only use filings already on disk)
+            project_root: Project root holding investment-research/<TICKER>
+            default_prompt: Framework for jobs without their own (default: latest generated one)
+            form: Form type downloaded and researched for each ticker
+            incremental: Only fetch filings newer than those already downloaded
+            cache: Cleaned cache (None = always clean)
+            phase: "all" (Phase 1 and 2) or "local" (Phase 1 only)
+            download_workers: Concurrent downloads
+            clean_workers: Cleaning / token counting processes (default: CPU count)
+            upload_workers: Concurrent File Search uploads and indexing waits
+            concurrency: Tickers in the research stage at the same time
+            queue_size: Tickers held between two stages
+            **options: poll_interval, max_wait_time, sections, token_budget
+        """
+        self.analyzer = analyzer
+        self.client = client
+        self.project_root = project_root
+        self.default_prompt = default_prompt
+        self.form = form
+        self.incremental = incremental
+        self.cache = cache
+        self.phase = phase
+        clean_workers = clean_workers or os.cpu_count() or 1
+        self.workers = {
+            "download": download_workers,
+            "clean": clean_workers,
+            "tokens": clean_workers,
+            "upload": upload_workers,
+            "research": concurrency,
+        }
+        self.queue_size = queue_size
+        self.options = options
+        self.clean_pool = None
+
+    async def download(self, item: dict):
+        job = item["job"]
+        if job["input"] or self.client is None:
+            return  # Filing given in the list, or offline run on downloaded filings
+        raw_files = await asyncio.to_thread(
+            download_job, self.client, {"ticker": job["ticker"], "form": self.form, "limit": 1},
+            self.project_root, self.incremental
+        )
+        item["raw_files"] = [str(p) for p in raw_files]
+        print(f"[{job['ticker']}] Downloaded {len(raw_files)} files")
+
+    async def clean(self, item: dict):
+        job = item["job"]
+        loop = asyncio.get_running_loop()
+        cache_args = (str(self.cache.cache_dir), self.cache.max_bytes) if self.cache else (None, None)
+        cleaned_files = []
+        for raw in item.get("raw_files", []):
+            cleaned = await loop.run_in_executor(
+                self.clean_pool, clean_one_filing, raw, str(Path(raw).parent / "cleaned.txt"), False, *cache_args
+            )
+            if cleaned["status"] != "ok":
+                raise RuntimeError(f"{cleaned['input']}: {cleaned['error']}")
+            if self.incremental:
+                # Still pending in the manifest until cleaned, so a failed clean is retried next run
+                mark_processed(Path(raw).parent.parent, [raw])
+            cleaned_files.append((read_filed_date(raw) or "", cleaned["output"]))
+        if cleaned_files and not job["input"]:
+            # Research the latest filing this run cleaned (limit 1, plus held filings still pending)
+            job = dict(job, input=max(cleaned_files)[1])
+        # Otherwise the latest filing of the form on disk (also covers incremental runs with nothing new)
+        item["job"] = resolve_job(job, self.project_root, self.default_prompt, self.form)
+        item["result"]["input"] = item["job"]["input"]
+
+    async def count_tokens(self, item: dict):
+        tokenizer = self.analyzer.tokenizer
+        if tokenizer.name == "remote":
+            count = await asyncio.to_thread(count_file_tokens, item["job"]["input"], tokenizer)
+        else:
+            loop = asyncio.get_running_loop()
+            count = await loop.run_in_executor(self.clean_pool, count_tokens_job, item["job"]["input"], tokenizer.name)
+        # Memoized beside the filing, so the upload stage's mode selection doesn't recount
+        item["result"]["tokens"] = count
+
+    async def upload(self, item: dict):
+        job = item["job"]
+        item["paths"] = self.analyzer.get_report_paths(job["output_dir"], job["ticker"])
+        item["prompt"] = Path(job["prompt"]).read_text(encoding='utf-8')
+        request = await asyncio.to_thread(
+            self.analyzer.build_phase1_request,
+            job["input"], item["prompt"], item["paths"]["phase1"],
+            self.options.get("sections"), self.options.get("token_budget")
+        )
+        item["request"] = request
+        item["result"]["store_name"] = request["store_name"]
+
+    async def research(self, item: dict):
+        job, paths, result = item["job"], item["paths"], item["result"]
+        options = {k: self.options[k] for k in ("poll_interval", "max_wait_time") if k in self.options}
+        if self.phase == "all":
+            await self.analyzer.run_two_phase_research_async(
+                input_file=job["input"],
+                analysis_prompt=item["prompt"],
+                output_dir=job["output_dir"],
+                company_ticker=job["ticker"],
+                company_name=job["company"],
+                phase1_request=item["request"],
+                **options
+            )
+            result.update(phase1=paths["phase1"], phase2=paths["phase2"], final_output=paths["final_output"])
+        else:
+            await self.analyzer.run_phase1_local_analysis_async(
+                input_file=job["input"],
+                analysis_prompt=item["prompt"],
+                output_file=paths["phase1"],
+                label=job["ticker"],
+                request=item["request"],
+                **options
+            )
+            result["phase1"] = paths["phase1"]
+
+    async def run_stage(self, stage: str, inbox: asyncio.Queue, outbox: asyncio.Queue = None, next_workers: int = 0):
+        """
+        Run a stage's workers until its inbox is closed, then close its outbox
+
+        A worker takes a ticker, runs the stage on it and passes it on; a
+        failed ticker is recorded and dropped. None closes a queue (one per
+        worker of the receiving stage).
+        """
+        handler = getattr(self, {"tokens": "count_tokens"}.get(stage, stage))
+
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is None:
+                    return
+                result = item["result"]
+                started = time.perf_counter()
+                try:
+                    await handler(item)
+                except Exception as e:
+                    result["status"] = "failed"
+                    result["error"] = f"{stage}: {type(e).__name__}: {e}"
+                    print(f"[{result['ticker']}] {stage} failed: {type(e).__name__}: {e}")
+                    continue
+                finally:
+                    result["stages"][stage] = round(time.perf_counter() - started, 1)
+                if outbox is not None:
+                    await outbox.put(item)
+
+        await asyncio.gather(*(worker() for _ in range(self.workers[stage])))
+        if outbox is not None:
+            for _ in range(next_workers):
+                await outbox.put(None)
+
+    async def run(self, jobs: list[dict]) -> dict:
+        """
+        Run all jobs through the pipeline
+
+        Returns:
+            Summary dict: seconds, stage_seconds (summed per stage over tickers),
+            succeeded, failed, jobs (per-ticker results in list order)
+        """
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(
+            max_workers=self.workers["download"] + self.workers["upload"] + self.workers["research"] + 4
+        ))
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in STAGES]
+        items = [
+            {"job": job, "result": {"ticker": job["ticker"], "status": "ok", "input": job["input"], "tokens": None,
+                                    "store_name": None, "phase1": None, "phase2": None, "final_output": None,
+                                    "stages": {}, "seconds": None, "error": None}}
+            for job in jobs
+        ]
+
+        async def feed():
+            for item in items:
+                await queues[0].put(item)
+            for _ in range(self.workers[STAGES[0]]):
+                await queues[0].put(None)
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers["clean"]) as self.clean_pool:
+            await asyncio.gather(feed(), *(
+                self.run_stage(
+                    stage, queues[i],
+                    queues[i + 1] if i + 1 < len(STAGES) else None,
+                    self.workers[STAGES[i + 1]] if i + 1 < len(STAGES) else 0
+                )
+                for i, stage in enumerate(STAGES)
+            ))
+        self.clean_pool = None
+
+        results = []
+        for item in items:
+            item["result"]["seconds"] = round(sum(item["result"]["stages"].values()), 1)
+            results.append(item["result"])
+        failed = sum(1 for r in results if r["status"] != "ok")
+        return {
+            "seconds": round(time.perf_counter() - start, 1),
+            "stage_seconds": {
+                stage: round(sum(r["stages"].get(stage, 0) for r in results), 1) for stage in STAGES
+            },
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "jobs": results,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Download, clean, upload and research a list of tickers as an overlapping pipeline"
+    )
+    parser.add_argument(
+        "--list",
+        required=True,
+        help="Research list file, one line per ticker: TICKER [INPUT] [PROMPT] [\"Company Name\"]"
+    )
+    parser.add_argument(
+        "--project-root",
+        default=None,
+        help="Project root holding investment-research/<TICKER> (default: current directory)"
+    )
+    parser.add_argument(
+        "--prompt",
+        default=None,
+        help="Analysis framework for tickers without their own (default: each ticker's latest "
+             "tmp/analysis-framework-*.md)"
+    )
+    parser.add_argument(
+        "--form",
+        default="10-K",
+        help="Form type to download and research for each ticker (default: 10-K)"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch filings newer than those already downloaded"
+    )
+    parser.add_argument(
+        "--no-download",
+        action="store_true",
+        help="Research filings already on disk, don't contact EDGAR"
+    )
+    parser.add_argument(
+        "--phase",
+        choices=["all", "local"],
+        default="all",
+        help="all=two-phase analysis, local=Phase 1 filing analysis only (default: all)"
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=DEFAULT_DOWNLOAD_WORKERS,
+        help=f"Concurrent downloads (default: {DEFAULT_DOWNLOAD_WORKERS})"
+    )
+    parser.add_argument(
+        "--clean-workers",
+        type=int,
+        default=None,
+        help="Cleaning and token counting processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--upload-workers",
+        type=int,
+        default=DEFAULT_UPLOAD_WORKERS,
+        help=f"Concurrent File Search uploads/indexing (default: {DEFAULT_UPLOAD_WORKERS})"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Tickers researched at the same time (default: {DEFAULT_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help=f"Tickers waiting between two stages (default: {DEFAULT_QUEUE_SIZE})"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=SEC_MAX_REQUESTS_PER_SECOND,
+        help=f"Global EDGAR request budget per second (default: {SEC_MAX_REQUESTS_PER_SECOND}, the SEC limit)"
+    )
+    parser.add_argument(
+        "--base-url",
+        default=None,
+        help="Fetch from this base URL instead of sec.gov (e.g. local stand-in EDGAR server)"
+    )
+    parser.add_argument(
+        "--backend",
+        default="session",
+        choices=BACKENDS,
+        help="HTTP backend: session (pooled keep-alive requests.Session) or urllib (default: session)"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=int,
+        default=None,
+        help="Fixed polling interval in seconds (default: adaptive)"
+    )
+    parser.add_argument(
+        "--max-wait",
+        type=int,
+        default=1800,
+        help="Maximum wait time per phase in seconds (default: 1800)"
+    )
+    parser.add_argument(
+        "--sections",
+        default=None,
+        help=f"Phase 1 on these Item sections only, comma-separated ('default' = {','.join(DEFAULT_SECTIONS)})"
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=None,
+        help="Token budget for --sections"
+    )
+    parser.add_argument(
+        "--tokenizer",
+        default=DEFAULT_TOKENIZER,
+        choices=TOKENIZER_NAMES,
+        help="Token counting for the inline/File Search decision (default: filing)"
+    )
+    parser.add_argument(
+        "--no-store-cache",
+        action="store_true",
+        help="Always upload and index large filings, don't reuse File Search Stores from earlier runs"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always re-clean, don't reuse cached cleaned output"
+    )
+    parser.add_argument(
+        "--summary",
+        default=None,
+        help="Write JSON summary (per-ticker status, stage timings, reports, errors) to this path"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        jobs = parse_research_list(args.list)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not jobs:
+        print("Error: No tickers in research list", file=sys.stderr)
+        sys.exit(1)
+    if min(args.download_workers, args.upload_workers, args.concurrency, args.queue_size) < 1:
+        print("Error: Worker counts and --queue-size must be at least 1", file=sys.stderr)
+        sys.exit(1)
+    if args.prompt and not Path(args.prompt).exists():
+        print(f"Error: Analysis framework file not found {args.prompt}", file=sys.stderr)
+        sys.exit(1)
+    sections = None
+    if args.sections:
+        sections = DEFAULT_SECTIONS if args.sections == "default" else args.sections.split(',')
+
+    client = None
+    if not args.no_download:
+        try:
+            transport = make_transport(args.backend, pool_size=args.download_workers)
+        except ImportError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        client = EdgarClient(
+            base_url=args.base_url,
+            rate_limiter=TokenBucket(rate=args.rate),
+            transport=transport
+        )
+    registry = None if args.no_store_cache else FileSearchRegistry()
+    analyzer = GeminiDeepResearchAnalyzer(tokenizer=args.tokenizer, registry=registry)
+
+    pipeline = ResearchPipeline(
+        analyzer,
+        client=client,
+        project_root=args.project_root,
+        default_prompt=args.prompt,
+        form=args.form,
+        incremental=args.incremental,
+        cache=None if args.no_cache else CleanedCache(),
+        phase=args.phase,
+        download_workers=args.download_workers,
+        clean_workers=args.clean_workers,
+        upload_workers=args.upload_workers,
+        concurrency=args.concurrency,
+        queue_size=args.queue_size,
+        poll_interval=args.poll_interval,
+        max_wait_time=args.max_wait,
+        sections=sections,
+        token_budget=args.token_budget
+    )
+    print(f"Running {len(jobs)} tickers through {' -> '.join(STAGES)}...")
+    summary = asyncio.run(pipeline.run(jobs))
+    if client is not None:
+        client.close()
+
+    print(f"\nDone in {summary['seconds']:.0f}s ({sum(summary['stage_seconds'].values()):.0f}s of stage work): "
+          f"{summary['succeeded']} succeeded, {summary['failed']} failed")
+    for result in summary["jobs"]:
+        stages = ', '.join(f"{stage} {seconds:.0f}s" for stage, seconds in result["stages"].items())
+        if result["status"] == "ok":
+            print(f"  {result['ticker']}: {result['phase1']} ({stages})")
+        else:
+            print(f"  {result['ticker']}: FAILED {result['error']}")
+
+    if args.summary:
+        Path(args.summary).write_text(json.dumps(summary, indent=2), encoding='utf-8')
+        print(f"Summary: {args.summary}")
+
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
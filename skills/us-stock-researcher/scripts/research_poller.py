@@ -0,0 +1,297 @@
+#!/usr/bin/env python3.11
+"""
+Deep Research Status Poller
+Adaptive polling schedule and a shared status multiplexer for long-running Deep Research interactions
+
+Features:
+1. Adaptive schedule: fast first checks (quick failures), then exponential backoff with jitter
+2. Tightens around the expected completion time, learned from earlier runs' durations
+3. Duration history per research kind (phase1, phase1-file-search, phase2), persisted locally
+4. Status multiplexer: one event-loop task serves every in-flight interaction's status checks,
+   coalescing checks that fall due together into one round and de-duplicating interaction IDs
+5. Independent of the genai SDK (takes a status fetch callable), so it runs against a fake client
+
+Default history location: ~/.cache/us-stock-researcher/research-durations.json
+(override with SEC_RESEARCH_DURATIONS)
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import threading
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_HISTORY_PATH = Path.home() / ".cache" / "us-stock-researcher" / "research-durations.json"
+MIN_POLL_SECONDS = 5
+MAX_POLL_SECONDS = 120
+# Longest interval while no duration history says when to look closely
+NO_HISTORY_MAX_POLL_SECONDS = 60
+BACKOFF_FACTOR = 1.6
+JITTER = 0.2
+# Longest check interval inside the expected completion window
+TIGHT_POLL_SECONDS = 15
+HISTORY_SIZE = 50
+MIN_HISTORY_SAMPLES = 3
+# Checks due within this many seconds of each other run in the same round
+COALESCE_SECONDS = 2.0
+MAX_PARALLEL_CHECKS = 8
+
+
+def get_default_history_path() -> Path:
+    """
+    History path from SEC_RESEARCH_DURATIONS, or ~/.cache/us-stock-researcher/research-durations.json
+    """
+    return Path(os.getenv("SEC_RESEARCH_DURATIONS", str(DEFAULT_HISTORY_PATH)))
+
+
+class DurationHistory:
+    """Completed research durations per kind, for predicting when a research will finish"""
+
+    def __init__(self, path: str = None):
+        self.path = Path(path) if path else get_default_history_path()
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        """
+        All durations, {kind: [seconds, ...]} oldest first
+        """
+        try:
+            return json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, kind: str, seconds: float):
+        """
+        Add a completed research duration, keeping the latest HISTORY_SIZE per kind
+        """
+        with self._lock:
+            history = self.load()
+            history[kind] = (history.get(kind, []) + [round(seconds, 1)])[-HISTORY_SIZE:]
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp.write_text(json.dumps(history, indent=2), encoding='utf-8')
+                tmp.replace(self.path)
+            except OSError as e:
+                print(f"Warning: Could not record research duration: {e}")
+
+    def expected_window(self, kind: str) -> Optional[tuple[float, float]]:
+        """
+        Window a research of this kind usually completes in
+
+        Returns:
+            (lower, upper) seconds: 25th and 90th percentile of past durations,
+            None with fewer than MIN_HISTORY_SAMPLES
+        """
+        durations = self.load().get(kind, [])
+        if len(durations) < MIN_HISTORY_SAMPLES:
+            return None
+        quantiles = statistics.quantiles(durations, n=20, method='inclusive')
+        return quantiles[4], quantiles[17]
+
+
+class AdaptivePoller:
+    """
+    Delay before the next status check of one interaction
+
+    Without history: MIN_POLL_SECONDS, growing by BACKOFF_FACTOR (with jitter)
+    up to NO_HISTORY_MAX_POLL_SECONDS. With an expected window: backoff until the window
+    opens (never sleeping past its start), checks at most TIGHT_POLL_SECONDS
+    apart inside it, and backoff again from the minimum once it has passed.
+    """
+
+    def __init__(
+        self,
+        window: Optional[tuple[float, float]] = None,
+        fixed_interval: float = None,
+        min_interval: float = MIN_POLL_SECONDS,
+        max_interval: float = MAX_POLL_SECONDS,
+        rng: random.Random = None
+    ):
+        """
+        Args:
+            window: (lower, upper) expected completion seconds, None if unknown
+            fixed_interval: Always wait this long (the original fixed polling)
+            min_interval: Shortest delay
+            max_interval: Longest delay
+            rng: Random source for jitter
+        """
+        self.window = window
+        self.fixed_interval = fixed_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.rng = rng or random.Random()
+        self.attempt = 0
+        self.past_window = False
+
+    def _backoff(self, max_interval: float) -> float:
+        delay = self.min_interval * BACKOFF_FACTOR ** self.attempt
+        self.attempt += 1
+        delay *= 1 + self.rng.uniform(-JITTER, JITTER)
+        return min(max_interval, delay)
+
+    def next_delay(self, elapsed: float) -> float:
+        """
+        Seconds to wait before the next check
+
+        Args:
+            elapsed: Seconds since the research was created
+        """
+        if self.fixed_interval:
+            return self.fixed_interval
+        if self.window is None:
+            return max(self.min_interval, self._backoff(min(self.max_interval, NO_HISTORY_MAX_POLL_SECONDS)))
+
+        lower, upper = self.window
+        if elapsed < lower:
+            delay = min(self._backoff(self.max_interval), lower - elapsed)
+        elif elapsed <= upper:
+            tight = min(TIGHT_POLL_SECONDS, max(self.min_interval, (upper - lower) / 10))
+            delay = min(tight, upper - elapsed + self.min_interval)
+        else:
+            if not self.past_window:
+                self.past_window = True
+                self.attempt = 0
+            delay = self._backoff(self.max_interval)
+        return max(self.min_interval, delay)
+
+
+class StatusMultiplexer:
+    """
+    Shared status checker for all in-flight interactions on one event loop
+
+    Each waiter asks for its interaction's status after a delay. One task
+    sleeps until the earliest check is due, then checks every interaction
+    due within COALESCE_SECONDS in one round (each ID once, however many
+    waiters asked), at most MAX_PARALLEL_CHECKS calls at a time in worker threads.
+    """
+
+    def __init__(
+        self,
+        fetch_status,
+        coalesce_seconds: float = COALESCE_SECONDS,
+        max_parallel: int = MAX_PARALLEL_CHECKS
+    ):
+        """
+        Args:
+            fetch_status: Blocking callable, interaction ID -> status (e.g. client.interactions.get)
+            coalesce_seconds: Checks due this close together share a round
+            max_parallel: Concurrent status calls per round
+        """
+        self.fetch_status = fetch_status
+        self.coalesce_seconds = coalesce_seconds
+        self.max_parallel = max_parallel
+        self.pending = {}  # interaction ID -> [due loop time, [futures]]
+        self.loop = None
+        self.task = None
+        self.wakeup = None
+        self.stats = {"requests": 0, "calls": 0, "rounds": 0}
+
+    async def get_status(self, interaction_id: str, delay: float = 0):
+        """
+        Status of an interaction, checked delay seconds from now (or slightly earlier when coalesced)
+
+        Raises:
+            The fetch error, if the status call failed
+        """
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # First use on this event loop (asyncio.run creates a new loop per run)
+            self.loop, self.task, self.wakeup, self.pending = loop, None, asyncio.Event(), {}
+        future = loop.create_future()
+        due = loop.time() + max(0.0, delay)
+        entry = self.pending.setdefault(interaction_id, [due, []])
+        entry[0] = min(entry[0], due)
+        entry[1].append(future)
+        self.stats["requests"] += 1
+
+        if self.task is None or self.task.done():
+            self.task = loop.create_task(self._run())
+        self.wakeup.set()
+        return await future
+
+    async def _check(self, interaction_id: str, limit: asyncio.Semaphore):
+        async with limit:
+            try:
+                return await asyncio.to_thread(self.fetch_status, interaction_id), None
+            except Exception as e:
+                return None, e
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        limit = asyncio.Semaphore(self.max_parallel)
+        while self.pending:
+            self.wakeup.clear()
+            delay = min(due for due, _ in self.pending.values()) - loop.time()
+            if delay > 0:
+                # Sleep until the earliest check, or until a new request arrives
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            horizon = loop.time() + self.coalesce_seconds
+            batch = {i: entry[1] for i, entry in self.pending.items() if entry[0] <= horizon}
+            for interaction_id in batch:
+                del self.pending[interaction_id]
+            results = await asyncio.gather(*(self._check(i, limit) for i in batch))
+            self.stats["rounds"] += 1
+            self.stats["calls"] += len(batch)
+
+            for futures, (status, error) in zip(batch.values(), results):
+                for future in futures:
+                    if future.done():
+                        continue  # Waiter was cancelled
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(status)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Show recorded Deep Research durations and the resulting polling schedule"
+    )
+    parser.add_argument(
+        "--history",
+        default=None,
+        help="Duration history file (default: $SEC_RESEARCH_DURATIONS or "
+             "~/.cache/us-stock-researcher/research-durations.json)"
+    )
+    parser.add_argument(
+        "--schedule",
+        type=int,
+        default=None,
+        metavar="SECONDS",
+        help="Print the check times a research of each kind would get if it completed after SECONDS"
+    )
+
+    args = parser.parse_args()
+    history = DurationHistory(args.history)
+    durations = history.load()
+
+    print(f"History: {history.path}")
+    if not durations:
+        print("No completed researches recorded")
+    for kind, values in sorted(durations.items()):
+        window = history.expected_window(kind)
+        window_text = f"expected {window[0]:.0f}-{window[1]:.0f}s" if window else "too few samples"
+        print(f"  {kind}: {len(values)} runs, median {statistics.median(values):.0f}s, {window_text}")
+
+    if args.schedule is not None:
+        for kind in sorted(durations) or ["(no history)"]:
+            poller = AdaptivePoller(history.expected_window(kind), rng=random.Random(0))
+            checks, elapsed = [0.0], 0.0
+            while elapsed < args.schedule:
+                elapsed += poller.next_delay(elapsed)
+                checks.append(elapsed)
+            print(f"  {kind}: {len(checks)} checks, done noticed at {checks[-1]:.0f}s "
+                  f"({checks[-1] - args.schedule:.0f}s late): " + ', '.join(f"{c:.0f}" for c in checks))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3.11
+"""
+Cleaned Filing Section Index
+Locates the standard Item sections (Item 1, 1A, 7, 8, ...) of a cleaned 10-K/10-Q/20-F
+
+Features:
+1. Detects "Item N." headings in the primary document of cleaned.txt
+2. Skips table-of-contents entries and cross-references (keeps the longest span per item)
+3. Records item id, title, byte offset/length and token count per section (token_counter.py)
+4. Token-budgeted section selection for building compact analysis prompts
+5. JSON sidecar (cleaned.sections.json), rebuilt when cleaned.txt changes
+"""
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Optional
+
+try:
+    from token_counter import FilingTokenizer, count_tokens
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from token_counter import FilingTokenizer, count_tokens
+
+# Bump when detection or the sidecar layout changes, stale files are rebuilt
+SECTION_INDEX_VERSION = 2
+
+# Document banner written by clean_sec_filing.format_document
+SEPARATOR = "=" * 60
+DOCUMENT_PREFIX = "DOCUMENT: "
+SUBMISSION_TYPE_PREFIX = "CONFORMED SUBMISSION TYPE:"
+
+ITEM_HEADING_PATTERN = re.compile(
+    r'^(?:PART\s+(I{1,3}|IV)\s*[,.:\-–—]?\s*)?ITEM\s+(\d{1,2}[A-D]?)\s*(?:[.:\-–—]\s*|\s+|$)(.*)$',
+    re.IGNORECASE
+)
+PART_HEADING_PATTERN = re.compile(r'^PART\s+(I{1,3}|IV)\b', re.IGNORECASE)
+
+# Headings are short lines, longer lines starting with "Item 7" are prose
+MAX_HEADING_LENGTH = 200
+
+# Items restart at 1 in each part of a 10-Q, so its ids are part-qualified (e.g. "II-1A")
+PART_QUALIFIED_FORMS = ("10-Q",)
+
+DEFAULT_SECTIONS = ["1", "1A", "7", "7A", "8"]
+
+TRUNCATION_MARKER = "\n\n[... section truncated ...]"
+SECTION_JOIN = "\n\n\n"
+
+
+def get_section_index_path(cleaned_path: str) -> Path:
+    """
+    Sidecar location: cleaned.txt -> cleaned.sections.json
+    """
+    return Path(cleaned_path).with_suffix('.sections.json')
+
+
+def iter_primary_document_lines(path: Path):
+    """
+    Yield (kind, byte_offset, line) for the header and first document of cleaned.txt
+
+    kind is "header" (SEC header block), "banner" (the document banner) or "body"
+    """
+    offset = 0
+    region = "start"
+    with open(path, 'rb') as f:
+        for raw in f:
+            line = raw.rstrip(b'\n').decode('utf-8', errors='replace')
+            if line == SEPARATOR:
+                if region == "body":
+                    # Next document's banner
+                    return
+                # start -> header banner -> header -> document banner -> body
+                region = {"start": "header_banner", "header_banner": "header",
+                          "header": "banner", "banner": "body"}[region]
+            elif region == "header_banner" and line.startswith(DOCUMENT_PREFIX):
+                # No SEC header, the first banner is the document's
+                region = "banner"
+            yield ("header" if region.startswith("header") else region, offset, line)
+            offset += len(raw)
+
+
+def scan_sections(path: Path) -> dict:
+    """
+    Find Item headings in the primary document and derive section spans
+
+    Returns:
+        Dict: form, document_type, header (offset/length), sections
+    """
+    form = document_type = None
+    header_end = 0
+    body_end = 0
+    part = None
+    candidates = []
+    pending_title = None  # Heading with its title on the following line
+
+    for kind, offset, line in iter_primary_document_lines(path):
+        end = offset + len(line.encode('utf-8'))
+        stripped = line.strip()
+        if kind == "header":
+            header_end = end
+            if line.startswith(SUBMISSION_TYPE_PREFIX):
+                form = line[len(SUBMISSION_TYPE_PREFIX):].strip()
+            continue
+        if kind == "banner":
+            if line.startswith(DOCUMENT_PREFIX):
+                document_type = line[len(DOCUMENT_PREFIX):]
+            continue
+
+        body_end = end + 1
+        if not stripped:
+            continue
+        if pending_title is not None:
+            if len(stripped) <= MAX_HEADING_LENGTH and not ITEM_HEADING_PATTERN.match(stripped):
+                pending_title["title"] = stripped
+            pending_title = None
+        if len(stripped) > MAX_HEADING_LENGTH:
+            continue
+
+        part_match = PART_HEADING_PATTERN.match(stripped)
+        if part_match:
+            part = part_match.group(1).upper()
+        item_match = ITEM_HEADING_PATTERN.match(stripped)
+        if not item_match:
+            continue
+        if item_match.group(1):
+            part = item_match.group(1).upper()
+        candidate = {
+            "part": part,
+            "item": item_match.group(2).upper(),
+            "title": item_match.group(3).strip(),
+            "offset": offset,
+        }
+        if not candidate["title"]:
+            pending_title = candidate
+        candidates.append(candidate)
+
+    form = form or document_type
+    qualify = (form or '').upper().startswith(PART_QUALIFIED_FORMS)
+
+    # Each heading runs to the next one; the table of contents and cross-references
+    # produce short spans, so the longest span per item is the real section
+    best = {}
+    for i, candidate in enumerate(candidates):
+        end = candidates[i + 1]["offset"] if i + 1 < len(candidates) else body_end
+        section_id = f"{candidate['part']}-{candidate['item']}" if qualify and candidate["part"] else candidate["item"]
+        if section_id not in best or end - candidate["offset"] > best[section_id]["length"]:
+            best[section_id] = dict(candidate, id=section_id, length=end - candidate["offset"])
+
+    sections = sorted(best.values(), key=lambda s: s["offset"])
+    # Drop overlaps left by the longest-span choice (a TOC entry spanning a real section)
+    kept = []
+    for section in sections:
+        if kept and section["offset"] < kept[-1]["offset"] + kept[-1]["length"]:
+            if section["length"] > kept[-1]["length"]:
+                kept[-1] = section
+            continue
+        kept.append(section)
+
+    tokenizer = FilingTokenizer()
+    with open(path, 'rb') as f:
+        for section in kept:
+            f.seek(section["offset"])
+            section["tokens"] = count_tokens(f.read(section["length"]).decode('utf-8', errors='replace'), tokenizer)
+
+    return {
+        "form": form,
+        "document_type": document_type,
+        "header": {"offset": 0, "length": header_end},
+        "sections": [
+            {k: s[k] for k in ("id", "part", "item", "title", "offset", "length", "tokens")} for s in kept
+        ],
+    }
+
+
+def build_section_index(cleaned_path: str) -> dict:
+    """
+    Scan cleaned.txt and build its section index
+
+    Returns:
+        Index dict: version, source size/mtime, form, header range, sections
+    """
+    cleaned_file = Path(cleaned_path)
+    stat = cleaned_file.stat()
+    return {
+        "version": SECTION_INDEX_VERSION,
+        "source": cleaned_file.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        **scan_sections(cleaned_file),
+    }
+
+
+def write_section_index(index: dict, cleaned_path: str) -> Path:
+    """
+    Persist section index next to cleaned.txt (written atomically)
+    """
+    index_path = get_section_index_path(cleaned_path)
+    tmp_path = index_path.with_name(index_path.name + '.tmp')
+    tmp_path.write_text(json.dumps(index, indent=1, ensure_ascii=False), encoding='utf-8')
+    tmp_path.replace(index_path)
+    return index_path
+
+
+def write_section_sidecar(cleaned_path: str) -> dict:
+    """
+    Build and write the section index for freshly cleaned output
+
+    Returns:
+        Index dict
+    """
+    index = build_section_index(cleaned_path)
+    index_path = write_section_index(index, cleaned_path)
+    print(f"Section index: {len(index['sections'])} sections -> {index_path}")
+    return index
+
+
+def load_section_index(cleaned_path: str) -> Optional[dict]:
+    """
+    Load persisted section index if it is still valid for cleaned.txt
+
+    Returns:
+        Index dict, None if missing, unreadable, or stale (size/mtime/version changed)
+    """
+    index_path = get_section_index_path(cleaned_path)
+    if not index_path.exists():
+        return None
+    try:
+        index = json.loads(index_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+    stat = Path(cleaned_path).stat()
+    if (index.get("version") != SECTION_INDEX_VERSION
+            or index.get("size") != stat.st_size
+            or index.get("mtime_ns") != stat.st_mtime_ns):
+        return None
+    return index
+
+
+def load_or_build_section_index(cleaned_path: str, persist: bool = True) -> dict:
+    """
+    Reuse persisted section index or build (and persist) a new one
+    """
+    index = load_section_index(cleaned_path)
+    if index is not None:
+        return index
+
+    index = build_section_index(cleaned_path)
+    if persist:
+        try:
+            write_section_index(index, cleaned_path)
+        except OSError as e:
+            print(f"Warning: Could not write section index: {e}")
+    return index
+
+
+def read_range(cleaned_path: str, offset: int, length: int) -> str:
+    """
+    Read a byte range of cleaned.txt
+    """
+    with open(cleaned_path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length).decode('utf-8', errors='replace')
+
+
+def truncate_to_tokens(text: str, tokens: int, tokenizer) -> str:
+    """
+    Cut text to at most tokens, at a paragraph break when one is near the limit ("" for no tokens)
+    """
+    if tokens <= 0:
+        return ''
+    total = count_tokens(text, tokenizer)
+    limit = len(text) * tokens // max(total, 1)
+    while total > tokens and limit > 0:
+        cut = text.rfind('\n\n', 0, limit)
+        if cut < limit // 2:
+            cut = limit
+        text = text[:cut].rstrip()
+        total = count_tokens(text, tokenizer)
+        # Character/token ratio varies within a section, shrink until it fits
+        limit = cut * 9 // 10
+    return text
+
+
+def select_sections(
+    cleaned_path: str,
+    section_ids: list[str],
+    token_budget: int,
+    index: dict = None,
+    tokenizer=None
+) -> dict:
+    """
+    Assemble requested sections within a token budget
+
+    Sections are taken in the requested (priority) order until the budget is
+    spent; the section that crosses the budget is truncated (dropped if the
+    truncation marker leaves no room for its text) and later ones are
+    dropped. The SEC header is always included. Output keeps filing order.
+
+    Args:
+        cleaned_path: cleaned.txt path
+        section_ids: Item ids in priority order (e.g. ["1", "1A", "7", "8"]; 10-Q: ["I-2", "II-1A"])
+        token_budget: Maximum tokens of the assembled text
+        index: Section index (default: load or build)
+        tokenizer: token_counter tokenizer for budgeting (default: filing approximation)
+
+    Returns:
+        Dict: text, tokens, included (ids), truncated (ids), missing (ids not found), dropped (over budget)
+    """
+    if index is None:
+        index = load_or_build_section_index(cleaned_path)
+    by_id = {section["id"]: section for section in index["sections"]}
+
+    tokenizer = tokenizer or FilingTokenizer()
+    header = read_range(cleaned_path, index["header"]["offset"], index["header"]["length"]).strip()
+    remaining = token_budget - count_tokens(header + '\n', tokenizer)
+    marker_tokens = count_tokens(TRUNCATION_MARKER, tokenizer)
+    join_tokens = count_tokens(SECTION_JOIN, tokenizer)
+    chosen = []
+    truncation = None  # (chosen position, full text, token allowance) of the truncated section
+    result = {"included": [], "truncated": [], "missing": [], "dropped": []}
+
+    for section_id in section_ids:
+        section = by_id.get(section_id.upper())
+        if section is None:
+            result["missing"].append(section_id)
+            continue
+        if remaining <= 0:
+            result["dropped"].append(section["id"])
+            continue
+        text = read_range(cleaned_path, section["offset"], section["length"]).strip()
+        # Plus the break joining it to the previous part
+        cost = count_tokens(text, tokenizer) + join_tokens
+        if cost > remaining:
+            available = remaining - marker_tokens - join_tokens
+            if available <= 0:
+                # No room for any text next to the truncation marker
+                result["dropped"].append(section["id"])
+                continue
+            truncation = (len(chosen), text, available)
+            text = truncate_to_tokens(text, available, tokenizer) + TRUNCATION_MARKER
+            result["truncated"].append(section["id"])
+            # Budget is spent, later sections are dropped
+            cost = remaining
+        remaining -= cost
+        result["included"].append(section["id"])
+        chosen.append((section["offset"], text))
+
+    result["text"] = join_sections(header, chosen)
+    result["tokens"] = count_tokens(result["text"], tokenizer)
+    # Part counts don't add up exactly (e.g. rounding): shrink the truncated section, else the
+    # lowest-priority one, by the overshoot
+    while result["tokens"] > token_budget and chosen:
+        if truncation is None:
+            full_text = chosen[-1][1]
+            truncation = (len(chosen) - 1, full_text, count_tokens(full_text, tokenizer) - marker_tokens)
+            result["truncated"].append(result["included"][-1])
+        position, full_text, available = truncation
+        available -= result["tokens"] - token_budget
+        offset = chosen[position][0]
+        if available <= 0:
+            del chosen[position]
+            section_id = result["truncated"].pop()
+            result["included"].remove(section_id)
+            result["dropped"].append(section_id)
+            truncation = None
+        else:
+            chosen[position] = (offset, truncate_to_tokens(full_text, available, tokenizer) + TRUNCATION_MARKER)
+            truncation = (position, full_text, available)
+        result["text"] = join_sections(header, chosen)
+        result["tokens"] = count_tokens(result["text"], tokenizer)
+    return result
+
+
+def join_sections(header: str, chosen: list[tuple[int, str]]) -> str:
+    """
+    SEC header plus (offset, text) sections in filing order
+    """
+    parts = [header] + [text for _, text in sorted(chosen)]
+    return SECTION_JOIN.join(parts) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or show the Item section index of a cleaned 10-K/10-Q/20-F"
+    )
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="Cleaned file path (cleaned.txt)"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Ignore persisted index and rebuild it"
+    )
+    parser.add_argument(
+        "--select",
+        default=None,
+        help="Print the assembled text of these sections, comma-separated in priority order (e.g. 1,1A,7,8)"
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=80000,
+        help="Token budget for --select (default: 80000)"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        if args.rebuild:
+            index = build_section_index(args.input)
+            write_section_index(index, args.input)
+        else:
+            index = load_or_build_section_index(args.input)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.select:
+        selection = select_sections(args.input, args.select.split(','), args.token_budget, index)
+        print(selection["text"])
+        return
+
+    print(f"Form: {index['form']}, {len(index['sections'])} sections")
+    print(f"{'ITEM':<8} {'TOKENS':>9} {'OFFSET':>12}  TITLE")
+    for section in index["sections"]:
+        print(f"{section['id']:<8} {section['tokens']:>9,} {section['offset']:>12,}  {section['title']}")
+
+
+if __name__ == "__main__":
+    main()
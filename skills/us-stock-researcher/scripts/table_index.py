@@ -0,0 +1,414 @@
+#!/usr/bin/env python3.11
+"""
+Cleaned Filing Table Index
+Sidecar index of every table in a cleaned.txt written with --tables markdown or tsv
+
+Features:
+1. Scans cleaned.txt once for Markdown/TSV table blocks
+2. Records each table's document type, nearest heading, units caption, statement kind
+   (income statement, balance sheet, cash flow, ...) and byte offset/length in cleaned.txt
+3. Stores parsed rows, so prompt builders load tables without re-scanning the text
+4. JSON sidecar (cleaned.tables.json), or Parquet (cleaned.tables.parquet) when pyarrow is installed
+"""
+import argparse
+import json
+import re
+import sys
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+# Bump when the sidecar layout changes, stale files are rebuilt
+TABLE_INDEX_VERSION = 1
+TABLE_INDEX_FORMATS = ["json", "parquet"]
+
+# Document banner written by clean_sec_filing.format_document
+SEPARATOR = "=" * 60
+DOCUMENT_PREFIX = "DOCUMENT: "
+FILENAME_PREFIX = "FILENAME: "
+
+MARKDOWN_SEPARATOR_PATTERN = re.compile(r'^\|( --- \|)+$')
+MARKDOWN_CELL_SPLIT_PATTERN = re.compile(r'(?<!\\)\|')
+UNITS_PATTERN = re.compile(r'^\(.*\b(thousands|millions|billions|except)\b.*\)$', re.IGNORECASE)
+
+# Non-table lines kept as heading candidates before each table
+HEADING_LOOKBACK = 6
+MAX_HEADING_LENGTH = 160
+
+# (statement, keywords) checked in order against the lowercased heading
+STATEMENT_KEYWORDS = [
+    ("balance_sheet", ["balance sheet", "financial position", "financial condition"]),
+    ("cash_flow", ["cash flow"]),
+    ("comprehensive_income", ["comprehensive income"]),
+    ("equity", ["shareholders' equity", "stockholders' equity", "shareholders’ equity",
+                "stockholders’ equity", "changes in equity"]),
+    ("income_statement", ["statements of operations", "statement of operations", "statements of income",
+                          "statement of income", "statements of earnings", "statement of earnings"]),
+]
+
+
+def get_table_index_path(cleaned_path: str, fmt: str = "json") -> Path:
+    """
+    Sidecar location: cleaned.txt -> cleaned.tables.json / cleaned.tables.parquet
+    """
+    return Path(cleaned_path).with_suffix(f'.tables.{fmt}')
+
+
+def classify_statement(heading: Optional[str]) -> Optional[str]:
+    """
+    Financial statement kind from a table heading, None if not a primary statement
+    """
+    if not heading:
+        return None
+    lowered = heading.lower()
+    for statement, keywords in STATEMENT_KEYWORDS:
+        if any(keyword in lowered for keyword in keywords):
+            return statement
+    return None
+
+
+def parse_markdown_row(line: str) -> list[str]:
+    """
+    Split '| a | b \\| c |' into cells, unescaping pipes
+    """
+    return [cell.strip().replace('\\|', '|') for cell in MARKDOWN_CELL_SPLIT_PATTERN.split(line[1:-1])]
+
+
+def find_heading(candidates) -> tuple[Optional[str], Optional[str]]:
+    """
+    Nearest heading-like line and units caption among lines preceding a table
+
+    Args:
+        candidates: Recent non-table lines, oldest first
+
+    Returns:
+        (heading, units)
+    """
+    heading = units = None
+    for line in reversed(candidates):
+        if units is None and UNITS_PATTERN.match(line):
+            units = line
+            continue
+        if len(line) <= MAX_HEADING_LENGTH and not line.endswith('.'):
+            heading = line
+            break
+    return heading, units
+
+
+def scan_tables(lines) -> list[dict]:
+    """
+    Find table blocks in cleaned text lines
+
+    Args:
+        lines: Iterable of (byte_offset, line_text) without line endings
+
+    Returns:
+        Table entries in file order
+    """
+    tables = []
+    document = {"index": 0, "type": None, "filename": None}
+    candidates = deque(maxlen=HEADING_LOOKBACK)
+    in_banner = False  # Between the separator lines of a header/document banner
+    block = None   # Table being collected
+    previous = None
+
+    def finish_block():
+        heading, units = find_heading(list(candidates))
+        rows = block["rows"]
+        tables.append({
+            "id": len(tables) + 1,
+            "document": document["index"],
+            "document_type": document["type"],
+            "filename": document["filename"],
+            "heading": heading,
+            "units": units,
+            "statement": classify_statement(heading),
+            "format": block["format"],
+            "offset": block["offset"],
+            "length": block["end"] - block["offset"],
+            "columns": max(len(row) for row in rows),
+            "rows": rows,
+        })
+        candidates.clear()
+
+    for offset, line in lines:
+        end = offset + len(line.encode('utf-8'))
+
+        if block is not None:
+            if block["format"] == "tsv" and '\t' in line:
+                block["rows"].append(line.split('\t'))
+                block["end"] = end
+                continue
+            if block["format"] == "markdown" and line.startswith('|') and line.endswith('|'):
+                if not MARKDOWN_SEPARATOR_PATTERN.match(line):
+                    block["rows"].append(parse_markdown_row(line))
+                block["end"] = end
+                continue
+            finish_block()
+            block = None
+
+        if in_banner:
+            if line == SEPARATOR:
+                in_banner = False
+            elif line.startswith(DOCUMENT_PREFIX):
+                document = {"index": document["index"] + 1, "type": line[len(DOCUMENT_PREFIX):], "filename": None}
+                candidates.clear()
+            elif line.startswith(FILENAME_PREFIX):
+                document["filename"] = line[len(FILENAME_PREFIX):]
+            previous = None
+            continue
+        if line == SEPARATOR:
+            in_banner = True
+            previous = None
+            continue
+
+        if '\t' in line:
+            block = {"format": "tsv", "offset": offset, "end": end, "rows": [line.split('\t')]}
+        elif MARKDOWN_SEPARATOR_PATTERN.match(line) and previous and previous[1].startswith('|'):
+            # Header row was the previous line
+            candidates.pop()
+            block = {"format": "markdown", "offset": previous[0], "end": end,
+                     "rows": [parse_markdown_row(previous[1])]}
+        elif line:
+            candidates.append(line)
+        previous = (offset, line) if line else None
+
+    if block is not None:
+        finish_block()
+    return tables
+
+
+def iter_lines_with_offsets(path: Path):
+    """
+    Yield (byte_offset, line) for a UTF-8 text file, without line endings
+    """
+    offset = 0
+    with open(path, 'rb') as f:
+        for raw in f:
+            yield offset, raw.rstrip(b'\n').decode('utf-8', errors='replace')
+            offset += len(raw)
+
+
+def build_table_index(cleaned_path: str) -> dict:
+    """
+    Scan cleaned.txt and build its table index
+
+    Returns:
+        Index dict: version, source size/mtime, table entries
+    """
+    cleaned_file = Path(cleaned_path)
+    stat = cleaned_file.stat()
+    return {
+        "version": TABLE_INDEX_VERSION,
+        "source": cleaned_file.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "tables": scan_tables(iter_lines_with_offsets(cleaned_file)),
+    }
+
+
+def write_table_index(index: dict, cleaned_path: str, fmt: str = "json") -> Path:
+    """
+    Persist table index next to cleaned.txt (written atomically)
+
+    Returns:
+        Sidecar path
+
+    Raises:
+        ImportError: If fmt is "parquet" and pyarrow is not installed
+    """
+    index_path = get_table_index_path(cleaned_path, fmt)
+    tmp_path = index_path.with_name(index_path.name + '.tmp')
+
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet table index requires pyarrow (pip install pyarrow)")
+        metadata = {k: str(v) for k, v in index.items() if k != "tables"}
+        table = pa.Table.from_pylist(index["tables"]).replace_schema_metadata(metadata)
+        pq.write_table(table, tmp_path)
+    else:
+        tmp_path.write_text(json.dumps(index, ensure_ascii=False), encoding='utf-8')
+
+    tmp_path.replace(index_path)
+    return index_path
+
+
+def write_table_sidecar(cleaned_path: str, fmt: str = "json") -> dict:
+    """
+    Build and write the table index for freshly cleaned output
+
+    Returns:
+        Index dict
+    """
+    index = build_table_index(cleaned_path)
+    index_path = write_table_index(index, cleaned_path, fmt)
+    print(f"Table index: {len(index['tables'])} tables -> {index_path}")
+    return index
+
+
+def read_table_index_file(index_path: Path) -> Optional[dict]:
+    """
+    Read a JSON or Parquet sidecar, None if unreadable
+    """
+    try:
+        if index_path.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            table = pq.read_table(index_path)
+            metadata = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+            return {
+                "version": int(metadata.get("version", 0)),
+                "source": metadata.get("source"),
+                "size": int(metadata.get("size", -1)),
+                "mtime_ns": int(metadata.get("mtime_ns", -1)),
+                "tables": table.to_pylist(),
+            }
+        return json.loads(index_path.read_text(encoding='utf-8'))
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+def load_table_index(cleaned_path: str, fmt: str = None) -> Optional[dict]:
+    """
+    Load persisted table index if it is still valid for cleaned.txt
+
+    Args:
+        cleaned_path: cleaned.txt path
+        fmt: Only look for this sidecar format (default: either)
+
+    Returns:
+        Index dict, None if missing, unreadable, or stale (size/mtime/version changed)
+    """
+    stat = Path(cleaned_path).stat()
+    for candidate in [fmt] if fmt else TABLE_INDEX_FORMATS:
+        index_path = get_table_index_path(cleaned_path, candidate)
+        if not index_path.exists():
+            continue
+        index = read_table_index_file(index_path)
+        if (index is not None
+                and index.get("version") == TABLE_INDEX_VERSION
+                and index.get("size") == stat.st_size
+                and index.get("mtime_ns") == stat.st_mtime_ns):
+            return index
+    return None
+
+
+def load_or_build_table_index(cleaned_path: str, fmt: str = None, persist: bool = True) -> dict:
+    """
+    Reuse persisted table index or build (and persist) a new one
+
+    Args:
+        cleaned_path: cleaned.txt path
+        fmt: Sidecar format, "json" or "parquet" (default: reuse either, build json)
+        persist: Write a newly built index next to cleaned.txt
+
+    Returns:
+        Index dict
+    """
+    index = load_table_index(cleaned_path, fmt)
+    if index is not None:
+        return index
+
+    index = build_table_index(cleaned_path)
+    if persist:
+        try:
+            write_table_index(index, cleaned_path, fmt or "json")
+        except OSError as e:
+            print(f"Warning: Could not write table index: {e}")
+    return index
+
+
+def select_tables(
+    index: dict,
+    statement: str = None,
+    heading: str = None,
+    document_type: str = None
+) -> list[dict]:
+    """
+    Pick tables by statement kind, heading substring (case-insensitive) and/or document type
+    """
+    selected = []
+    for table in index["tables"]:
+        if statement and table["statement"] != statement:
+            continue
+        if heading and heading.lower() not in (table["heading"] or '').lower():
+            continue
+        if document_type and table["document_type"] != document_type:
+            continue
+        selected.append(table)
+    return selected
+
+
+def read_table_text(cleaned_path: str, table: dict) -> str:
+    """
+    Read one table block verbatim from cleaned.txt by its byte range
+    """
+    with open(cleaned_path, 'rb') as f:
+        f.seek(table["offset"])
+        return f.read(table["length"]).decode('utf-8', errors='replace')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or query the table index of a cleaned SEC filing"
+    )
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="Cleaned file path (cleaned.txt, written with --tables markdown or tsv)"
+    )
+    parser.add_argument(
+        "--format",
+        default=None,
+        choices=TABLE_INDEX_FORMATS,
+        help="Sidecar format (default: reuse existing sidecar, else build json; parquet requires pyarrow)"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Ignore persisted index and rebuild it"
+    )
+    parser.add_argument(
+        "--statement",
+        default=None,
+        choices=[statement for statement, _ in STATEMENT_KEYWORDS],
+        help="Only list tables of this financial statement kind"
+    )
+    parser.add_argument(
+        "--heading",
+        default=None,
+        help="Only list tables whose heading contains this text"
+    )
+    parser.add_argument(
+        "--show",
+        action="store_true",
+        help="Print the selected tables"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        if args.rebuild:
+            index = build_table_index(args.input)
+            write_table_index(index, args.input, args.format or "json")
+        else:
+            index = load_or_build_table_index(args.input, args.format)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    tables = select_tables(index, statement=args.statement, heading=args.heading)
+    print(f"Tables: {len(tables)} of {len(index['tables'])}")
+    print(f"{'#':>4}  {'DOCUMENT':<10} {'STATEMENT':<20} {'ROWS':>5} {'OFFSET':>12}  HEADING")
+    for table in tables:
+        print(f"{table['id']:>4}  {table['document_type'] or '':<10} {table['statement'] or '':<20} "
+              f"{len(table['rows']):>5} {table['offset']:>12,}  {table['heading'] or ''}")
+        if args.show:
+            print(read_table_text(args.input, table))
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3.11
+"""
+Filing Token Counter
+Token counts for deciding inline vs File Search mode, without sending the filing anywhere
+
+Features:
+1. Offline approximation modelled on Gemini's tokenizer: every digit is its own token,
+   a leading space merges into the following word, long words split, CJK ~1 char/token
+   (numeric-heavy filings are badly undercounted by characters / 4)
+2. Pluggable tokenizers: filing (default), chars (characters / 4), remote (Gemini count_tokens API)
+3. Counts text in fixed-size chunks, and files by streaming, never copying the whole filing
+4. Counts memoized beside cleaned.txt (cleaned.tokens.json), reused while the file is unchanged
+5. Calibration: fits the approximation to remote counts on sample chunks and saves the scale
+
+Default calibration file: ~/.cache/us-stock-researcher/token-calibration.json
+(override with SEC_TOKEN_CALIBRATION)
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+# Bump when approximation features or the memo layout change, memoized counts are discarded
+TOKEN_COUNT_VERSION = 1
+TOKENIZER_NAMES = ["filing", "chars", "remote"]
+DEFAULT_TOKENIZER = "filing"
+
+# Model whose tokenizer remote counts use (same Gemini tokenizer family as the research agent)
+DEFAULT_COUNT_MODEL = "gemini-2.5-flash"
+
+# Local counting works on slices of this many characters
+COUNT_CHUNK_CHARS = 1 << 20
+# Each remote count_tokens request sends at most this many characters
+REMOTE_CHUNK_CHARS = 500_000
+CALIBRATION_SAMPLES = 8
+CALIBRATION_SAMPLE_BYTES = 100_000
+
+DEFAULT_CALIBRATION_PATH = Path.home() / ".cache" / "us-stock-researcher" / "token-calibration.json"
+
+LETTER_RUN_PATTERN = re.compile(r'[A-Za-z]+')
+DIGIT_PATTERN = re.compile(r'[0-9]')
+BREAK_RUN_PATTERN = re.compile(r'[ ]*[\n\t][\s]*')
+SPACE_RUN_PATTERN = re.compile(r'\s+')
+
+# Weight per feature: word (letter run), letter, digit, line/tab break run,
+# ASCII punctuation, other (non-ASCII) character
+FILING_WEIGHTS = {
+    "words": 0.8,
+    "letters": 0.06,
+    "digits": 1.0,
+    "breaks": 1.0,
+    "punctuation": 0.9,
+    "other": 1.0,
+}
+
+
+def get_calibration_path() -> Path:
+    """
+    Calibration file from SEC_TOKEN_CALIBRATION, or ~/.cache/us-stock-researcher/token-calibration.json
+    """
+    return Path(os.getenv("SEC_TOKEN_CALIBRATION", str(DEFAULT_CALIBRATION_PATH)))
+
+
+def load_calibration() -> dict:
+    """
+    Saved calibration ({"version", "scale", "model", "samples"}), empty if none
+    """
+    try:
+        calibration = json.loads(get_calibration_path().read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    return calibration if calibration.get("version") == TOKEN_COUNT_VERSION else {}
+
+
+def save_calibration(calibration: dict):
+    """
+    Write calibration atomically
+    """
+    path = get_calibration_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(json.dumps(calibration, indent=2), encoding='utf-8')
+    tmp_path.replace(path)
+
+
+def iter_text_chunks(text: str, chunk_chars: int = COUNT_CHUNK_CHARS):
+    """
+    Yield consecutive slices of text, cut at whitespace so no word is split
+    """
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_chars, length)
+        if end < length:
+            cut = max(text.rfind(' ', start, end), text.rfind('\n', start, end))
+            if cut > start:
+                end = cut + 1
+        yield text[start:end]
+        start = end
+
+
+def iter_file_chunks(path: str, chunk_chars: int = COUNT_CHUNK_CHARS):
+    """
+    Stream a UTF-8 file as text slices cut at whitespace (bounded memory)
+    """
+    carry = ''
+    with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        while True:
+            block = f.read(chunk_chars)
+            if not block:
+                break
+            block = carry + block
+            cut = max(block.rfind(' '), block.rfind('\n'))
+            if cut < 0 and len(block) < 4 * chunk_chars:
+                carry = block
+                continue
+            if cut < 0:
+                # No whitespace at all, give up on word boundaries
+                cut = len(block) - 1
+            carry = block[cut + 1:]
+            yield block[:cut + 1]
+    if carry:
+        yield carry
+
+
+class CharRatioTokenizer:
+    """Characters / 4, the original estimate"""
+
+    name = "chars"
+
+    @property
+    def key(self) -> str:
+        return self.name
+
+    def count(self, text: str) -> int:
+        return len(text) // 4
+
+
+class FilingTokenizer:
+    """Offline approximation of Gemini token counts, tuned for filing text"""
+
+    name = "filing"
+
+    def __init__(self, scale: float = None):
+        """
+        Args:
+            scale: Multiplier on the weighted feature sum (default: saved calibration, else 1.0)
+        """
+        self.scale = scale if scale is not None else load_calibration().get("scale", 1.0)
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:v{TOKEN_COUNT_VERSION}:{self.scale:.4f}"
+
+    @staticmethod
+    def features(text: str) -> dict:
+        """
+        Feature counts of text, each a handful of C-level regex/str passes
+        """
+        rest, words = LETTER_RUN_PATTERN.subn('', text)
+        letters = len(text) - len(rest)
+        rest, digits = DIGIT_PATTERN.subn('', rest)
+        rest, breaks = BREAK_RUN_PATTERN.subn('', rest)
+        rest = SPACE_RUN_PATTERN.sub('', rest)
+        punctuation = len(rest.encode('ascii', 'ignore'))
+        return {
+            "words": words,
+            "letters": letters,
+            "digits": digits,
+            "breaks": breaks,
+            "punctuation": punctuation,
+            "other": len(rest) - punctuation,
+        }
+
+    @staticmethod
+    def weighted(features: dict) -> float:
+        return sum(FILING_WEIGHTS[name] * value for name, value in features.items())
+
+    def count(self, text: str) -> int:
+        return round(self.weighted(self.features(text)) * self.scale)
+
+
+class RemoteTokenizer:
+    """Exact counts from the Gemini count_tokens API (sends the text)"""
+
+    name = "remote"
+
+    def __init__(self, client=None, model: str = DEFAULT_COUNT_MODEL, chunk_chars: int = REMOTE_CHUNK_CHARS):
+        """
+        Args:
+            client: google.genai Client (default: new client from GEMINI_API_KEY)
+            model: Model whose tokenizer is used
+            chunk_chars: Characters per count request
+
+        Raises:
+            ImportError: If client is None and google-genai is not installed
+            ValueError: If client is None and GEMINI_API_KEY is not set
+        """
+        if client is None:
+            try:
+                from google import genai
+            except ImportError:
+                raise ImportError("Remote tokenizer requires google-genai (pip install google-genai)")
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("Please set environment variable GEMINI_API_KEY")
+            client = genai.Client(api_key=api_key)
+        self.client = client
+        self.model = model
+        self.chunk_chars = chunk_chars
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.model}"
+
+    def count(self, text: str) -> int:
+        total = 0
+        for chunk in iter_text_chunks(text, self.chunk_chars):
+            total += self.client.models.count_tokens(model=self.model, contents=chunk).total_tokens
+        return total
+
+
+def get_tokenizer(name: str = DEFAULT_TOKENIZER, client=None, model: str = DEFAULT_COUNT_MODEL):
+    """
+    Tokenizer by name: "filing", "chars" or "remote" (client/model only used for remote)
+    """
+    if name == "filing":
+        return FilingTokenizer()
+    if name == "chars":
+        return CharRatioTokenizer()
+    if name == "remote":
+        return RemoteTokenizer(client, model)
+    raise ValueError(f"Unknown tokenizer: {name} (expected one of {', '.join(TOKENIZER_NAMES)})")
+
+
+def count_tokens(text: str, tokenizer=None) -> int:
+    """
+    Count tokens of text in chunks (default tokenizer: filing approximation)
+    """
+    tokenizer = tokenizer or FilingTokenizer()
+    return sum(tokenizer.count(chunk) for chunk in iter_text_chunks(text))
+
+
+def get_memo_path(path: str) -> Path:
+    """
+    Memo location: cleaned.txt -> cleaned.tokens.json
+    """
+    return Path(path).with_suffix('.tokens.json')
+
+
+def load_memo(path: str) -> dict:
+    """
+    Memoized counts for path, empty if missing or stale (size/mtime/version changed)
+    """
+    try:
+        memo = json.loads(get_memo_path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    stat = Path(path).stat()
+    if (memo.get("version") != TOKEN_COUNT_VERSION
+            or memo.get("size") != stat.st_size
+            or memo.get("mtime_ns") != stat.st_mtime_ns):
+        return {}
+    return memo.get("counts", {})
+
+
+def save_memo(path: str, counts: dict):
+    """
+    Write memoized counts next to path (atomically)
+    """
+    stat = Path(path).stat()
+    memo_path = get_memo_path(path)
+    tmp_path = memo_path.with_name(memo_path.name + '.tmp')
+    tmp_path.write_text(json.dumps({
+        "version": TOKEN_COUNT_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "counts": counts,
+    }, indent=2), encoding='utf-8')
+    tmp_path.replace(memo_path)
+
+
+def count_file_tokens(path: str, tokenizer=None, memo: bool = True) -> int:
+    """
+    Count tokens of a text file, streaming it in chunks
+
+    Args:
+        path: File path (e.g. cleaned.txt)
+        tokenizer: Tokenizer (default: filing approximation)
+        memo: Reuse and store the count in cleaned.tokens.json
+
+    Returns:
+        Token count
+    """
+    tokenizer = tokenizer or FilingTokenizer()
+    counts = load_memo(path) if memo else {}
+    if tokenizer.key in counts:
+        return counts[tokenizer.key]
+
+    if isinstance(tokenizer, RemoteTokenizer):
+        chunks = iter_file_chunks(path, tokenizer.chunk_chars)
+    else:
+        chunks = iter_file_chunks(path)
+    total = sum(tokenizer.count(chunk) for chunk in chunks)
+
+    if memo:
+        counts[tokenizer.key] = total
+        try:
+            save_memo(path, counts)
+        except OSError as e:
+            print(f"Warning: Could not write token memo: {e}")
+    return total
+
+
+def calibrate(path: str, remote: RemoteTokenizer, samples: int = CALIBRATION_SAMPLES) -> dict:
+    """
+    Fit the filing approximation's scale to remote counts on evenly spaced samples of a file
+
+    Returns:
+        Calibration dict: version, scale, model, samples, remote_tokens, approx_tokens
+    """
+    size = Path(path).stat().st_size
+    step = max(1, size // samples)
+    sample_bytes = min(CALIBRATION_SAMPLE_BYTES, step)
+    remote_total = approx_total = 0.0
+    taken = 0
+    with open(path, 'rb') as f:
+        for i in range(samples):
+            f.seek(i * step)
+            sample = f.read(sample_bytes).decode('utf-8', errors='ignore')
+            if not sample.strip():
+                continue
+            remote_total += remote.count(sample)
+            approx_total += FilingTokenizer.weighted(FilingTokenizer.features(sample))
+            taken += 1
+    if not approx_total:
+        raise ValueError(f"No text to calibrate on: {path}")
+    return {
+        "version": TOKEN_COUNT_VERSION,
+        "scale": round(remote_total / approx_total, 4),
+        "model": remote.model,
+        "samples": taken,
+        "remote_tokens": int(remote_total),
+        "approx_tokens": int(approx_total),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Count tokens of a cleaned SEC filing"
+    )
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="Text file path (e.g. cleaned.txt)"
+    )
+    parser.add_argument(
+        "--tokenizer",
+        default=DEFAULT_TOKENIZER,
+        choices=TOKENIZER_NAMES,
+        help="filing (offline approximation), chars (characters / 4) or remote "
+             "(Gemini count_tokens, needs GEMINI_API_KEY) (default: filing)"
+    )
+    parser.add_argument(
+        "--model",
+        default=DEFAULT_COUNT_MODEL,
+        help=f"Model for remote counts (default: {DEFAULT_COUNT_MODEL})"
+    )
+    parser.add_argument(
+        "--no-memo",
+        action="store_true",
+        help="Don't reuse or store counts in cleaned.tokens.json"
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Print counts from every local tokenizer (and remote with --tokenizer remote)"
+    )
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help="Fit the filing approximation to remote counts on samples of the input and save the scale"
+    )
+
+    args = parser.parse_args()
+
+    if not Path(args.input).exists():
+        print(f"Error: File not found {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        if args.calibrate:
+            calibration = calibrate(args.input, RemoteTokenizer(model=args.model))
+            save_calibration(calibration)
+            print(f"Calibrated on {calibration['samples']} samples: remote {calibration['remote_tokens']:,} / "
+                  f"approximation {calibration['approx_tokens']:,} tokens, scale {calibration['scale']}")
+            print(f"Saved: {get_calibration_path()}")
+            return
+
+        names = ["chars", "filing"] if args.compare else []
+        if args.tokenizer not in names:
+            names.append(args.tokenizer)
+        for name in names:
+            tokenizer = get_tokenizer(name, model=args.model)
+            count = count_file_tokens(args.input, tokenizer, memo=not args.no_memo)
+            print(f"{tokenizer.key:<28} {count:>12,} tokens")
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
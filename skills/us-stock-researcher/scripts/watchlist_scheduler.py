@@ -0,0 +1,406 @@
+#!/usr/bin/env python3.11
+"""
+Watchlist Download Scheduler
+Downloads filings for many tickers and forms concurrently, cleaning them as they arrive
+
+Features:
+1. Watchlist file: one ticker per line with forms and limit
+2. Concurrent downloads through one shared EdgarClient under a global token bucket
+   (SEC fair access: 10 requests/second across all threads)
+3. Pipelined cleaning: each completed download goes straight to the cleaning process pool
+4. Optional incremental mode using the per ticker/form accession manifest
+5. Base URL override for running against a local stand-in EDGAR server (fake_edgar.py)
+6. Pooled keep-alive HTTP session (one connection per download thread), with
+   retries on 429/503
+
+Watchlist format (# starts a comment, forms default to 10-K, limit to 1):
+    AAPL 10-K,10-Q 2
+    MSFT 10-Q
+    TSM 20-F,6-K 1
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from pathlib import Path
+
+try:
+    from batch_clean import clean_one_filing, get_default_workers
+    from clean_sec_filing import TABLE_FORMATS
+    from cleaned_cache import CleanedCache
+    from edgar_client import (
+        BACKENDS, DEFAULT_RETRIES, SEC_MAX_REQUESTS_PER_SECOND, EdgarClient, TokenBucket,
+        download_filings_http, make_transport
+    )
+    from filing_store import (
+        get_default_output_dir, get_filing_dir, get_latest_filed_date, load_manifest, mark_processed,
+        save_manifest, sync_manifest
+    )
+    from table_index import TABLE_INDEX_FORMATS
+    from xbrl_facts import FACTS_FORMATS
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from batch_clean import clean_one_filing, get_default_workers
+    from clean_sec_filing import TABLE_FORMATS
+    from cleaned_cache import CleanedCache
+    from edgar_client import (
+        BACKENDS, DEFAULT_RETRIES, SEC_MAX_REQUESTS_PER_SECOND, EdgarClient, TokenBucket,
+        download_filings_http, make_transport
+    )
+    from filing_store import (
+        get_default_output_dir, get_filing_dir, get_latest_filed_date, load_manifest, mark_processed,
+        save_manifest, sync_manifest
+    )
+    from table_index import TABLE_INDEX_FORMATS
+    from xbrl_facts import FACTS_FORMATS
+
+
+def parse_watchlist(path: str) -> list[dict]:
+    """
+    Parse watchlist file into download jobs (one per ticker x form)
+
+    Returns:
+        List of {ticker, form, limit}
+    """
+    jobs = []
+    for line_no, line in enumerate(Path(path).read_text(encoding='utf-8').splitlines(), 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        fields = line.split()
+        if len(fields) > 3:
+            raise ValueError(f"{path}:{line_no}: expected 'TICKER [FORMS] [LIMIT]', got: {line}")
+        ticker = fields[0].upper()
+        forms = fields[1].split(',') if len(fields) > 1 else ["10-K"]
+        limit = int(fields[2]) if len(fields) > 2 else 1
+        for form in forms:
+            jobs.append({"ticker": ticker, "form": form, "limit": limit})
+    return jobs
+
+
+def download_job(
+    client: EdgarClient,
+    job: dict,
+    project_root: str,
+    incremental: bool,
+    select: list[str] = None
+) -> list[Path]:
+    """
+    Download one ticker/form (runs in a download thread)
+
+    Returns:
+        Raw submission paths to clean (in incremental mode only new, re-downloaded or still
+        pending ones; run_watchlist marks them processed once cleaned)
+    """
+    output_dir = get_default_output_dir(job["ticker"], project_root)
+    if not incremental:
+        return download_filings_http(client, job["ticker"], job["form"], job["limit"], output_dir, select=select)
+
+    filing_dir = get_filing_dir(output_dir, job["ticker"], job["form"])
+    manifest = load_manifest(filing_dir, job["ticker"], job["form"])
+    # Filings on disk not cleaned yet (unknown to the manifest, or an earlier clean failed)
+    pending = sync_manifest(manifest, filing_dir)
+    latest = get_latest_filed_date(manifest)
+    after = (date.fromisoformat(latest) + timedelta(days=1)).isoformat() if latest else None
+
+    download_filings_http(client, job["ticker"], job["form"], job["limit"], output_dir, after=after, select=select)
+    raw_files = sorted(set(pending + sync_manifest(manifest, filing_dir)))
+    save_manifest(filing_dir, manifest)
+    return raw_files
+
+
+def run_watchlist(
+    jobs: list[dict],
+    client: EdgarClient,
+    project_root: str = None,
+    download_workers: int = 8,
+    clean_workers: int = None,
+    auto_clean: bool = True,
+    incremental: bool = False,
+    cache: CleanedCache = None,
+    select: list[str] = None,
+    tables: str = "text",
+    table_index: str = None,
+    section_index: bool = False,
+    dedup: bool = False,
+    xbrl_facts: str = None
+) -> dict:
+    """
+    Run all download jobs concurrently and clean results as they complete
+
+    Args:
+        jobs: Jobs from parse_watchlist
+        client: Shared EDGAR client (its token bucket limits all threads together)
+        project_root: Project root for default per-ticker output directories
+        download_workers: Concurrent download threads
+        clean_workers: Cleaning processes (default: CPU count)
+        auto_clean: Clean downloaded filings
+        incremental: Only fetch filings newer than those held in the manifest (filings whose
+            cleaning fails stay pending there and are cleaned again by the next run)
+        cache: Cleaned cache (None = always clean)
+        select: Only fetch these document types from each filing (None = full submission)
+        tables: Table rendering in cleaned output: "text", "markdown" or "tsv"
+        table_index: Also write a table sidecar next to each cleaned file ("json" or "parquet")
+        section_index: Also write an Item section index next to each cleaned file
+        dedup: Replace repeated paragraphs in cleaned output with references
+        xbrl_facts: Also write an XBRL facts sidecar next to each raw file ("json" or "parquet")
+
+    Returns:
+        Summary dict: seconds, requests, jobs (per ticker/form status, files, outputs, errors)
+    """
+    start = time.perf_counter()
+    results = [dict(job, status="pending", raw_files=[], outputs=[], errors=[]) for job in jobs]
+    cache_args = (str(cache.cache_dir), cache.max_bytes) if cache else (None, None)
+    clean_workers = clean_workers or get_default_workers(max(1, len(jobs)))
+
+    with ThreadPoolExecutor(max_workers=download_workers) as download_pool, \
+            ProcessPoolExecutor(max_workers=clean_workers) as clean_pool:
+        download_futures = {
+            download_pool.submit(download_job, client, job, project_root, incremental, select): result
+            for job, result in zip(jobs, results)
+        }
+        clean_futures = {}
+        processed = {}  # Filing directory -> raw files handled, cleared from the manifest's pending
+        hits = misses = bytes_served = 0
+
+        # Hand each finished download to the cleaning pool while others are still downloading
+        for future in as_completed(download_futures):
+            result = download_futures[future]
+            label = f"{result['ticker']} {result['form']}"
+            try:
+                raw_files = future.result()
+            except Exception as e:
+                result["status"] = "failed"
+                result["errors"].append(f"download: {type(e).__name__}: {e}")
+                print(f"  Download failed {label}: {e}")
+                continue
+
+            result["raw_files"] = [str(p) for p in raw_files]
+            result["status"] = "ok"
+            print(f"  Downloaded {label}: {len(raw_files)} files")
+            if not auto_clean:
+                result["outputs"] = result["raw_files"]
+                for raw in raw_files:
+                    processed.setdefault(Path(raw).parent.parent, []).append(raw)
+                continue
+            for raw in raw_files:
+                cleaned = str(Path(raw).parent / "cleaned.txt")
+                clean_future = clean_pool.submit(
+                    clean_one_filing, str(raw), cleaned, False, *cache_args,
+                    tables, table_index, section_index, dedup, xbrl_facts
+                )
+                clean_futures[clean_future] = result
+
+        for future in as_completed(clean_futures):
+            result = clean_futures[future]
+            try:
+                cleaned = future.result()
+            except Exception as e:
+                result["errors"].append(f"clean: {type(e).__name__}: {e}")
+                continue
+            # Failed cleaning falls back to the raw file, like download_filings
+            result["outputs"].append(cleaned["output"])
+            if cleaned["cache"] == "hit":
+                hits += 1
+                bytes_served += Path(cleaned["output"]).stat().st_size
+            elif cleaned["cache"] == "miss":
+                misses += 1
+            if cleaned["status"] != "ok":
+                result["errors"].append(f"clean {cleaned['input']}: {cleaned['error']}")
+            else:
+                processed.setdefault(Path(cleaned["input"]).parent.parent, []).append(cleaned["input"])
+            if cleaned["sidecar_error"]:
+                result["errors"].append(f"sidecar {cleaned['input']}: {cleaned['sidecar_error']}")
+
+    if cache is not None and (hits or misses):
+        cache.record(hits=hits, misses=misses, bytes_served=bytes_served)
+    if incremental:
+        for filing_dir, raw_files in processed.items():
+            mark_processed(filing_dir, raw_files)
+    for result in results:
+        result["outputs"].sort()
+
+    return {
+        "seconds": round(time.perf_counter() - start, 3),
+        "requests": client.request_count,
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "cache_hits": hits,
+        "cache_misses": misses,
+        "jobs": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Download and clean SEC filings for a watchlist of tickers concurrently"
+    )
+    parser.add_argument(
+        "--watchlist",
+        required=True,
+        help="Watchlist file (lines of 'TICKER [FORMS] [LIMIT]', e.g. 'AAPL 10-K,10-Q 2')"
+    )
+    parser.add_argument(
+        "--project-root",
+        default=None,
+        help="Project root directory for output paths (default: current working directory)"
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=8,
+        help="Concurrent download threads (default: 8)"
+    )
+    parser.add_argument(
+        "--clean-workers",
+        type=int,
+        default=None,
+        help="Cleaning processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=SEC_MAX_REQUESTS_PER_SECOND,
+        help=f"Global request budget per second (default: {SEC_MAX_REQUESTS_PER_SECOND}, the SEC limit)"
+    )
+    parser.add_argument(
+        "--base-url",
+        default=None,
+        help="Fetch from this base URL instead of sec.gov (e.g. local stand-in EDGAR server)"
+    )
+    parser.add_argument(
+        "--backend",
+        default="session",
+        choices=BACKENDS,
+        help="HTTP backend: session (pooled keep-alive requests.Session) or urllib (default: session)"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30,
+        help="Read timeout in seconds (default: 30)"
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f"Retries on HTTP 429/503 and connection errors (default: {DEFAULT_RETRIES})"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch filings newer than those already downloaded"
+    )
+    parser.add_argument(
+        "--select",
+        default=None,
+        help="Only fetch these document types from each filing, comma-separated (e.g. primary,EX-99*)"
+    )
+    parser.add_argument(
+        "--no-clean",
+        action="store_true",
+        help="Don't clean downloaded files"
+    )
+    parser.add_argument(
+        "--tables",
+        default="text",
+        choices=TABLE_FORMATS,
+        help="Table rendering in cleaned output: text, markdown or tsv (default: text)"
+    )
+    parser.add_argument(
+        "--table-index",
+        default=None,
+        choices=TABLE_INDEX_FORMATS,
+        help="Also write a table sidecar per cleaned filing (requires --tables markdown or tsv)"
+    )
+    parser.add_argument(
+        "--section-index",
+        action="store_true",
+        help="Also write an Item section index per cleaned filing"
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Replace repeated and near-duplicate paragraphs in cleaned output with short references"
+    )
+    parser.add_argument(
+        "--xbrl-facts",
+        default=None,
+        choices=FACTS_FORMATS,
+        help="Also write an XBRL facts sidecar per filing"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always re-clean, don't reuse cached cleaned output"
+    )
+    parser.add_argument(
+        "--summary",
+        default=None,
+        help="Write JSON summary to this path"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        jobs = parse_watchlist(args.watchlist)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.table_index and args.tables == "text":
+        print("Error: --table-index requires --tables markdown or tsv", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        transport = make_transport(args.backend, pool_size=args.download_workers)
+    except ImportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    client = EdgarClient(
+        base_url=args.base_url,
+        rate_limiter=TokenBucket(rate=args.rate),
+        timeout=args.timeout,
+        retries=args.retries,
+        transport=transport
+    )
+    print(f"Running {len(jobs)} download jobs ({args.download_workers} threads, {args.rate:g} req/s)...")
+
+    summary = run_watchlist(
+        jobs,
+        client,
+        project_root=args.project_root,
+        download_workers=args.download_workers,
+        clean_workers=args.clean_workers,
+        auto_clean=not args.no_clean,
+        incremental=args.incremental,
+        cache=None if args.no_cache else CleanedCache(),
+        select=args.select.split(',') if args.select else None,
+        tables=args.tables,
+        table_index=args.table_index,
+        section_index=args.section_index,
+        dedup=args.dedup,
+        xbrl_facts=args.xbrl_facts
+    )
+    client.close()
+
+    print(f"\nDone in {summary['seconds']:.1f}s, {summary['requests']} requests "
+          f"({client.retry_count} retries), "
+          f"{summary['failed']} failed jobs")
+    for result in summary["jobs"]:
+        print(f"  {result['ticker']} {result['form']}: {result['status']}, {len(result['outputs'])} files")
+        for error in result["errors"]:
+            print(f"    ! {error}")
+
+    if args.summary:
+        Path(args.summary).write_text(json.dumps(summary, indent=2), encoding='utf-8')
+        print(f"Summary: {args.summary}")
+
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
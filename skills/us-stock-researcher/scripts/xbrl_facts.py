@@ -0,0 +1,729 @@
+#!/usr/bin/env python3.11
+"""
+XBRL Fact Extractor
+Parses the XBRL facts of a raw submission into a compact columnar sidecar
+
+Features:
+1. Reads inline XBRL (ix:nonFraction / ix:nonNumeric in the filing's HTML) and
+   XBRL instance documents (EX-101.INS), which the cleaner drops
+2. Resolves contexts (period, dimensions) and units; applies ix scale, sign and number format
+3. Typed facts: concept, period start/end, unit, numeric value or short text, decimals, dimensions
+4. Columnar sidecar next to the filing (full-submission.facts.json, repeated strings
+   dictionary-encoded), or Parquet (full-submission.facts.parquet) when pyarrow is installed
+5. In-memory concept lookup, and a dense Markdown table of key financials for prompts
+"""
+import argparse
+import json
+import mmap
+import re
+import sys
+from html import unescape
+from pathlib import Path
+from typing import Optional
+
+try:
+    from filing_index import load_or_build_filing_index
+    from filing_store import RAW_SUBMISSION_NAMES
+except ImportError:
+    # If running as script directly, try importing from same directory
+    script_dir = Path(__file__).parent
+    sys.path.insert(0, str(script_dir))
+    from filing_index import load_or_build_filing_index
+    from filing_store import RAW_SUBMISSION_NAMES
+
+# Bump when extraction or the sidecar layout changes, stale files are rebuilt
+FACTS_VERSION = 1
+FACTS_FORMATS = ["json", "parquet"]
+FACT_COLUMNS = ["concept", "start", "end", "unit", "value", "text", "decimals", "dimensions"]
+# Columns stored as an index into a per-column string list in the JSON sidecar
+DICTIONARY_COLUMNS = ["concept", "start", "end", "unit", "dimensions"]
+
+# Text facts longer than this are text blocks (notes, policies) already in cleaned.txt
+MAX_TEXT_CHARS = 200
+
+CONTEXT_PATTERN = re.compile(
+    r'<(?:[\w-]+:)?context\b[^>]*?\bid\s*=\s*["\']([^"\']+)["\'][^>]*>(.*?)</(?:[\w-]+:)?context\s*>',
+    re.IGNORECASE | re.DOTALL
+)
+PERIOD_PATTERN = re.compile(r'<(?:[\w-]+:)?(startDate|endDate|instant)\s*>\s*([^<\s]+)', re.IGNORECASE)
+EXPLICIT_MEMBER_PATTERN = re.compile(
+    r'<(?:[\w-]+:)?explicitMember\b[^>]*?dimension\s*=\s*["\']([^"\']+)["\'][^>]*>\s*([^<\s]+)',
+    re.IGNORECASE
+)
+TYPED_MEMBER_PATTERN = re.compile(
+    r'<(?:[\w-]+:)?typedMember\b[^>]*?dimension\s*=\s*["\']([^"\']+)["\'][^>]*>(.*?)</(?:[\w-]+:)?typedMember\s*>',
+    re.IGNORECASE | re.DOTALL
+)
+UNIT_PATTERN = re.compile(
+    r'<(?:[\w-]+:)?unit\b[^>]*?\bid\s*=\s*["\']([^"\']+)["\'][^>]*>(.*?)</(?:[\w-]+:)?unit\s*>',
+    re.IGNORECASE | re.DOTALL
+)
+UNIT_DENOMINATOR_PATTERN = re.compile(r'<(?:[\w-]+:)?unitDenominator\b', re.IGNORECASE)
+MEASURE_PATTERN = re.compile(r'<(?:[\w-]+:)?measure\s*>\s*([^<\s]+)', re.IGNORECASE)
+
+IX_FACT_START_PATTERN = re.compile(r'<ix:(nonFraction|nonNumeric)\b([^>]*)>', re.IGNORECASE)
+IX_MARKER = b'<ix:'
+# Instance document facts: any prefixed element carrying a contextRef
+INSTANCE_FACT_PATTERN = re.compile(
+    r'<([\w-]+:[\w.-]+)\b([^>]*?\bcontextRef\s*=[^>]*?)(?<!/)>(.*?)</\1\s*>',
+    re.DOTALL
+)
+INSTANCE_MARKER = b'contextRef'
+ATTRIBUTE_PATTERN = re.compile(r'([\w:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+TAG_PATTERN = re.compile(r'<[^>]+>')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+DASH_VALUES = {'', '-', '—', '–', '‒', '−'}
+NUMBER_WORDS = {
+    "no": 0, "none": 0, "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}
+
+# (label, candidate concepts) for the prompt table
+KEY_CONCEPTS = [
+    ("Revenue", ["us-gaap:Revenues", "us-gaap:RevenueFromContractWithCustomerExcludingAssessedTax",
+                 "us-gaap:SalesRevenueNet"]),
+    ("Cost of revenue", ["us-gaap:CostOfRevenue", "us-gaap:CostOfGoodsAndServicesSold"]),
+    ("Gross profit", ["us-gaap:GrossProfit"]),
+    ("R&D expense", ["us-gaap:ResearchAndDevelopmentExpense"]),
+    ("Operating income", ["us-gaap:OperatingIncomeLoss"]),
+    ("Net income", ["us-gaap:NetIncomeLoss"]),
+    ("Diluted EPS", ["us-gaap:EarningsPerShareDiluted"]),
+    ("Operating cash flow", ["us-gaap:NetCashProvidedByUsedInOperatingActivities"]),
+    ("Capital expenditures", ["us-gaap:PaymentsToAcquirePropertyPlantAndEquipment"]),
+    ("Cash and equivalents", ["us-gaap:CashAndCashEquivalentsAtCarryingValue"]),
+    ("Total assets", ["us-gaap:Assets"]),
+    ("Total liabilities", ["us-gaap:Liabilities"]),
+    ("Shareholders' equity", ["us-gaap:StockholdersEquity"]),
+    ("Long-term debt", ["us-gaap:LongTermDebtNoncurrent", "us-gaap:LongTermDebt"]),
+    ("Shares outstanding", ["dei:EntityCommonStockSharesOutstanding"]),
+]
+MAX_TABLE_PERIODS = 4
+
+
+def get_facts_path(raw_path: str, fmt: str = "json") -> Path:
+    """
+    Sidecar location: full-submission.txt -> full-submission.facts.json / .facts.parquet
+    """
+    return Path(raw_path).with_suffix(f'.facts.{fmt}')
+
+
+def find_raw_submission(cleaned_path: str) -> Optional[Path]:
+    """
+    Raw submission next to a cleaned.txt (full-submission.txt or selected-submission.txt)
+    """
+    for name in RAW_SUBMISSION_NAMES:
+        raw_path = Path(cleaned_path).parent / name
+        if raw_path.exists():
+            return raw_path
+    return None
+
+
+def parse_attributes(tag_attributes: str) -> dict:
+    """
+    Attributes of a start tag, keys lowercased without namespace prefix
+    """
+    attributes = {}
+    for name, double_quoted, single_quoted in ATTRIBUTE_PATTERN.findall(tag_attributes):
+        attributes[name.rsplit(':', 1)[-1].lower()] = unescape(double_quoted or single_quoted)
+    return attributes
+
+
+def tag_text(markup: str) -> str:
+    """
+    Text content of markup: tags removed, entities decoded, whitespace collapsed
+    """
+    return WHITESPACE_PATTERN.sub(' ', unescape(TAG_PATTERN.sub(' ', markup))).strip()
+
+
+def parse_contexts(text: str) -> dict:
+    """
+    Contexts of an XBRL instance or inline XBRL resources
+
+    Returns:
+        {context id: {start, end, dimensions}}; instants have start None,
+        dimensions is "Axis=Member;..." sorted by axis ("" for none)
+    """
+    contexts = {}
+    for context_id, body in CONTEXT_PATTERN.findall(text):
+        period = {kind.lower(): value for kind, value in PERIOD_PATTERN.findall(body)}
+        members = [(axis, member) for axis, member in EXPLICIT_MEMBER_PATTERN.findall(body)]
+        members += [(axis, tag_text(value)) for axis, value in TYPED_MEMBER_PATTERN.findall(body)]
+        contexts[context_id] = {
+            "start": period.get("startdate"),
+            "end": period.get("enddate") or period.get("instant"),
+            "dimensions": ';'.join(f"{axis}={member}" for axis, member in sorted(members)),
+        }
+    return contexts
+
+
+def parse_units(text: str) -> dict:
+    """
+    Units of an XBRL instance or inline XBRL resources
+
+    Returns:
+        {unit id: "iso4217:USD", "iso4217:USD/xbrli:shares", ...}
+    """
+    units = {}
+    for unit_id, body in UNIT_PATTERN.findall(text):
+        denominator = UNIT_DENOMINATOR_PATTERN.search(body)
+        if denominator:
+            numerator = MEASURE_PATTERN.findall(body[:denominator.start()])
+            divisor = MEASURE_PATTERN.findall(body[denominator.start():])
+            units[unit_id] = f"{'*'.join(numerator)}/{'*'.join(divisor)}"
+        else:
+            units[unit_id] = '*'.join(MEASURE_PATTERN.findall(body))
+    return units
+
+
+def parse_ix_number(raw_text: str, attributes: dict) -> Optional[float]:
+    """
+    Numeric value of an ix:nonFraction: format (dot/comma decimal, zero dash, words),
+    scale and sign applied
+
+    Returns:
+        Value, None if nil or unparseable
+    """
+    if attributes.get("nil") == "true":
+        return None
+    text = raw_text.strip()
+    number_format = attributes.get("format", "").lower()
+    if "zero" in number_format or text in DASH_VALUES:
+        value = 0.0
+    elif "words" in number_format:
+        value = NUMBER_WORDS.get(text.lower())
+        if value is None:
+            return None
+    else:
+        if "comma" in number_format:
+            # 1.234,5 -> 1234.5
+            text = text.replace('.', '').replace(' ', '').replace(',', '.')
+        else:
+            text = text.replace(',', '').replace(' ', '')
+        try:
+            value = float(text)
+        except ValueError:
+            return None
+    scale = attributes.get("scale")
+    if scale and scale.lstrip('-').isdigit():
+        value *= 10 ** int(scale)
+    if attributes.get("sign") == "-":
+        value = -value
+    return value
+
+
+def parse_decimals(value: Optional[str]) -> Optional[int]:
+    """
+    decimals attribute as int, None for "INF" or missing
+    """
+    if value and value.lstrip('-').isdigit():
+        return int(value)
+    return None
+
+
+def make_fact(concept: str, context: dict, unit: Optional[str], value, text, decimals) -> dict:
+    """
+    One typed fact row
+    """
+    if isinstance(value, float) and value.is_integer() and abs(value) < 2 ** 53:
+        value = int(value)
+    return {
+        "concept": concept,
+        "start": context["start"],
+        "end": context["end"],
+        "unit": unit,
+        "value": value,
+        "text": text,
+        "decimals": decimals,
+        "dimensions": context["dimensions"],
+    }
+
+
+def iter_ix_facts(text: str, contexts: dict, units: dict):
+    """
+    Yield typed facts from the ix:nonFraction / ix:nonNumeric tags of inline XBRL HTML
+
+    Text facts wrapping other facts (text blocks) and text facts over
+    MAX_TEXT_CHARS are left out.
+    """
+    for match in IX_FACT_START_PATTERN.finditer(text):
+        kind = match.group(1).lower()
+        attributes = parse_attributes(match.group(2))
+        context = contexts.get(attributes.get("contextref"))
+        concept = attributes.get("name")
+        if context is None or not concept:
+            continue
+        close_tag = f"</ix:{match.group(1)}"
+        end = text.find(close_tag, match.end())
+        if end < 0:
+            end = text.lower().find(close_tag.lower(), match.end())
+            if end < 0:
+                continue
+        content = text[match.end():end]
+
+        if kind == "nonfraction":
+            value = parse_ix_number(tag_text(content), attributes)
+            if value is None and attributes.get("nil") != "true":
+                continue
+            yield make_fact(concept, context, units.get(attributes.get("unitref")), value, None,
+                            parse_decimals(attributes.get("decimals")))
+        else:
+            if '<ix:' in content.lower():
+                continue
+            value_text = tag_text(content)
+            if len(value_text) > MAX_TEXT_CHARS:
+                continue
+            yield make_fact(concept, context, None, None, value_text, None)
+
+
+def iter_instance_facts(text: str, contexts: dict, units: dict):
+    """
+    Yield typed facts from an XBRL instance document (EX-101.INS)
+    """
+    for concept, tag_attributes, content in INSTANCE_FACT_PATTERN.findall(text):
+        attributes = parse_attributes(tag_attributes)
+        context = contexts.get(attributes.get("contextref"))
+        if context is None:
+            continue
+        unit_ref = attributes.get("unitref")
+        if unit_ref:
+            try:
+                value = float(content.strip())
+            except ValueError:
+                continue
+            yield make_fact(concept, context, units.get(unit_ref), value, None,
+                            parse_decimals(attributes.get("decimals")))
+        else:
+            value_text = tag_text(content)
+            if value_text and len(value_text) <= MAX_TEXT_CHARS:
+                yield make_fact(concept, context, None, None, value_text, None)
+
+
+def extract_facts(raw_path: str) -> list[dict]:
+    """
+    Extract XBRL facts from a raw submission
+
+    Uses the filing's offset index, so only documents carrying XBRL are decoded:
+    instance documents (EX-101.INS, or any document with contextRef facts) and
+    HTML with inline XBRL tags. Contexts and units are shared across documents,
+    as in an inline XBRL document set. Duplicate facts (the same number shown
+    twice in the HTML) are kept once.
+
+    Returns:
+        Fact rows (see make_fact) in document order
+    """
+    index = load_or_build_filing_index(raw_path)
+    if not index["documents"]:
+        return []
+
+    instances, inline = [], []
+    with open(raw_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for entry in index["documents"]:
+            if entry["type"].startswith("EX-101.") and entry["type"] != "EX-101.INS":
+                continue  # Schema and linkbases hold no facts
+            data = mm[entry["start"]:entry["end"]]
+            if entry["type"] == "EX-101.INS" or (IX_MARKER not in data and INSTANCE_MARKER in data
+                                                 and entry["filename"].lower().endswith('.xml')):
+                instances.append(data.decode('utf-8', errors='replace'))
+            elif IX_MARKER in data:
+                inline.append(data.decode('utf-8', errors='replace'))
+
+    facts = []
+    seen = set()
+    for documents, iter_facts in ((instances, iter_instance_facts), (inline, iter_ix_facts)):
+        if not documents:
+            continue
+        contexts, units = {}, {}
+        for text in documents:
+            contexts.update(parse_contexts(text))
+            units.update(parse_units(text))
+        for text in documents:
+            for fact in iter_facts(text, contexts, units):
+                key = tuple(fact[column] for column in FACT_COLUMNS if column != "decimals")
+                if key in seen:
+                    continue
+                seen.add(key)
+                facts.append(fact)
+    return facts
+
+
+def build_facts(raw_path: str) -> dict:
+    """
+    Extract facts and wrap them with sidecar metadata
+
+    Returns:
+        Facts dict: version, source size/mtime, count, columns ({column: [values]})
+    """
+    raw_file = Path(raw_path)
+    stat = raw_file.stat()
+    rows = extract_facts(raw_path)
+    return {
+        "version": FACTS_VERSION,
+        "source": raw_file.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "count": len(rows),
+        "columns": {column: [row[column] for row in rows] for column in FACT_COLUMNS},
+    }
+
+
+def encode_columns(columns: dict) -> tuple[dict, dict]:
+    """
+    Dictionary-encode repeated string columns for the JSON sidecar
+
+    Returns:
+        (columns with DICTIONARY_COLUMNS as indexes, {column: strings})
+    """
+    encoded, dictionaries = dict(columns), {}
+    for column in DICTIONARY_COLUMNS:
+        strings = list(dict.fromkeys(columns[column]))
+        positions = {value: i for i, value in enumerate(strings)}
+        encoded[column] = [positions[value] for value in columns[column]]
+        dictionaries[column] = strings
+    return encoded, dictionaries
+
+
+def decode_columns(columns: dict, dictionaries: dict) -> dict:
+    """
+    Inverse of encode_columns
+    """
+    decoded = dict(columns)
+    for column, strings in dictionaries.items():
+        decoded[column] = [strings[i] for i in columns[column]]
+    return decoded
+
+
+def write_facts(facts: dict, raw_path: str, fmt: str = "json") -> Path:
+    """
+    Persist facts next to the raw submission (written atomically)
+
+    Returns:
+        Sidecar path
+
+    Raises:
+        ImportError: If fmt is "parquet" and pyarrow is not installed
+    """
+    facts_path = get_facts_path(raw_path, fmt)
+    tmp_path = facts_path.with_name(facts_path.name + '.tmp')
+
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet facts sidecar requires pyarrow (pip install pyarrow)")
+        metadata = {k: str(v) for k, v in facts.items() if k != "columns"}
+        table = pa.table({
+            column: pa.array(facts["columns"][column]).dictionary_encode()
+            if column in DICTIONARY_COLUMNS else pa.array(facts["columns"][column],
+                                                          type=pa.float64() if column == "value" else None)
+            for column in FACT_COLUMNS
+        }).replace_schema_metadata(metadata)
+        pq.write_table(table, tmp_path)
+    else:
+        columns, dictionaries = encode_columns(facts["columns"])
+        document = {k: v for k, v in facts.items() if k != "columns"}
+        document.update(dictionaries=dictionaries, columns=columns)
+        tmp_path.write_text(json.dumps(document, ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+
+    tmp_path.replace(facts_path)
+    return facts_path
+
+
+def write_facts_sidecar(raw_path: str, fmt: str = "json") -> dict:
+    """
+    Build and write the facts sidecar of a raw submission
+
+    Returns:
+        Facts dict
+    """
+    facts = build_facts(raw_path)
+    facts_path = write_facts(facts, raw_path, fmt)
+    print(f"XBRL facts: {facts['count']:,} facts -> {facts_path}")
+    return facts
+
+
+def read_facts_file(facts_path: Path) -> Optional[dict]:
+    """
+    Read a JSON or Parquet facts sidecar, None if unreadable
+    """
+    try:
+        if facts_path.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            table = pq.read_table(facts_path)
+            metadata = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+            return {
+                "version": int(metadata.get("version", 0)),
+                "source": metadata.get("source"),
+                "size": int(metadata.get("size", -1)),
+                "mtime_ns": int(metadata.get("mtime_ns", -1)),
+                "count": table.num_rows,
+                "columns": {column: table.column(column).to_pylist() for column in FACT_COLUMNS},
+            }
+        document = json.loads(facts_path.read_text(encoding='utf-8'))
+        document["columns"] = decode_columns(document["columns"], document.pop("dictionaries"))
+        return document
+    except (ImportError, KeyError, IndexError, OSError, ValueError):
+        return None
+
+
+def load_facts(raw_path: str, fmt: str = None) -> Optional[dict]:
+    """
+    Load persisted facts if still valid for the raw submission
+
+    Args:
+        raw_path: full-submission.txt path
+        fmt: Only look for this sidecar format (default: either)
+
+    Returns:
+        Facts dict, None if missing, unreadable, or stale (size/mtime/version changed)
+    """
+    stat = Path(raw_path).stat()
+    for candidate in [fmt] if fmt else FACTS_FORMATS:
+        facts_path = get_facts_path(raw_path, candidate)
+        if not facts_path.exists():
+            continue
+        facts = read_facts_file(facts_path)
+        if (facts is not None
+                and facts.get("version") == FACTS_VERSION
+                and facts.get("size") == stat.st_size
+                and facts.get("mtime_ns") == stat.st_mtime_ns):
+            return facts
+    return None
+
+
+def load_or_build_facts(raw_path: str, fmt: str = None, persist: bool = True) -> dict:
+    """
+    Reuse persisted facts or extract (and persist) them
+
+    Args:
+        raw_path: full-submission.txt path
+        fmt: Sidecar format, "json" or "parquet" (default: reuse either, build json)
+        persist: Write newly extracted facts next to the filing
+
+    Returns:
+        Facts dict
+    """
+    facts = load_facts(raw_path, fmt)
+    if facts is not None:
+        return facts
+
+    facts = build_facts(raw_path)
+    if persist:
+        try:
+            write_facts(facts, raw_path, fmt or "json")
+        except OSError as e:
+            print(f"Warning: Could not write XBRL facts: {e}")
+    return facts
+
+
+def build_concept_lookup(facts: dict) -> dict:
+    """
+    Concept -> row numbers, for repeated lookups without scanning the columns
+    """
+    lookup = {}
+    for row, concept in enumerate(facts["columns"]["concept"]):
+        lookup.setdefault(concept, []).append(row)
+    return lookup
+
+
+def get_fact_rows(facts: dict, rows: list[int]) -> list[dict]:
+    """
+    Materialize rows of the columnar facts as dicts
+    """
+    columns = facts["columns"]
+    return [{column: columns[column][row] for column in FACT_COLUMNS} for row in rows]
+
+
+def lookup_facts(
+    facts: dict,
+    concept: str,
+    lookup: dict = None,
+    end: str = None,
+    dimensions: str = ""
+) -> list[dict]:
+    """
+    Facts of one concept, latest period first
+
+    Args:
+        facts: Facts dict
+        concept: QName (e.g. "us-gaap:Revenues")
+        lookup: build_concept_lookup result (default: built on the fly)
+        end: Only this period end (YYYY-MM-DD)
+        dimensions: Only facts with these dimensions ("" = consolidated totals, None = any)
+
+    Returns:
+        Matching fact dicts
+    """
+    if lookup is None:
+        lookup = build_concept_lookup(facts)
+    columns = facts["columns"]
+    rows = [
+        row for row in lookup.get(concept, [])
+        if (end is None or columns["end"][row] == end)
+        and (dimensions is None or columns["dimensions"][row] == dimensions)
+    ]
+    rows.sort(key=lambda row: (columns["end"][row] or '', columns["start"][row] or ''), reverse=True)
+    return get_fact_rows(facts, rows)
+
+
+def period_label(start: Optional[str], end: str) -> str:
+    """
+    Column label: "2023-10-01..2024-09-28" for durations, "2024-09-28" for instants
+    """
+    return f"{start}..{end}" if start else end
+
+
+def format_fact_value(value, unit: Optional[str]) -> str:
+    """
+    Display value: currency and share counts in millions, per-share amounts as is
+    """
+    if value is None:
+        return "-"
+    if unit and '/' in unit:
+        return f"{value:,.2f}"
+    if unit and (unit.startswith("iso4217:") or unit == "xbrli:shares"):
+        return f"{value / 1e6:,.1f}"
+    return f"{value:,}"
+
+
+def format_fact_table(facts: dict, concepts: list = None, max_periods: int = MAX_TABLE_PERIODS) -> str:
+    """
+    Dense Markdown table of key financials (consolidated, no dimensions) for prompts
+
+    Args:
+        facts: Facts dict
+        concepts: (label, [concepts]) pairs (default: KEY_CONCEPTS)
+        max_periods: Most recent duration periods and instants shown
+
+    Returns:
+        Markdown table, "" if none of the concepts has a fact
+    """
+    lookup = build_concept_lookup(facts)
+    table_rows = []
+    durations, instants = {}, {}
+    for label, candidates in concepts or KEY_CONCEPTS:
+        # Filers tag the same line item with different concepts, use the one covering most periods
+        best = None
+        for concept in candidates:
+            values = {}
+            for fact in lookup_facts(facts, concept, lookup):
+                if fact["value"] is not None:
+                    values.setdefault((fact["start"], fact["end"]), fact)
+            if values and (best is None or len(values) > len(best[2])):
+                best = (label, concept, values)
+        if best is None:
+            continue
+        table_rows.append(best)
+        for key in best[2]:
+            periods = durations if key[0] else instants
+            periods[key] = periods.get(key, 0) + 1
+    if not table_rows:
+        return ""
+
+    def latest(periods):
+        # Most recent periods, annual before shorter ones ending on the same date
+        ranked = sorted(periods, key=lambda key: (key[1] or '', -periods[key], key[0] or ''), reverse=True)
+        return ranked[:max_periods]
+
+    columns = latest(durations) + latest(instants)
+    lines = [
+        "| Item | Concept | " + " | ".join(period_label(*key) for key in columns) + " |",
+        "| --- | --- | " + " | ".join("---" for _ in columns) + " |",
+    ]
+    for label, concept, values in table_rows:
+        cells = []
+        for key in columns:
+            fact = values.get(key)
+            cells.append(format_fact_value(fact["value"], fact["unit"]) if fact else "")
+        if any(cells):
+            lines.append(f"| {label} | {concept} | " + " | ".join(cells) + " |")
+    note = "(XBRL facts; currency and share counts in millions, per-share amounts in currency units)"
+    return note + "\n" + "\n".join(lines)
+
+
+def load_fact_table(cleaned_path: str, max_periods: int = MAX_TABLE_PERIODS) -> str:
+    """
+    Key financials table for the filing a cleaned.txt was produced from
+
+    Reuses the facts sidecar next to the raw submission, extracting (and
+    persisting) facts on first use.
+
+    Returns:
+        Markdown table, "" if no raw submission is found or it has no key facts
+    """
+    raw_path = find_raw_submission(cleaned_path)
+    if raw_path is None:
+        return ""
+    return format_fact_table(load_or_build_facts(str(raw_path)), max_periods=max_periods)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract XBRL facts of a raw SEC submission into a columnar sidecar"
+    )
+    parser.add_argument(
+        "--input",
+        required=True,
+        help="Raw submission (full-submission.txt), or a cleaned.txt next to one"
+    )
+    parser.add_argument(
+        "--format",
+        default=None,
+        choices=FACTS_FORMATS,
+        help="Sidecar format (default: reuse existing sidecar, else build json; parquet requires pyarrow)"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Ignore persisted facts and extract again"
+    )
+    parser.add_argument(
+        "--concept",
+        default=None,
+        help="Print the facts of this concept (e.g. us-gaap:Revenues), all dimensions included"
+    )
+    parser.add_argument(
+        "--table",
+        action="store_true",
+        help="Print the key financials table used in prompts"
+    )
+
+    args = parser.parse_args()
+
+    raw_path = Path(args.input)
+    if raw_path.name not in RAW_SUBMISSION_NAMES:
+        raw_path = find_raw_submission(args.input)
+        if raw_path is None:
+            print(f"Error: No raw submission found next to {args.input}", file=sys.stderr)
+            sys.exit(1)
+
+    try:
+        if args.rebuild:
+            facts = build_facts(str(raw_path))
+            write_facts(facts, str(raw_path), args.format or "json")
+        else:
+            facts = load_or_build_facts(str(raw_path), args.format)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.concept:
+        for fact in lookup_facts(facts, args.concept, dimensions=None):
+            if fact["value"] is not None:
+                value = f"{fact['value']:,}"
+            else:
+                value = fact["text"] if fact["text"] is not None else "nil"
+            print(f"{period_label(fact['start'], fact['end']):<24} {value:>22} {fact['unit'] or '':<22} "
+                  f"{fact['dimensions']}")
+        return
+
+    if args.table:
+        print(format_fact_table(facts) or "No key financial facts found")
+        return
+
+    concepts = len(set(facts["columns"]["concept"]))
+    print(f"XBRL facts: {facts['count']:,} ({concepts:,} concepts) in {raw_path}")
+
+
+if __name__ == "__main__":
+    main()